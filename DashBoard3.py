@@ -1,42 +1,136 @@
+import time
+_T0 = time.perf_counter()  # Inicio del script, para medir el primer pintado
+
+import hashlib
+import os
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+from arranque import leer_arranque, guardar_arranque
+from fuente_local import ConexionLocal, carpeta_local
+from metricas import ETIQUETAS_SEMAFORO, evaluar_metricas, metricas_numericas
+import memoria_compartida
+import telemetria
+from cache_clubes import CACHE, cache_por_club
+from clubes import cargar_clubes, clave_hoja
+from refrescos import PlanificadorRefrescos
+from en_directo import INACTIVIDAD_SONDEO, INTERVALO_SONDEO, EstadoDirecto, leer_rango
+from alertas import leer_alertas, procesar_alertas, tabla_equipo
+import historial
+import eventos
+from tabla_paginada import mostrar_tabla
+from paquete_offline import VARIABLE_ENTORNO as VARIABLE_PAQUETE, Paquete, exportar
+from similitud import RASGOS, construir_indice, rasgos_equipo, vecinos, vector_pesos
+from lectura_resiliente import LecturaFallida, hace_cuanto, leer_con_reintentos
+# plotly y streamlit_gsheets se importan más abajo: no hacen falta para el primer pintado
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Club Analytics Pro", layout="wide", page_icon="⚽")
 
-# --- LISTA DE EQUIPOS ---
-# IMPORTANTE: Pon aquí los nombres EXACTOS de las pestañas de tu Google Sheet
+# --- CONEXIÓN ---
+# Se abre la primera vez que se leen datos, no al arrancar el script.
+# Con CLUB_DATOS_LOCAL se leen CSV locales en lugar de Google Sheets.
+@st.cache_resource
+def obtener_conexion():
+    if carpeta_local():
+        return ConexionLocal(carpeta_local())
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+# --- TELEMETRÍA ---
+# Un endpoint /metrics por proceso (formato Prometheus), arrancado una sola vez
+@st.cache_resource
+def iniciar_telemetria():
+    return telemetria.servir()
+
+iniciar_telemetria()
+tramos = telemetria.Tramos("DashBoard3", inicio=_T0)
+
+# Recuperamos la URL de los secretos (la usan los clubes sin spreadsheet propio en clubes.toml)
+try:
+    url_por_defecto = None if carpeta_local() else st.secrets["connections"]["gsheets"]["spreadsheet"]
+except:
+    url_por_defecto = None
 
-lista_equipos = {
-    "Preferente": "1039572604", "Juvenil A": "689736481",
-    "Juvenil B": "1086115076", "Cadete A": "325576234",
-    "Cadete B": "0", "Infantil A": "1612741636",
-    "Infantil B": "1284204032"   
-}
+# --- MODO SIN CONEXIÓN ---
+# Con CLUB_PAQUETE=<ruta> los datos salen de un paquete exportado (paquete_offline.py):
+# solo lectura, sin Sheets, sin refrescos, alertas ni directo.
+@st.cache_resource
+def abrir_paquete(ruta):
+    return Paquete(ruta)
 
-# --- CONEXIÓN ---
-conn = st.connection("gsheets", type=GSheetsConnection)
+paquete = None
+if os.environ.get(VARIABLE_PAQUETE):
+    try:
+        paquete = abrir_paquete(os.environ[VARIABLE_PAQUETE])
+    except Exception as e:
+        st.error(f"No se puede abrir el paquete sin conexión: {type(e).__name__}: {e}")
+        st.stop()
+
+# --- CLUB Y LISTA DE EQUIPOS ---
+# Los equipos de cada club están en clubes.toml (ver clubes.py); el club sale de ?club=<id>
+@st.cache_resource
+def configuracion_clubes(url_por_defecto):
+    clubes = cargar_clubes(url_por_defecto)
+    for id_club, datos_club in clubes.items():
+        CACHE.fijar_cuota(id_club, datos_club['cuota_mb'])
+    return clubes
 
-# Recuperamos la URL de los secretos para evitar el error que tuviste
 try:
-    url_sheet = st.secrets["connections"]["gsheets"]["spreadsheet"]
-except:
+    if paquete is not None:
+        # Un solo club: el del paquete
+        manifiesto = paquete.manifiesto
+        clubes = {manifiesto['club']: {'nombre': manifiesto['nombre'], 'spreadsheet': None, 'archivo': {},
+                                       'equipos': {e['nombre']: e['gid'] for e in manifiesto['equipos']}}}
+    else:
+        clubes = configuracion_clubes(url_por_defecto)
+except (OSError, ValueError) as e:
+    st.error(f"Error en la configuración de clubes: {e}")
+    st.stop()
+id_club = st.query_params.get("club", next(iter(clubes)))
+if id_club not in clubes:
+    st.error(f"Club desconocido: '{id_club}'")
+    st.stop()
+lista_equipos = clubes[id_club]['equipos']
+url_sheet = clubes[id_club]['spreadsheet']
+if url_sheet is None and not carpeta_local() and paquete is None:
     st.error("No se encuentra la URL en secrets.toml")
     st.stop()
 
-@st.cache_data(ttl=60)
-def cargar_datos_equipo(nombre_hoja,gid):
+# --- MÉTRICAS DERIVADAS ---
+# Se usa tanto para la temporada completa como para un rango de jornadas
+def calcular_metricas(df_stats, t_partido, partidos_jugados):
+    # Renombramos columnas para que queden bonitas en la app
+    df_stats = df_stats.rename(columns={
+        'C_NC': 'Convocatorias',
+        'T': 'Minutos titular',
+        'S': 'Minutos suplente',
+        'G': 'Goles',
+        'A': 'Amarillas',
+        'DA': 'Dobles A.',
+        'R': 'Rojas',
+    })
+
+    # Las métricas derivadas (ratios, %, semáforo...) están declaradas en metricas.py
+    # y se calculan todas en una pasada vectorizada.
+    # Minutos totales que hubiera jugado un jugador si lo hubiera jugado todo:
+    min_totales_equipo = partidos_jugados * t_partido
+    return evaluar_metricas(df_stats, contexto={'t_partido': t_partido, 'min_totales_equipo': min_totales_equipo})
+
+
+# --- LECTURA DE LA HOJA (UNA VEZ POR MÁQUINA) ---
+# leer_temporada descarga y parsea la hoja a formato largo. Solo la ejecuta el
+# proceso que publica la versión en memoria compartida; el resto la mapea.
+TTL_DATOS = 60
+
+def leer_temporada(spreadsheet, gid, club):
     # 1. CARGA CON DOBLE CABECERA
     # Leemos las dos primeras filas como encabezados
     # Leemos la pestaña específica usando 'worksheet'
-    try:
-        df = conn.read(spreadsheet=url_sheet, worksheet=gid, header=[0, 1])
-    except Exception as e:
-        return None, None, f"Error al leer la hoja '{nombre_hoja}': {str(e)}"
+    # Con timeout, reintentos y cortocircuito (lectura_resiliente.py)
+    df = leer_con_reintentos(lambda: obtener_conexion().read(spreadsheet=spreadsheet, worksheet=gid, header=[0, 1]),
+                             spreadsheet=spreadsheet or "local", gid=gid, club=club)
+    t_parseo = time.perf_counter()
 
     # 2. LIMPIEZA Y ESTRUCTURA (ACTUALIZADO)
     # En lugar de buscar "Name" o "Nombre" por texto, cogemos las dos primeras columnas por posición.
@@ -70,7 +164,96 @@ def cargar_datos_equipo(nombre_hoja,gid):
     df_long['Titular'] = np.where(df_long['T'] > 0, 1, 0)
     df_long['Suplente'] = np.where(df_long['S'] > 0, 1, 0)
     df_long['Completos'] = np.where(df_long['T'] == t_partido, 1, 0)
-    
+
+    # Versión de los datos: hash del contenido. Sirve de clave para todo lo que se
+    # precalcula a partir de df_long (cubo de KPIs, etc.) sin volver a hashear tablas.
+    version_datos = hashlib.sha1(pd.util.hash_pandas_object(df_long, index=False).values).hexdigest()[:16]
+    arrays, meta = empaquetar_temporada(df_long)
+    telemetria.PARSEO.observar(time.perf_counter() - t_parseo, club=club, gid=gid)
+    return version_datos, arrays, meta
+
+
+def empaquetar_temporada(df_long):
+    # df_long -> arrays planos para publicarlos: un bloque 2D por tipo numérico
+    # y los textos (Nombre, Posición) como códigos + lista de categorías
+    columnas = df_long.columns.tolist()
+    flotantes = [c for c in columnas if df_long[c].dtype.kind == 'f']
+    enteros = [c for c in columnas if df_long[c].dtype.kind in 'iub']
+    textos = [c for c in columnas if c not in flotantes and c not in enteros]
+
+    arrays = {
+        'flotantes': df_long[flotantes].to_numpy(dtype=np.float64),
+        'enteros': df_long[enteros].to_numpy(dtype=np.int64),
+    }
+    categorias = {}
+    for i, col in enumerate(textos):
+        codigos, valores = pd.factorize(df_long[col])
+        arrays[f'texto_{i}'] = codigos.astype(np.int32)
+        categorias[col] = [str(v) for v in valores]
+    meta = {'columnas': columnas, 'flotantes': flotantes, 'enteros': enteros, 'textos': textos,
+            'categorias': categorias}
+    return arrays, meta
+
+
+def desempaquetar_temporada(meta, arrays):
+    # Los bloques numéricos se envuelven sin copiar (siguen siendo el mmap compartido)
+    partes = [
+        pd.DataFrame(arrays['flotantes'], columns=meta['flotantes'], copy=False),
+        pd.DataFrame(arrays['enteros'], columns=meta['enteros'], copy=False),
+    ]
+    for i, col in enumerate(meta['textos']):
+        codigos = np.asarray(arrays[f'texto_{i}'])
+        valores = np.asarray(meta['categorias'][col], dtype=object)
+        partes.append(pd.DataFrame({col: np.where(codigos >= 0, valores[np.maximum(codigos, 0)], np.nan)}))
+    return pd.concat(partes, axis=1)[meta['columnas']]
+
+
+# Cada lectura real de la hoja deja una copia en el historial (historial.py). Solo
+# ocupa disco si la versión es nueva, y un fallo al archivar no impide cargar.
+def leer_y_archivar(club, gid):
+    version, arrays, meta = leer_temporada(clubes[club]['spreadsheet'], gid, club)
+    try:
+        historial.guardar_version(clave_hoja(club, gid), version, desempaquetar_temporada(meta, arrays))
+    except OSError:
+        pass
+    return version, arrays, meta
+
+
+# En modo sin conexión: el batch del equipo (mapeado desde el paquete) y sus métricas
+def datos_paquete(nombre_hoja):
+    df_long, df_agrupado, info = paquete.equipo(nombre_hoja)
+    df_stats = calcular_metricas(df_agrupado, info['t_partido'], info['partidos'])
+    return df_long, df_stats, info['jornada'], info['partidos'], info['t_partido'], info['version'], None, None
+
+
+# Caché por club (cache_clubes.py): todas las sesiones del proceso comparten el mismo
+# resultado sin copiarlo (nadie lo modifica: las secciones trabajan sobre copias o filtros)
+@telemetria.cache_medida("datos_equipo", cache_por_club(ttl=TTL_DATOS))
+def cargar_datos_equipo(club, nombre_hoja, gid):
+    if paquete is not None:
+        return datos_paquete(nombre_hoja)
+    clave = clave_hoja(club, gid)
+
+    def leer():
+        telemetria.CACHE_FALLOS.inc(cache="memoria_compartida")
+        return leer_y_archivar(club, gid)
+
+    telemetria.CACHE_CONSULTAS.inc(cache="memoria_compartida")
+    datos_de = None  # instante de la última carga buena si se sirve de respaldo
+    try:
+        version_datos, meta, arrays = memoria_compartida.obtener_o_publicar(clave, TTL_DATOS, leer)
+    except Exception as e:
+        # Si Sheets falla, seguimos con la última versión publicada (aunque esté caducada)
+        ultima = memoria_compartida.mapear(clave)
+        if ultima is None:
+            motivo = str(e) if isinstance(e, LecturaFallida) else f"{type(e).__name__}: {e}"
+            return None, None, None, None, None, None, None, f"Error al leer la hoja '{nombre_hoja}': {motivo}"
+        telemetria.RESPALDO.inc(club=club, gid=gid)
+        version_datos, meta, arrays = ultima
+        datos_de = memoria_compartida.guardado(clave)
+    df_long = desempaquetar_temporada(meta, arrays)
+    t_partido = np.max(df_long['T'])
+
     # 6. AGRUPAR POR JUGADOR (Estadísticas de Temporada)
     df_stats = df_long.groupby(['Nombre', 'Posición']).agg({
         'C_NC': 'sum',            # Convocatorias
@@ -107,92 +290,690 @@ def cargar_datos_equipo(nombre_hoja,gid):
         jornada_actual = 0
         partidos_jugados = 0
 
-    # Calculo de los minutos totales que hubiera jugado un jugador si lo hubiera jugado todo.
-    min_totales_equipo = partidos_jugados * t_partido
-
-    df_stats['Min_Posibles'] = df_stats['C_NC'] * t_partido 
-
-    df_stats['G_x_min'] = df_stats['Minutos totales'] / df_stats['G']
-    df_stats.loc[np.isinf(df_stats['G_x_min']), 'G_x_min'] = 0
-    df_stats['G_x_min'] = df_stats['G_x_min'].round(1)
-      
-    df_stats['A_x_min'] = df_stats['Minutos totales'] / df_stats['A']
-    df_stats.loc[np.isinf(df_stats['A_x_min']), 'A_x_min'] = 0
-    df_stats['A_x_min'] = df_stats['A_x_min'].round(1)
-
-    df_stats['R_x_min'] = df_stats['Minutos totales'] / df_stats['R']
-    df_stats.loc[np.isinf(df_stats['R_x_min']), 'R_x_min'] = 0
-    df_stats['R_x_min'] = df_stats['R_x_min'].round(1)
-
-    df_stats["pct_participacion_disp"] = df_stats['Minutos totales'] / df_stats['Min_Posibles'] * 100 # Porcentaje de minutos jugados de los partidos que ha participado
-    df_stats["pct_participacion_equipo"] = df_stats['Minutos totales'] / min_totales_equipo * 100 # Porcentaje de minutos jugados con respecto al total.
-    
-    # Renombramos columnas para que queden bonitas en la app
-    df_stats.rename(columns={
-        'C_NC': 'Convocatorias',
-        'T': 'Minutos titular',
-        'S': 'Minutos suplente',
-        'G': 'Goles',
-        'A': 'Amarillas',
-        'DA': 'Dobles A.',
-        'R': 'Rojas',
-        'Min_Posibles': 'Min. Posibles',
-        'pct_participacion_disp': '% Jugado (Disp)',
-        'pct_participacion_equipo': '% Jugado (Total)'
-    }, inplace=True)
-
-
+    df_stats = calcular_metricas(df_stats, t_partido, partidos_jugados)
 
     # Limpieza final: Eliminamos filas que no sean de jugadores (totales del excel, etc.)
     # Filtramos para que 'Nombre' no sea un número ni esté vacío
     df_stats = df_stats[~df_stats['Nombre'].astype(str).str.isnumeric()]
     df_stats = df_stats[df_stats['Nombre'] != 'nan']
 
-
     # --- RESULTADO ---
-    st.dataframe(df_stats)
-    return df_long, df_stats, jornada_actual, partidos_jugados, t_partido , None
+    return df_long, df_stats, jornada_actual, partidos_jugados, t_partido, version_datos, datos_de, None
+
+
+# --- CUBO DE KPIs ---
+# Equipo x Posición x Métrica x Jornada. Se construye una vez por versión de datos y
+# guarda sumas acumuladas por jornada, así cualquier rango de jornadas es una resta.
+METRICAS_CUBO = {
+    'Goles': 'G',
+    'Amarillas': 'A',
+    'Dobles A.': 'DA',
+    'Rojas': 'R',
+    'Convocatorias': 'C_NC',
+    'Minutos totales': 'Minutos totales',
+    'Minutos titular': 'T',
+}
+
+@telemetria.cache_medida("cubo_kpi", cache_por_club())
+def construir_cubo_kpi(club, equipo, version_datos, _df_long, _df_stats):
+    # Los argumentos con "_" no se hashean: la clave de caché es (club, equipo, version_datos)
+    posiciones = _df_stats['Posición'].dropna().unique().tolist()
+
+    # Solo filas de jugadores reales (las mismas que quedaron en df_stats)
+    df = _df_long[_df_long['Nombre'].isin(_df_stats['Nombre'])]
+    jornadas = np.sort(df['Jornada'].unique())
+
+    i_pos = pd.Categorical(df['Posición'], categories=posiciones).codes
+    validas = i_pos >= 0
+    i_pos = i_pos[validas]
+    i_jor = np.searchsorted(jornadas, df['Jornada'].to_numpy()[validas])
+    celda = i_pos * len(jornadas) + i_jor
+    n_celdas = len(posiciones) * len(jornadas)
+
+    # Una sola pasada por métrica: bincount suma por (posición, jornada)
+    valores = np.stack([
+        np.bincount(celda, weights=df[col].to_numpy()[validas], minlength=n_celdas).reshape(len(posiciones), len(jornadas))
+        for col in METRICAS_CUBO.values()
+    ], axis=1)
+
+    # Sumas acumuladas con un 0 delante: valor(j_ini..j_fin) = acum[fin] - acum[ini]
+    acum = np.concatenate([np.zeros(valores.shape[:2] + (1,)), valores.cumsum(axis=2)], axis=2)
+
+    # Jornadas en las que el equipo jugó (suma de minutos de titular > 0)
+    activas = valores[:, list(METRICAS_CUBO).index('Minutos titular'), :].sum(axis=0) > 0
+    activas_acum = np.concatenate([[0], activas.cumsum()])
+
+    plantilla = _df_stats.groupby('Posición').size().reindex(posiciones, fill_value=0).to_numpy()
+
+    return {
+        'equipo': equipo,
+        'posiciones': posiciones,
+        'metricas': list(METRICAS_CUBO),
+        'jornadas': jornadas,
+        'acum': acum,
+        'activas': activas,
+        'activas_acum': activas_acum,
+        'plantilla': plantilla,
+    }
+
+
+def _indices_rango(jornadas, rango):
+    # Convierte un rango (j_ini, j_fin) en índices sobre los acumulados
+    if rango is None:
+        return 0, len(jornadas)
+    i_ini = np.searchsorted(jornadas, rango[0], side='left')
+    i_fin = np.searchsorted(jornadas, rango[1], side='right')
+    return i_ini, max(i_ini, i_fin)
+
+
+def consultar_cubo(cubo, metrica, posiciones=None, excluir=None, rango=None):
+    # Suma de una métrica para un conjunto de posiciones y un rango de jornadas
+    k = cubo['metricas'].index(metrica)
+    mascara = np.ones(len(cubo['posiciones']), dtype=bool)
+    if posiciones is not None:
+        mascara &= np.isin(cubo['posiciones'], posiciones)
+    if excluir is not None:
+        mascara &= ~np.isin(cubo['posiciones'], excluir)
+    i_ini, i_fin = _indices_rango(cubo['jornadas'], rango)
+    return cubo['acum'][mascara, k, i_fin].sum() - cubo['acum'][mascara, k, i_ini].sum()
+
+
+def kpis_equipo(cubo, rango=None):
+    # KPIs de cabecera. Los goles en contra son los goles apuntados a los porteros.
+    i_ini, i_fin = _indices_rango(cubo['jornadas'], rango)
+    activas = cubo['jornadas'][i_ini:i_fin][cubo['activas'][i_ini:i_fin]]
+    return {
+        'Goles a Favor': int(consultar_cubo(cubo, 'Goles', excluir=['Portero'], rango=rango)),
+        'Goles en Contra': int(consultar_cubo(cubo, 'Goles', posiciones=['Portero'], rango=rango)),
+        'Tarjetas Amarillas': int(consultar_cubo(cubo, 'Amarillas', rango=rango)),
+        'Tarjetas Rojas': int(consultar_cubo(cubo, 'Rojas', rango=rango) + consultar_cubo(cubo, 'Dobles A.', rango=rango)),
+        'Plantilla': int(cubo['plantilla'].sum()),
+        'Jornada actual': int(activas.max()) if len(activas) else 0,
+        'Partidos Jugados': int(cubo['activas_acum'][i_fin] - cubo['activas_acum'][i_ini]),
+    }
+
+
+def desglose_posiciones(cubo, rango=None):
+    # Tabla Posición x Métrica leída directamente del cubo
+    i_ini, i_fin = _indices_rango(cubo['jornadas'], rango)
+    tabla = pd.DataFrame(cubo['acum'][:, :, i_fin] - cubo['acum'][:, :, i_ini],
+                         index=cubo['posiciones'], columns=cubo['metricas'])
+    tabla.insert(0, 'Plantilla', cubo['plantilla'])
+    tabla.index.name = 'Posición'
+    return tabla.astype(int)
+
+
+# --- ACUMULADOS POR JUGADOR (RANGOS DE JORNADAS) ---
+# Para cada estadística guardamos una matriz Jugador x Jornada de sumas acumuladas.
+# El total de cualquier rango J_ini..J_fin es acum[fin] - acum[ini]: coste constante
+# por jugador, sin repetir el groupby sobre df_long al mover el slider.
+COLS_ACUMULADAS = ['C_NC', 'Jugados', 'Titular', 'Suplente', 'Completos', 'Minutos totales',
+                   'T', 'S', 'G', 'A', 'DA', 'R']
+
+@telemetria.cache_medida("acumulados", cache_por_club())
+def construir_acumulados(club, equipo, version_datos, _df_long, _df_stats):
+    claves = ['Nombre', 'Posición']
+    jugadores = pd.MultiIndex.from_frame(_df_stats[claves])
+    i_jug = jugadores.get_indexer(pd.MultiIndex.from_frame(_df_long[claves]))
+    validas = i_jug >= 0
+
+    jornadas = np.sort(_df_long.loc[validas, 'Jornada'].unique())
+    i_jor = np.searchsorted(jornadas, _df_long['Jornada'].to_numpy()[validas])
+    celda = i_jug[validas] * len(jornadas) + i_jor
+    forma = (len(jugadores), len(jornadas))
+
+    valores = np.stack([
+        np.bincount(celda, weights=_df_long[col].to_numpy()[validas], minlength=forma[0] * forma[1]).reshape(forma)
+        for col in COLS_ACUMULADAS
+    ])
+    ceros = np.zeros(valores.shape[:2] + (1,))
+    acum = np.concatenate([ceros, valores.cumsum(axis=2)], axis=2)
+
+    # Jornadas que disputó el equipo, para el % de participación sobre el total
+    activas = valores[COLS_ACUMULADAS.index('T')].sum(axis=0) > 0
+
+    return {
+        'nombres': _df_stats['Nombre'].to_numpy(),
+        'posiciones': _df_stats['Posición'].to_numpy(),
+        'jornadas': jornadas,
+        'acum': acum,
+        'activas_acum': np.concatenate([[0], activas.cumsum()]),
+    }
+
+
+def stats_rango(acumulados, rango, t_partido):
+    # Reconstruye df_stats (mismas columnas que cargar_datos_equipo) para un rango
+    i_ini, i_fin = _indices_rango(acumulados['jornadas'], rango)
+    totales = acumulados['acum'][:, :, i_fin] - acumulados['acum'][:, :, i_ini]
+    partidos_rango = int(acumulados['activas_acum'][i_fin] - acumulados['activas_acum'][i_ini])
+    return stats_desde_totales(acumulados, totales, t_partido, partidos_rango)
+
+
+def stats_desde_totales(acumulados, totales, t_partido, partidos):
+    # totales: Estadística (COLS_ACUMULADAS) x Jugador, en el orden de los acumulados
+    df_totales = pd.DataFrame(totales.T, columns=COLS_ACUMULADAS)
+    for col in ['Jugados', 'Titular', 'Suplente', 'Completos']:
+        df_totales[col] = df_totales[col].astype(int)
+    df_totales.insert(0, 'Nombre', acumulados['nombres'])
+    df_totales.insert(1, 'Posición', acumulados['posiciones'])
+    return calcular_metricas(df_totales, t_partido, partidos)
+
+
+# --- PARTIDO EN DIRECTO (ACTUALIZACIÓN INCREMENTAL) ---
+# La temporada ya está sumada en los acumulados: con el bloque de la jornada en juego
+# (en_directo.py) basta con quitar lo que había en esa jornada y sumar lo nuevo.
+# Ni se vuelve a leer la hoja entera ni se repiten groupby, cubo o acumulados.
+@st.cache_resource
+def estado_directo():
+    return EstadoDirecto()
+
+@st.cache_resource
+def planificador_directo():
+    return PlanificadorRefrescos(intervalo=INTERVALO_SONDEO, inactividad=INACTIVIDAD_SONDEO, pausa=0.2)
+
+def sondear_jornada(club, gid, jornada):
+    spreadsheet = clubes[club]['spreadsheet']
+    conexion = obtener_conexion()
+
+    def leer(columnas=None, **opciones):
+        # Con columnas, a Sheets solo se le pide ese rango (ver en_directo.py).
+        # ttl=0: la conexión de Sheets no debe devolver su copia en caché
+        if columnas is None or isinstance(conexion, ConexionLocal):
+            lectura = lambda: conexion.read(spreadsheet=spreadsheet, worksheet=gid, ttl=0, usecols=columnas, **opciones)
+        else:
+            lectura = lambda: leer_rango(conexion, spreadsheet or url_por_defecto, gid, columnas)
+        # Cortocircuito propio: los fallos del directo no mandan al respaldo las cargas normales
+        return leer_con_reintentos(lectura, spreadsheet=f"{spreadsheet or 'local'}#directo", gid=gid, club=club,
+                                   intentos=1, timeout=5)
+
+    estado_directo().sondear((club, gid, jornada), leer, jornada)
+
+
+@telemetria.cache_medida("directo", cache_por_club(ttl=TTL_DATOS))
+def stats_en_directo(club, equipo, version_datos, jornada, version_directo, t_partido, _acumulados, _datos_jornada):
+    jugadores = pd.MultiIndex.from_arrays([_acumulados['nombres'].astype(str),
+                                           _acumulados['posiciones'].astype(str)])
+    vivo = _datos_jornada.astype({'Posición': str}).set_index(['Nombre', 'Posición'])
+    vivo = vivo[~vivo.index.duplicated()].reindex(jugadores, fill_value=0)
+
+    # La jornada tal como llega, con las mismas columnas derivadas que leer_temporada
+    minutos = vivo['T'] + vivo['S']
+    derivadas = {'Minutos totales': minutos, 'Jugados': minutos > 0, 'Titular': vivo['T'] > 0,
+                 'Suplente': vivo['S'] > 0, 'Completos': vivo['T'] == t_partido}
+    nuevo = np.stack([np.asarray(derivadas[c] if c in derivadas else vivo[c], dtype=np.float64)
+                      for c in COLS_ACUMULADAS])
+
+    # Lo que ya había en esa jornada según la última carga de la temporada
+    acum = _acumulados['acum']
+    i = np.searchsorted(_acumulados['jornadas'], jornada)
+    if i < len(_acumulados['jornadas']) and _acumulados['jornadas'][i] == jornada:
+        previo = acum[:, :, i + 1] - acum[:, :, i]
+    else:
+        previo = np.zeros_like(nuevo)
+
+    i_t = COLS_ACUMULADAS.index('T')
+    partidos = int(_acumulados['activas_acum'][-1] - (previo[i_t].sum() > 0) + (nuevo[i_t].sum() > 0))
+    df_vivo = stats_desde_totales(_acumulados, acum[:, :, -1] - previo + nuevo, t_partido, partidos)
+    df_jornada = stats_desde_totales(_acumulados, nuevo, t_partido, int(nuevo[i_t].sum() > 0))
+    return df_vivo, df_jornada, partidos
+
+
+def kpis_desde_stats(df, partidos):
+    # Los mismos KPIs que kpis_equipo, sumando sobre una tabla de jugadores
+    porteros = (df['Posición'] == 'Portero').to_numpy()
+    return {
+        'Goles a Favor': int(df['Goles'].to_numpy()[~porteros].sum()),
+        'Goles en Contra': int(df['Goles'].to_numpy()[porteros].sum()),
+        'Tarjetas Amarillas': int(df['Amarillas'].sum()),
+        'Tarjetas Rojas': int(df['Rojas'].sum() + df['Dobles A.'].sum()),
+        'Partidos Jugados': partidos,
+    }
+
+
+# --- PROYECCIÓN DE MINUTOS A FIN DE TEMPORADA (MONTE CARLO) ---
+# Se simulan las jornadas que faltan para toda la plantilla a la vez:
+#   - convocado ~ Bernoulli(convocatorias / partidos del equipo)
+#   - minutos si es convocado ~ remuestreo de sus propios partidos convocado
+# Todo son arrays Simulación x Jugador x Jornada, sin bucles por jugador.
+@telemetria.cache_medida("proyeccion", cache_por_club())
+def proyectar_minutos(club, equipo, version_datos, t_partido, jornadas_temporada, objetivo_pct,
+                      _acumulados, n_sim=4000, bloque=1000):
+    por_jornada = np.diff(_acumulados['acum'], axis=2)
+    activas = np.diff(_acumulados['activas_acum']) > 0
+    minutos = por_jornada[COLS_ACUMULADAS.index('Minutos totales')][:, activas]
+    convocado = por_jornada[COLS_ACUMULADAS.index('C_NC')][:, activas] > 0
+
+    partidos = int(activas.sum())
+    restantes = max(int(jornadas_temporada) - partidos, 0)
+    n_jug = len(minutos)
+    p_conv = convocado.sum(axis=1) / partidos if partidos else np.zeros(n_jug)
+
+    # Historial de minutos convocado, compactado a la izquierda de cada fila
+    orden = np.argsort(~convocado, axis=1, kind='stable')
+    historial = np.take_along_axis(np.where(convocado, minutos, 0), orden, axis=1).astype(np.float32)
+    n_hist = convocado.sum(axis=1)
+    if historial.shape[1] == 0:
+        historial = np.zeros((n_jug, 1), dtype=np.float32)
+
+    actuales = minutos.sum(axis=1)
+    min_objetivo = objetivo_pct / 100 * jornadas_temporada * t_partido
+
+    # Semilla fija por versión de datos: misma proyección en cada rerun
+    rng = np.random.default_rng(int(version_datos[:8], 16))
+    finales = np.empty((n_sim, n_jug), dtype=np.float32)
+    filas = np.arange(n_jug)[None, :, None]
+    for ini in range(0, n_sim, bloque):
+        n = min(bloque, n_sim - ini)
+        va = rng.random((n, n_jug, restantes), dtype=np.float32) < p_conv[None, :, None]
+        idx = (rng.random((n, n_jug, restantes), dtype=np.float32) * n_hist[None, :, None]).astype(np.intp)
+        finales[ini:ini + n] = actuales + (va * historial[filas, idx]).sum(axis=2)
+
+    # Sin jornadas o sin duración de partido no hay minutos de temporada: los % quedan a 0
+    min_temporada = float(jornadas_temporada * t_partido) or np.nan
+    p10, p50, p90 = np.percentile(finales, [10, 50, 90], axis=0) / min_temporada * 100
+    return pd.DataFrame({
+        'Nombre': _acumulados['nombres'],
+        'Posición': _acumulados['posiciones'],
+        '% Jugado (Total)': actuales / min_temporada * 100,
+        '% Convocado': p_conv * 100,
+        'Proyección P10': p10,
+        'Proyección P50': p50,
+        'Proyección P90': p90,
+        'Prob. objetivo': (finales >= min_objetivo).mean(axis=0) * 100,
+    }).fillna(0).round(1)
+
+
+# --- PLANIFICADOR DE MINUTOS (REPARTO EQUITATIVO) ---
+# 1. Nivelado ("water-filling"): buscamos el nivel L tal que repartir
+#    clip(L - minutos_actuales, 0, tope) agote los minutos disponibles. Así los que
+#    menos llevan reciben primero y todos se acercan al mismo total.
+# 2. Reparto por jornadas con el algoritmo "wrap-around" de McNaughton: se colocan
+#    los totales uno detrás de otro sobre K huecos (jugadores en el campo) de
+#    N jornadas x t_partido minutos. Como nadie pasa de N x t_partido, ningún jugador
+#    coincide consigo mismo y nunca supera t_partido en una jornada.
+def nivelar_minutos(actuales, capacidad, tope):
+    actuales = np.asarray(actuales, dtype=float)
+    if len(actuales) == 0:
+        return actuales
+    if capacidad >= tope * len(actuales):
+        return np.full(len(actuales), float(tope))
+    bajo, alto = actuales.min(), actuales.max() + tope
+    for _ in range(60):
+        nivel = (bajo + alto) / 2
+        if np.clip(nivel - actuales, 0, tope).sum() < capacidad:
+            bajo = nivel
+        else:
+            alto = nivel
+    asignados = np.clip(alto - actuales, 0, tope)
+
+    # Redondeo a minutos enteros manteniendo el total (mayores restos)
+    enteros = np.floor(asignados)
+    faltan = int(round(min(capacidad, asignados.sum()) - enteros.sum()))
+    if faltan > 0:
+        enteros[np.argsort(enteros - asignados)[:faltan]] += 1
+    return enteros
+
+
+def repartir_jornadas(totales, n_jornadas, t_partido):
+    # Devuelve una matriz Jugador x Jornada con los minutos de cada uno
+    largo = n_jornadas * t_partido
+    fin = np.cumsum(totales)
+    ini = fin - totales
+    j = np.arange(n_jornadas) * t_partido
+
+    def acumulado(g):
+        g = g[:, None]
+        return (g // largo) * t_partido + np.clip(g % largo - j, 0, t_partido)
+
+    return (acumulado(fin) - acumulado(ini)).astype(int)
+
+
+def planificar_minutos(df_jugadores, n_jornadas, t_partido, en_campo):
+    # Porteros: 1 hueco por jornada. Resto: en_campo - 1 huecos.
+    t_partido = int(t_partido)
+    plan = np.zeros((len(df_jugadores), n_jornadas), dtype=int)
+    es_portero = (df_jugadores['Posición'] == 'Portero').to_numpy()
+    avisos = []
+    for grupo, huecos in [(es_portero, 1), (~es_portero, en_campo - 1)]:
+        capacidad = huecos * n_jornadas * t_partido
+        totales = nivelar_minutos(df_jugadores.loc[grupo, 'Minutos totales'], capacidad, n_jornadas * t_partido)
+        if totales.sum() < capacidad:
+            avisos.append(f"Faltan jugadores disponibles ({'porteros' if huecos == 1 else 'de campo'}) "
+                          f"para cubrir {int(capacidad - totales.sum())} minutos")
+        plan[grupo] = repartir_jornadas(totales, n_jornadas, t_partido)
+    return plan, avisos
+
+
+# --- COINCIDENCIAS EN EL CAMPO ---
+# Solo tenemos minutos T/S por jornada, así que estimamos los intervalos:
+# el titular juega [0, T] y el suplente [t_partido - S, t_partido].
+# Con eso el solape de cada pareja en una jornada sale sin bucles:
+#   titular-titular   -> min(T_i, T_j)
+#   suplente-suplente -> min(S_i, S_j)
+#   titular-suplente  -> max(0, T_i + S_j - t_partido)
+@telemetria.cache_medida("coincidencias", cache_por_club())
+def matriz_coincidencias(club, equipo, version_datos, rango, t_partido, _acumulados):
+    i_ini, i_fin = _indices_rango(_acumulados['jornadas'], rango)
+    por_jornada = np.diff(_acumulados['acum'][:, :, i_ini:i_fin + 1], axis=2).astype(np.float32)
+    tit = por_jornada[COLS_ACUMULADAS.index('T')]
+    sup = por_jornada[COLS_ACUMULADAS.index('S')]
+
+    # Partidos juntos: producto matricial de la matriz binaria Jugador x Jornada
+    jugado = ((tit + sup) > 0).astype(np.float32)
+    partidos_juntos = jugado @ jugado.T
+
+    # Minutos juntos: broadcasting Jugador x Jugador x Jornada
+    cruce = np.maximum(tit[:, None, :] + sup[None, :, :] - t_partido, 0).sum(axis=2)
+    minutos_juntos = (np.minimum(tit[:, None, :], tit[None, :, :]).sum(axis=2)
+                      + np.minimum(sup[:, None, :], sup[None, :, :]).sum(axis=2)
+                      + cruce + cruce.T)
+    # En la diagonal, los minutos propios del jugador
+    np.fill_diagonal(minutos_juntos, (tit + sup).sum(axis=1))
+
+    nombres = _acumulados['nombres']
+    return (pd.DataFrame(partidos_juntos.astype(int), index=nombres, columns=nombres),
+            pd.DataFrame(minutos_juntos.round().astype(int), index=nombres, columns=nombres))
+
+
+def parejas_coincidencias(partidos_juntos, minutos_juntos):
+    # Formato largo (una fila por pareja) usando el triángulo superior
+    i, j = np.triu_indices(len(partidos_juntos), k=1)
+    nombres = partidos_juntos.index.to_numpy()
+    return pd.DataFrame({
+        'Jugador A': nombres[i],
+        'Jugador B': nombres[j],
+        'Partidos juntos': partidos_juntos.to_numpy()[i, j],
+        'Minutos juntos (est.)': minutos_juntos.to_numpy()[i, j],
+    }).sort_values('Minutos juntos (est.)', ascending=False)
+
+
+# --- CABECERA (TÍTULO + KPIs) ---
+# Se pinta en un hueco fijo: primero con la foto de arranque y luego con los datos reales
+def mostrar_cabecera(hueco, equipo, kpis, nota=None):
+    with hueco.container():
+        st.title(f"Informe: {equipo}")
+        # Siempre la misma estructura: así el segundo pintado sustituye al primero elemento a elemento
+        st.caption(nota or "")
+        kpi1, kpi2, kpi3, kpi4, kpi5, kpi6 = st.columns(6)
+        kpi1.metric("Goles a Favor", kpis['Goles a Favor'])
+        kpi2.metric("Goles en Contra", kpis['Goles en Contra'])
+        kpi3.metric("Tarjetas Amarillas", kpis['Tarjetas Amarillas'])
+        kpi4.metric("Plantilla", f"{kpis['Plantilla']} jug.")
+        kpi5.metric("Jornadas ", kpis['Jornada actual'])
+        kpi6.metric("Partidos Jugados ", kpis['Partidos Jugados'])
+
+
+# --- REFRESCOS EN SEGUNDO PLANO ---
+# Las hojas abiertas se vuelven a publicar en memoria compartida antes de que caduquen
+# (refrescos.py reparte los turnos entre clubes)
+INTERVALO_REFRESCO = TTL_DATOS * 0.8
+
+@st.cache_resource
+def planificador_refrescos():
+    return PlanificadorRefrescos(intervalo=INTERVALO_REFRESCO)
+
+def refrescar_hoja(club, gid, nombre_equipo):
+    memoria_compartida.obtener_o_publicar(clave_hoja(club, gid), INTERVALO_REFRESCO,
+                                          lambda: leer_y_archivar(club, gid))
+    evaluar_alertas(club, nombre_equipo, gid)
+
+
+# --- ALERTAS DEL CLUB ---
+# Reglas de alertas.py sobre el equipo recién refrescado, solo si sus datos cambiaron
+# desde la última evaluación. El estado de alertas.py guarda el resto del club.
+@st.cache_resource
+def versiones_alertas():
+    # club -> {equipo: versión de los datos ya evaluada}
+    return {}
+
+def evaluar_alertas(club, nombre_equipo, gid_equipo):
+    res = cargar_datos_equipo(club, nombre_equipo, gid_equipo)
+    evaluadas = versiones_alertas().setdefault(club, {})
+    if res[-1] is not None or evaluadas.get(nombre_equipo) == res[5]:
+        return []
+    df_long_eq, df_stats_eq, version_eq = res[0], res[1], res[5]
+    acum = construir_acumulados(club, nombre_equipo, version_eq, df_long_eq, df_stats_eq)
+    # Valores por jornada a partir de las sumas acumuladas (filas en el orden de df_stats)
+    convocatorias = np.diff(acum['acum'][COLS_ACUMULADAS.index('C_NC')], axis=1)
+    jornadas_activas = np.diff(acum['activas_acum']) > 0
+    tabla = tabla_equipo(club, nombre_equipo, df_stats_eq, convocatorias, jornadas_activas)
+    nuevas = procesar_alertas(club, tabla, {nombre_equipo: version_eq})
+    evaluadas[nombre_equipo] = version_eq
+    return nuevas
+
+
+# --- DATOS DE TODO EL CLUB ---
+# Todos los equipos y las temporadas de archivo, para las secciones que miran el club
+# entero. versiones sirve de clave de caché de lo que se calcule con ellos.
+def datos_club(club):
+    datos, versiones = {}, []
+    for nombre_equipo, gid_equipo in {**clubes[club]['equipos'], **clubes[club]['archivo']}.items():
+        res = cargar_datos_equipo(club, nombre_equipo, gid_equipo)
+        if res[-1] is None:
+            datos[nombre_equipo] = (res[0], res[1], res[3], res[4], res[5])
+            versiones.append((nombre_equipo, res[5]))
+    return datos, tuple(versiones)
+
+
+@telemetria.cache_medida("tabla_larga_club", cache_por_club())
+def tabla_larga_club(club, versiones, _datos_equipos):
+    # df_long de todos los equipos con una columna Equipo (solo filas de jugadores)
+    partes = []
+    for nombre_equipo, (df_long_eq, df_stats_eq, *_) in _datos_equipos.items():
+        filas = df_long_eq[df_long_eq['Nombre'].isin(df_stats_eq['Nombre'])]
+        partes.append(filas[['Nombre', 'Posición', 'Jornada'] + COLS_ACUMULADAS].assign(Equipo=nombre_equipo))
+    tabla = pd.concat(partes, ignore_index=True)
+    tabla['Jornada'] = tabla['Jornada'].astype(int)
+    return tabla[['Equipo'] + tabla.columns[:-1].tolist()]
+
+
+# --- PAQUETE SIN CONEXIÓN ---
+# Temporada actual de todos los equipos (sin archivo) en un fichero para las tablets
+@telemetria.cache_medida("paquete", cache_por_club())
+def exportar_paquete(club, versiones, _equipos):
+    return exportar(club, clubes[club]['nombre'], _equipos)
+
+def paquete_club(club):
+    equipos = {}
+    for nombre_equipo, gid_equipo in clubes[club]['equipos'].items():
+        res = cargar_datos_equipo(club, nombre_equipo, gid_equipo)
+        if res[-1] is None:
+            equipos[nombre_equipo] = {'gid': gid_equipo, 'df_long': res[0], 'df_stats': res[1], 'jornada': res[2],
+                                      'partidos': res[3], 't_partido': res[4], 'version': res[5]}
+    if not equipos:
+        return None
+    return exportar_paquete(club, tuple((n, e['version']) for n, e in equipos.items()), equipos)
 
 
 # --- INTERFAZ ---
 st.sidebar.image("https://cdn-icons-png.flaticon.com/512/53/53283.png", width=100)
 st.sidebar.title("Panel Técnico")
+if len(clubes) > 1:
+    st.sidebar.caption(clubes[id_club]['nombre'])
 
 
 # 1. SELECTOR DE EQUIPO
 equipo_seleccionado = st.sidebar.selectbox("Seleccionar Equipo", lista_equipos)
+gid_seleccionado = lista_equipos[equipo_seleccionado]
+
+if paquete is not None:
+    st.sidebar.info("📦 Sin conexión · datos del "
+                    + time.strftime('%d/%m/%Y %H:%M', time.localtime(paquete.manifiesto['fecha'])))
+else:
+    # inmediato: la primera vez solo mapea lo recién cargado y evalúa las alertas del equipo
+    planificador_refrescos().registrar(id_club, gid_seleccionado,
+                                       lambda club=id_club, gid=gid_seleccionado, nombre=equipo_seleccionado:
+                                       refrescar_hoja(club, gid, nombre), inmediato=True)
+    # Clubes que ya no están en clubes.toml: sus tareas no se vuelven a programar
+    for club_retirado in set(planificador_refrescos().clubes()) - set(clubes):
+        planificador_refrescos().eliminar(club_retirado)
+
+    if st.sidebar.button("🔄 Actualizar Datos"):
+        # Solo las cachés de este club: el resto de clubes no lo nota
+        CACHE.limpiar(id_club)
+        for gid_equipo in lista_equipos.values():
+            memoria_compartida.invalidar(clave_hoja(id_club, gid_equipo))
+        st.rerun()
+
+    with st.sidebar.expander("🔔 Alertas del club"):
+        ultimas_alertas = leer_alertas(id_club, n=10)
+        for alerta in ultimas_alertas:
+            st.caption(f"{alerta['fecha']} · {alerta['mensaje']}")
+        if not ultimas_alertas:
+            st.caption("Sin alertas recientes")
+
+    # Paquete para las tablets: se prepara solo si se pide (carga todos los equipos)
+    if st.sidebar.button("📦 Preparar paquete sin conexión"):
+        datos_paquete_club = paquete_club(id_club)
+        if datos_paquete_club is None:
+            st.sidebar.warning("No se ha podido cargar ningún equipo del club")
+        else:
+            st.sidebar.download_button("⬇️ Descargar paquete", datos_paquete_club,
+                                       file_name=f"{id_club}_{time.strftime('%Y%m%d')}.paquete",
+                                       mime="application/zip", on_click="ignore")
 
-if st.sidebar.button("🔄 Actualizar Datos"):
-    st.cache_data.clear()
-    st.rerun()
 
+# --- PRIMER PINTADO ---
+# Si hay foto de la última carga, los KPIs salen antes de conectar con Sheets
+cabecera = st.empty()
+marcas_arranque = {}  # Tiempos desde el inicio del script (benchmark de arranque)
+arranque_previo = leer_arranque(clave_hoja(id_club, gid_seleccionado))
+if arranque_previo:
+    mostrar_cabecera(cabecera, equipo_seleccionado, arranque_previo['kpis'],
+                     nota="⏳ Mostrando la última carga mientras se actualizan los datos...")
+    marcas_arranque['primer_pintado'] = time.perf_counter() - _T0
 
 # Cargar datos
-df_full, df_stats, jornada_actual, partidos_jugados, t_partido, error = cargar_datos_equipo(equipo_seleccionado,lista_equipos[equipo_seleccionado])
+df_full, df_stats, jornada_actual, partidos_jugados, t_partido, version_datos, datos_de, error = cargar_datos_equipo(id_club, equipo_seleccionado, gid_seleccionado)
 
 if error:
+    cabecera.empty()
     st.error(error)
+    st.stop()
 else:
+    # --- RANGO DE JORNADAS ---
+    # Todas las gráficas usan df_stats, así que basta con sustituirlo por el del rango
+    cubo_kpi = construir_cubo_kpi(id_club, equipo_seleccionado, version_datos, df_full, df_stats)
+    acumulados = construir_acumulados(id_club, equipo_seleccionado, version_datos, df_full, df_stats)
+    jornadas_disp = [int(j) for j in cubo_kpi['jornadas'] if j > 0]
+    rango = None
+    if len(jornadas_disp) > 1:
+        rango_sel = st.sidebar.slider("Rango de jornadas", jornadas_disp[0], jornadas_disp[-1],
+                                      (jornadas_disp[0], jornadas_disp[-1]))
+        if rango_sel != (jornadas_disp[0], jornadas_disp[-1]):
+            rango = rango_sel
+            df_stats = stats_rango(acumulados, rango, t_partido)
+            st.caption(f"Estadísticas de la J{rango[0]} a la J{rango[1]}")
+
+    # Los KPIs salen del cubo precalculado (sin filtrar df_stats en cada rerun)
+    kpis = kpis_equipo(cubo_kpi, rango)
+    # jornada_actual y partidos_jugados siguen siendo los de la temporada (directo,
+    # proyección, planificador y racha); con rango, df_stats cuenta solo sus partidos
+    partidos_rango = kpis['Partidos Jugados']
+
     # --- ENCABEZADO Y KPIs ---
-    st.title(f"Informe: {equipo_seleccionado}")
-    
-    kpi1, kpi2, kpi3, kpi4, kpi5, kpi6 = st.columns(6)
-    kpi1.metric("Goles a Favor", int(df_stats[df_stats['Posición'] != 'Portero']['Goles'].sum()))
-    kpi2.metric("Goles en Contra", int(df_stats[df_stats['Posición'] == 'Portero']['Goles'].sum()))
-    kpi3.metric("Tarjetas Amarillas", int(df_stats['Amarillas'].sum()))
-    kpi4.metric("Plantilla", f"{len(df_stats)} jug.")
-    kpi5.metric("Jornadas ", jornada_actual)
-    kpi6.metric("Partidos Jugados ", partidos_jugados)
+    mostrar_cabecera(cabecera, equipo_seleccionado, kpis)
+    if datos_de is not None:
+        # Respaldo: cargar_datos_equipo lo vuelve a intentar cuando caduque su TTL
+        st.warning(f"⚠️ Google Sheets no responde. Mostrando la última carga buena (de hace {hace_cuanto(datos_de)}).")
+    if rango is None and paquete is None:
+        guardar_arranque(clave_hoja(id_club, gid_seleccionado), version_datos, kpis)
+    marcas_arranque['kpis'] = time.perf_counter() - _T0
+    marcas_arranque.setdefault('primer_pintado', marcas_arranque['kpis'])
+
+    with st.expander("📋 Desglose por posición"):
+        st.dataframe(desglose_posiciones(cubo_kpi, rango), use_container_width=True)
+
+    # --- RESUMEN DEL CLUB ---
+    # Solo se cargan el resto de equipos si se pide (cada hoja va a su propia caché)
+    if st.sidebar.checkbox("🏟️ Resumen del club"):
+        filas_club = {}
+        for nombre_equipo, gid_equipo in lista_equipos.items():
+            res = cargar_datos_equipo(id_club, nombre_equipo, gid_equipo)
+            if res[-1] is None:
+                filas_club[nombre_equipo] = kpis_equipo(construir_cubo_kpi(id_club, nombre_equipo, res[5], res[0], res[1]), rango)
+        st.subheader("🏟️ Resumen del Club")
+        st.dataframe(pd.DataFrame.from_dict(filas_club, orient='index'), use_container_width=True)
 
     st.markdown("---")
 
 
+tramos.marca("cabecera")
+
+# Importaciones pesadas de gráficos, ya con la cabecera en pantalla
+import plotly.express as px
+import plotly.graph_objects as go
+tramos.marca("importaciones")
+
+# --- SECCIÓN: PARTIDO EN DIRECTO ---
+# El fragmento se repite cada segundo sin relanzar el resto del script. Solo lee el
+# estado compartido del proceso: la hoja la consulta el sondeo, no cada sesión.
+@st.fragment(run_every=1)
+def panel_directo(club, equipo, gid, jornada, version_datos, acumulados, df_stats_base, t_partido):
+    # Cada repintado renueva la tarea: si nadie mira el directo, el sondeo se para solo
+    planificador_directo().registrar(club, ('directo', gid, jornada),
+                                     lambda: sondear_jornada(club, gid, jornada), inmediato=True)
+    directo = estado_directo().leer((club, gid, jornada))
+    if directo['datos'] is None:
+        if directo['error']:
+            st.warning(f"⚠️ No se puede leer la J{jornada}: {directo['error']}")
+        else:
+            st.info(f"Conectando con la J{jornada}...")
+        return
+
+    df_vivo, df_jornada, partidos_vivo = stats_en_directo(club, equipo, version_datos, jornada, directo['version'],
+                                                          t_partido, acumulados, directo['datos'])
+    partidos_base = int(acumulados['activas_acum'][-1])
+    antes = kpis_desde_stats(df_stats_base, partidos_base)
+    ahora = kpis_desde_stats(df_vivo, partidos_vivo)
+
+    aviso = f" · ⚠️ último sondeo fallido: {directo['error']}" if directo['error'] else ""
+    st.caption(f"🔴 J{jornada} en directo · leída hace {hace_cuanto(directo['leido'])}{aviso}")
+    cols_directo = st.columns(len(ahora))
+    for col, (nombre, valor) in zip(cols_directo, ahora.items()):
+        col.metric(nombre, valor, delta=valor - antes[nombre] or None)
+
+    col_dir1, col_dir2 = st.columns([2, 1])
+    with col_dir1:
+        en_campo = df_jornada[df_jornada['Minutos totales'] > 0].sort_values('Minutos totales', ascending=False)
+        fig_dir = go.Figure()
+        fig_dir.add_trace(go.Bar(name='Titular', x=en_campo['Nombre'], y=en_campo['Minutos titular'], marker_color='#2ecc71'))
+        fig_dir.add_trace(go.Bar(name='Suplente', x=en_campo['Nombre'], y=en_campo['Minutos suplente'], marker_color='#f39c12'))
+        fig_dir.update_layout(barmode='stack', title=f"Minutos en la J{jornada}", template="plotly_dark",
+                              yaxis=dict(range=[0, t_partido]), height=350)
+        st.plotly_chart(fig_dir, use_container_width=True)
+    with col_dir2:
+        # Semáforo: quién cambia de franja con los minutos de hoy
+        cambios = pd.DataFrame({
+            'Nombre': df_vivo['Nombre'],
+            'Antes': df_stats_base.set_index('Nombre')['Rol_jugador'].reindex(df_vivo['Nombre']).astype(str).to_numpy(),
+            'Ahora': df_vivo['Rol_jugador'].astype(str).to_numpy(),
+            '% Jugado (Disp)': df_vivo['% Jugado (Disp)'].round(1).to_numpy(),
+        })
+        cambios = cambios[cambios['Antes'] != cambios['Ahora']]
+        st.markdown("**🚦 Cambios de semáforo**")
+        if cambios.empty:
+            st.caption("Nadie cambia de franja con los minutos de hoy")
+        else:
+            st.dataframe(cambios, use_container_width=True, hide_index=True)
+        recuento = df_vivo['Rol_jugador'].astype(str).value_counts()
+        st.caption(" · ".join(f"{etiqueta}: {recuento.get(etiqueta, 0)}" for etiqueta in ETIQUETAS_SEMAFORO))
+
+if paquete is None and st.sidebar.checkbox("🔴 Partido en directo"):
+    # Por defecto, la jornada siguiente a la última jugada (si la hoja ya la tiene)
+    jornada_directo = st.sidebar.number_input("Jornada en juego", 1, 60,
+                                              int(jornada_actual) + 1 if int(jornada_actual) + 1 in jornadas_disp
+                                              else max(int(jornada_actual), 1))
+    st.subheader("🔴 Partido en Directo")
+    panel_directo(id_club, equipo_seleccionado, gid_seleccionado, int(jornada_directo), version_datos,
+                  acumulados, stats_rango(acumulados, None, t_partido), t_partido)
+    st.markdown("---")
+tramos.marca("directo")
+
 # --- SECCIÓN: DISTRIBUCIÓN DE MINUTOS Y PARTIDOS ---
 st.subheader("📊 Distribución de la Plantilla (Titular vs Suplente)")
 
-# Calculamos los Partidos de Suplente (Total Jugados - Titularidades)
-# Aseguramos que existan las columnas con los nombres correctos (revisa tu rename anterior)
-df_stats['Partidos suplente'] = df_stats['Jugados'] - df_stats['Titular']
+# Los Partidos de Suplente (Total Jugados - Titularidades) vienen del registro de métricas
 
 # Creamos dos pestañas para separar Minutos de Partidos
 tab1, tab2 = st.tabs(["⏱️ Minutos", "⚽ Partidos"])
@@ -276,14 +1057,7 @@ with tab2:
     # --- SECCIÓN 1: SEMÁFORO DE MINUTOS ---
     st.subheader("🚦 Estado de la Plantilla (Minutos Jugados)")
     
-    # Clasificación
-    df_stats['Rol_jugador'] = pd.cut(df_stats['% Jugado (Disp)'], 
-                             bins=[-1, 30, 70, 1000], 
-                             labels=['Rojo (<30%)', 'Naranja (30-70%)', 'Verde (>70%)'])
-    
-    df_stats['Rol_jugador_equipo'] = pd.cut(df_stats['% Jugado (Total)'], 
-                             bins=[-1, 30, 70, 1000], 
-                             labels=['Rojo (<30%)', 'Naranja (30-70%)', 'Verde (>70%)'])
+    # Clasificación: Rol_jugador y Rol_jugador_equipo son umbrales del registro de métricas
     
     col_sem1, col_sem2 = st.columns([2, 1])
     
@@ -350,6 +1124,28 @@ with tab2:
                          template="plotly_dark", hole=0.4)
         st.plotly_chart(fig_rol, use_container_width=True)
 
+    # --- PROYECCIÓN FIN DE TEMPORADA ---
+    st.subheader("🔮 Proyección a Final de Temporada")
+    col_proy1, col_proy2 = st.columns(2)
+    with col_proy1:
+        objetivo_pct = st.number_input("Objetivo mínimo del club (% de minutos de la temporada)", 0, 100, 30)
+    with col_proy2:
+        # Por defecto, todas las jornadas que tiene la hoja (las futuras van vacías)
+        jornadas_hoja = int((acumulados['jornadas'] > 0).sum())
+        jornadas_temporada = st.number_input("Jornadas de la temporada", partidos_jugados, 60,
+                                             max(jornadas_hoja, partidos_jugados))
+
+    df_proy = proyectar_minutos(id_club, equipo_seleccionado, version_datos, t_partido, jornadas_temporada,
+                                objetivo_pct, acumulados)
+    fig_proy = px.bar(df_proy.sort_values('Prob. objetivo'), x='Nombre', y='Prob. objetivo',
+                      color='Prob. objetivo', color_continuous_scale='RdYlGn', range_color=[0, 100],
+                      hover_data=['% Jugado (Total)', '% Convocado', 'Proyección P50'],
+                      title=f"Probabilidad de llegar al {objetivo_pct}% de los minutos de la temporada",
+                      labels={'Prob. objetivo': 'Probabilidad (%)'}, template="plotly_dark")
+    st.plotly_chart(fig_proy, use_container_width=True)
+    with st.expander("Ver detalle de la proyección"):
+        st.dataframe(df_proy, use_container_width=True, hide_index=True)
+
 
     st.markdown("---")
 
@@ -378,6 +1174,240 @@ with tab2:
         else:
             st.info("Equipo limpio: 0 tarjetas.")
 
+tramos.marca("distribucion")
+
+# --- SECCIÓN: COINCIDENCIAS EN EL CAMPO ---
+st.markdown("---")
+st.subheader("🤝 Coincidencias en el Campo")
+
+partidos_juntos, minutos_juntos = matriz_coincidencias(id_club, equipo_seleccionado, version_datos, rango, t_partido, acumulados)
+
+col_coin1, col_coin2, col_coin3 = st.columns([2, 1, 1])
+with col_coin1:
+    # Por defecto, los jugadores con más minutos para que el mapa sea legible
+    top_minutos = df_stats.sort_values('Minutos totales', ascending=False)['Nombre'].head(16).tolist()
+    jugadores_coin = st.multiselect("Jugadores", partidos_juntos.index.tolist(), default=top_minutos)
+with col_coin2:
+    vista_coin = st.radio("Mostrar", ["Minutos juntos (est.)", "Partidos juntos"], horizontal=True)
+with col_coin3:
+    # Sin jugadores o sin partidos compartidos el slider no tendría recorrido (0..0)
+    max_partidos_coin = int(partidos_juntos.to_numpy().max()) if partidos_juntos.size else 0
+    if max_partidos_coin > 0:
+        min_partidos_coin = st.slider("Mínimo de partidos juntos", 0, max_partidos_coin, 0)
+    else:
+        min_partidos_coin = 0
+        st.info("Todavía no hay partidos jugados juntos")
+
+if jugadores_coin:
+    matriz_coin = minutos_juntos if vista_coin == "Minutos juntos (est.)" else partidos_juntos
+    matriz_coin = matriz_coin.loc[jugadores_coin, jugadores_coin]
+    # Las parejas por debajo del mínimo se ocultan (la diagonal se mantiene)
+    filtro_coin = ((partidos_juntos.loc[jugadores_coin, jugadores_coin].to_numpy() >= min_partidos_coin)
+                   | np.eye(len(jugadores_coin), dtype=bool))
+    fig_coin = px.imshow(matriz_coin.where(filtro_coin), text_auto=True, color_continuous_scale='Viridis',
+                         template="plotly_dark", title=f"{vista_coin} por pareja", aspect='auto')
+    st.plotly_chart(fig_coin, use_container_width=True)
+
+    parejas = parejas_coincidencias(partidos_juntos.loc[jugadores_coin, jugadores_coin],
+                                    minutos_juntos.loc[jugadores_coin, jugadores_coin])
+    st.dataframe(parejas[parejas['Partidos juntos'] >= min_partidos_coin], use_container_width=True, hide_index=True)
+    st.caption("*Minutos estimados: el titular juega desde el minuto 0 y el suplente hasta el final del partido")
+
+tramos.marca("coincidencias")
+
+# --- SECCIÓN: EVENTOS DE PARTIDO (MINUTO A MINUTO) ---
+# Opcional: con los eventos de eventos.py (cambios, goles y tarjetas con su minuto)
+# salen los datos que la hoja no tiene: +/- en el campo, minutos reales con cada
+# compañero y goles por fase. Los minutos T/S se concilian con los de la hoja.
+@telemetria.cache_medida("eventos", cache_por_club())
+def analisis_eventos(club, equipo, version_datos, version_ev, rango, t_partido, clave, _df_long, _nombres):
+    eventos_equipo = eventos.leer_eventos(clave)
+    if rango is not None:
+        eventos_equipo = eventos_equipo[eventos_equipo['jornada'].between(*rango)]
+    analisis = eventos.analizar_eventos(eventos_equipo, _nombres, t_partido)
+    jornadas_alineacion = eventos_equipo.loc[eventos_equipo['tipo'] == 'titular', 'jornada'].unique()
+    analisis['conciliacion'] = eventos.conciliar(analisis['minutos_jornada'], _df_long, _nombres, jornadas_alineacion)
+    analisis['jornadas'] = np.sort(eventos_equipo['jornada'].unique())
+    analisis['n_eventos'] = len(eventos_equipo)
+    return analisis
+
+st.markdown("---")
+st.subheader("⏱️ Eventos de Partido (Minuto a Minuto)")
+clave_eventos = clave_hoja(id_club, gid_seleccionado)
+nombres_plantilla = df_stats['Nombre'].tolist()
+
+# En modo sin conexión solo se consulta (no se apuntan eventos)
+if paquete is None:
+    with st.expander("📥 Apuntar eventos"):
+        st.caption("CSV con columnas jornada, minuto, tipo, jugador. Tipos: " + ", ".join(eventos.TIPOS)
+                   + ". Subir una jornada que ya estaba la sustituye entera.")
+        csv_eventos = st.file_uploader("Eventos de uno o varios partidos (CSV)", type="csv")
+        if csv_eventos is not None and st.button("Guardar eventos del CSV"):
+            try:
+                nuevos = eventos.validar_eventos(pd.read_csv(csv_eventos, dtype=str, keep_default_na=False),
+                                                 nombres_plantilla, t_partido)
+                eventos.guardar_eventos(clave_eventos, nuevos)
+                st.success(f"Guardados {len(nuevos)} eventos de {nuevos['jornada'].nunique()} jornada(s)")
+            except ValueError as e:
+                st.error(f"El CSV tiene errores: {e}")
+
+        with st.form("evento_suelto", clear_on_submit=True):
+            col_ev1, col_ev2, col_ev3, col_ev4 = st.columns(4)
+            jornada_ev = col_ev1.number_input("Jornada", 1, 60, max(int(jornada_actual), 1))
+            minuto_ev = col_ev2.number_input("Minuto", 0, int(t_partido) + 15, 0)
+            tipo_ev = col_ev3.selectbox("Tipo", eventos.TIPOS)
+            jugador_ev = col_ev4.selectbox("Jugador", [""] + nombres_plantilla)
+            if st.form_submit_button("Añadir evento"):
+                try:
+                    nuevo = eventos.validar_eventos(pd.DataFrame([{'jornada': jornada_ev, 'minuto': minuto_ev,
+                                                                   'tipo': tipo_ev, 'jugador': jugador_ev}]),
+                                                    nombres_plantilla, t_partido)
+                    eventos.guardar_eventos(clave_eventos, nuevo, reemplazar_jornadas=False)
+                    st.success("Evento añadido")
+                except ValueError as e:
+                    st.error(str(e))
+
+version_ev = eventos.version_eventos(clave_eventos)
+if version_ev is None:
+    st.info("No hay eventos de esta hoja. Con las entradas, salidas y goles de cada partido se calcula "
+            "el +/- de cada jugador y los minutos reales con cada compañero.")
+else:
+    analisis = analisis_eventos(id_club, equipo_seleccionado, version_datos, version_ev, rango, t_partido,
+                                clave_eventos, df_full, nombres_plantilla)
+    kpi_ev1, kpi_ev2, kpi_ev3 = st.columns(3)
+    kpi_ev1.metric("Jornadas con eventos", len(analisis['jornadas']))
+    kpi_ev2.metric("Eventos", analisis['n_eventos'])
+    kpi_ev3.metric("Descuadres con la hoja (T/S)", len(analisis['conciliacion']))
+
+    tab_mas_menos, tab_parejas, tab_fases, tab_conciliacion = st.tabs(
+        ["+/- en el campo", "Minutos con compañeros", "Goles por fase", "Conciliación con la hoja"])
+    with tab_mas_menos:
+        tabla_ev = analisis['jugadores']
+        st.dataframe(tabla_ev[tabla_ev['Minutos (eventos)'] > 0].sort_values('+/-', ascending=False),
+                     use_container_width=True, hide_index=True)
+    with tab_parejas:
+        parejas_ev = analisis['parejas']
+        con_minutos = parejas_ev.index[np.diag(parejas_ev.to_numpy()) > 0].tolist()
+        fig_parejas = px.imshow(parejas_ev.loc[con_minutos, con_minutos], text_auto=True,
+                                color_continuous_scale='Viridis', template="plotly_dark",
+                                title="Minutos juntos en el campo (según los eventos)", aspect='auto')
+        st.plotly_chart(fig_parejas, use_container_width=True)
+    with tab_fases:
+        fig_fases = go.Figure()
+        fig_fases.add_trace(go.Bar(name='A favor', x=analisis['fases'].index, y=analisis['fases']['Goles a favor'],
+                                   marker_color='#2ecc71'))
+        fig_fases.add_trace(go.Bar(name='En contra', x=analisis['fases'].index, y=analisis['fases']['Goles en contra'],
+                                   marker_color='#e74c3c'))
+        fig_fases.update_layout(barmode='group', title="Goles por fase del partido", template="plotly_dark")
+        st.plotly_chart(fig_fases, use_container_width=True)
+        st.dataframe(analisis['fases'], use_container_width=True)
+    with tab_conciliacion:
+        if analisis['conciliacion'].empty:
+            st.success("Los minutos de titular y suplente de los eventos cuadran con la hoja")
+        else:
+            st.warning("Estos minutos no cuadran con la hoja (tolerancia de 1'): revisa los eventos o la hoja")
+            st.dataframe(analisis['conciliacion'], use_container_width=True, hide_index=True)
+
+tramos.marca("eventos")
+
+# --- SECCIÓN: PLANIFICADOR DE MINUTOS ---
+st.markdown("---")
+st.subheader("⚖️ Planificador de Minutos (Reparto Equitativo)")
+st.caption("Propuesta para las próximas jornadas que acerca a todos al mismo total de minutos "
+           "(política de minutos iguales de Infantil y Cadete)")
+
+col_plan1, col_plan2 = st.columns(2)
+with col_plan1:
+    n_jornadas_plan = st.slider("Próximas jornadas a planificar", 1, 10, 3)
+with col_plan2:
+    en_campo = st.number_input("Jugadores en el campo", 5, 11, 11)
+
+# El entrenador marca quién está disponible; cada cambio recalcula el plan al momento
+df_disp = df_stats[['Nombre', 'Posición', 'Minutos totales']].copy()
+df_disp.insert(0, 'Disponible', True)
+df_disp = st.data_editor(df_disp, hide_index=True, use_container_width=True, key=f"disp_{equipo_seleccionado}",
+                         disabled=['Nombre', 'Posición', 'Minutos totales'])
+df_plan = df_disp[df_disp['Disponible']].reset_index(drop=True)
+
+if not df_plan.empty:
+    plan, avisos_plan = planificar_minutos(df_plan, n_jornadas_plan, t_partido, en_campo)
+    for aviso in avisos_plan:
+        st.warning(aviso)
+
+    cols_plan = [f"J{jornada_actual + k + 1}" for k in range(n_jornadas_plan)]
+    tabla_plan = pd.DataFrame(plan, columns=cols_plan)
+    tabla_plan.insert(0, 'Nombre', df_plan['Nombre'])
+    tabla_plan.insert(1, 'Posición', df_plan['Posición'])
+    tabla_plan['Total plan'] = plan.sum(axis=1)
+
+    # % sobre los minutos del equipo al terminar el plan (antes y después)
+    # 'Minutos totales' viene de df_stats, así que se compara con los partidos del rango
+    min_equipo_antes = max(partidos_rango * t_partido, 1)
+    min_equipo_despues = max((partidos_rango + n_jornadas_plan) * t_partido, 1)
+    tabla_plan['% Total antes'] = (df_plan['Minutos totales'] / min_equipo_antes * 100).round(1)
+    tabla_plan['% Total después'] = ((df_plan['Minutos totales'] + tabla_plan['Total plan']) / min_equipo_despues * 100).round(1)
+    st.dataframe(tabla_plan, use_container_width=True, hide_index=True)
+
+    fig_plan = go.Figure()
+    fig_plan.add_trace(go.Bar(name='Antes', x=tabla_plan['Nombre'], y=tabla_plan['% Total antes'], marker_color='#95a5a6'))
+    fig_plan.add_trace(go.Bar(name='Después del plan', x=tabla_plan['Nombre'], y=tabla_plan['% Total después'], marker_color='#2ecc71'))
+    fig_plan.update_layout(barmode='group', title="% de minutos del equipo antes y después del plan",
+                           yaxis_title="% Minutos", template="plotly_dark")
+    st.plotly_chart(fig_plan, use_container_width=True)
+
+tramos.marca("planificador")
+
+# --- SECCIÓN: HISTORIAL DE CAMBIOS ---
+# Qué se ha corregido en la hoja entre dos versiones guardadas (historial.py).
+# Las versiones no cambian nunca, así que la comparación se cachea sin caducidad.
+@telemetria.cache_medida("historial", cache_por_club())
+def comparar_historial(club, clave, fichero_a, fichero_b):
+    return historial.comparar_versiones(clave, fichero_a, fichero_b)
+
+st.markdown("---")
+st.subheader("🕓 Historial de Cambios en la Hoja")
+clave_historial = clave_hoja(id_club, gid_seleccionado)
+versiones_hoja = historial.listar_versiones(clave_historial)
+if len(versiones_hoja) < 2:
+    st.info("Todavía no hay dos versiones guardadas de esta hoja: los cambios aparecerán tras la próxima edición.")
+else:
+    etiquetas_version = {
+        v['fichero']: f"{time.strftime('%d/%m/%Y %H:%M', time.localtime(v['fecha']))} · {v['version'][:7]}"
+        for v in versiones_hoja
+    }
+    ficheros_version = list(etiquetas_version)
+    col_hist1, col_hist2 = st.columns(2)
+    with col_hist1:
+        version_a = st.selectbox("Versión anterior", ficheros_version, index=len(ficheros_version) - 2,
+                                 format_func=etiquetas_version.get)
+    with col_hist2:
+        version_b = st.selectbox("Versión nueva", ficheros_version, index=len(ficheros_version) - 1,
+                                 format_func=etiquetas_version.get)
+
+    celdas, cambios_jugador, cambios_totales, altas, bajas = comparar_historial(id_club, clave_historial,
+                                                                                 version_a, version_b)
+    kpi_h1, kpi_h2, kpi_h3, kpi_h4 = st.columns(4)
+    kpi_h1.metric("Celdas cambiadas", len(celdas))
+    kpi_h2.metric("Jugadores afectados", len(cambios_jugador))
+    kpi_h3.metric("Jornadas tocadas", celdas['Jornada'].nunique())
+    kpi_h4.metric("Altas / Bajas", f"{len(altas)} / {len(bajas)}")
+
+    if celdas.empty and not altas and not bajas:
+        st.success("Las dos versiones son iguales")
+    else:
+        netos = [f"{stat} {delta:+g}" for stat, delta in cambios_totales.items() if delta]
+        if netos:
+            st.caption("Cambio neto en los totales del equipo: " + ", ".join(netos))
+        if altas or bajas:
+            st.caption(f"Altas: {', '.join(n for n, _ in altas) or '-'} · Bajas: {', '.join(n for n, _ in bajas) or '-'}")
+        tab_celdas, tab_jugadores = st.tabs(["Celdas cambiadas", "Cambio por jugador"])
+        with tab_celdas:
+            st.dataframe(celdas, use_container_width=True, hide_index=True)
+        with tab_jugadores:
+            st.dataframe(cambios_jugador, use_container_width=True, hide_index=True)
+
+tramos.marca("historial")
+
 # --- SECCIÓN 3: DETALLE JUGADOR ---
 st.markdown("---")
 jugador = st.selectbox("🔍 Analizar Jugador Específico", df_stats["Nombre"])
@@ -388,6 +1418,8 @@ if jugador:
     
     # ORDEN: Aseguramos que las jornadas salgan en orden (1, 2, 3...)
     datos_jugador = datos_jugador.sort_values('Jornada')
+    if rango is not None:
+        datos_jugador = datos_jugador[datos_jugador['Jornada'].between(*rango)]
 
     fig_evo = go.Figure()
     fig_evo.add_trace(go.Bar(name='Titular', x=datos_jugador['Jornada'], y=datos_jugador['T'], marker_color='#2ecc71'))
@@ -404,6 +1436,8 @@ if jugador:
     
     st.plotly_chart(fig_evo, use_container_width=True)
 
+tramos.marca("detalle_jugador")
+
 # --- SECCIÓN 4: COMPARADOR HEAD-TO-HEAD ---
 st.markdown("---")
 st.subheader("⚔️ Comparador de Jugadores")
@@ -489,8 +1523,15 @@ if p1 and p2:
         if max_val == 0: return 0
         return (valor / max_val) * 100
 
-    metricas_radar = ['Minutos totales', 'Goles', '% Jugado (Total)', 'Titular']
-    nombres_radar = ['Minutos', 'Goles', '% Participación', 'Titularidades']
+    # Opciones: estadísticas base + todas las métricas numéricas del registro
+    nombres_bonitos = {'Minutos totales': 'Minutos', '% Jugado (Total)': '% Participación', 'Titular': 'Titularidades'}
+    opciones_radar = ['Minutos totales', 'Goles', 'Titular', 'Suplente', 'Completos', 'Convocatorias', 'Amarillas']
+    opciones_radar += [m for m in metricas_numericas() if m in df_stats.columns]
+    metricas_radar = st.multiselect("Métricas del radar", opciones_radar,
+                                    default=['Minutos totales', 'Goles', '% Jugado (Total)', 'Titular'])
+    if not metricas_radar:
+        metricas_radar = ['Minutos totales']
+    nombres_radar = [nombres_bonitos.get(m, m) for m in metricas_radar]
     
     vals_p1_norm = [normalizar(stats_p1[m].values[0], m) for m in metricas_radar]
     vals_p2_norm = [normalizar(stats_p2[m].values[0], m) for m in metricas_radar]
@@ -535,9 +1576,7 @@ if p1 and p2:
     
     # Filtramos para no ensuciar el gráfico con gente que no juega
     df_eficiencia = df_stats[(df_stats['Minutos totales'] > 90) & (df_stats['Posición'] != 'Portero')].copy() 
-    
-    # Calculamos Goles por 90 min para el tamaño de la burbuja o el color
-    df_eficiencia['Goles_90'] = (df_eficiencia['Goles'] / df_eficiencia['Minutos totales']) * 90
+    # Goles_90 (Goles por 90 min) viene del registro de métricas
     
     fig_eff = px.scatter(df_eficiencia, 
                         x='Minutos totales', 
@@ -597,8 +1636,13 @@ if p1 and p2:
 
     st.subheader("Verificación de Datos Calculados (df_stats)")
 
-    # Opción Recomendada: Tabla interactiva (puedes ordenar y filtrar)
-    st.dataframe(df_stats, use_container_width=True)
+    # Filtrado, orden y páginas en el servidor (tabla_paginada.py): solo viaja la página visible
+    mostrar_tabla(df_stats, id_club, "stats", f"{equipo_seleccionado}:{version_datos}:{rango}")
+
+    if st.checkbox("📚 Ver la tabla por jornada de todo el club"):
+        datos_equipos, versiones_equipos = datos_club(id_club)
+        mostrar_tabla(tabla_larga_club(id_club, versiones_equipos, datos_equipos), id_club, "club_long",
+                      versiones_equipos, columnas_texto=('Nombre', 'Equipo', 'Posición'))
 
 
 
@@ -674,3 +1718,69 @@ if p1 and p2:
             )
 
         st.plotly_chart(fig_custom, use_container_width=True)
+
+tramos.marca("comparador")
+
+# --- SECCIÓN: JUGADORES PARECIDOS EN EL CLUB ---
+# Vecinos más cercanos (similitud.py) entre todos los jugadores del club, incluidas
+# las temporadas de archivo de clubes.toml. El índice se construye una vez por
+# combinación de versiones de las hojas; las consultas no se cachean: con pesos que
+# cambian en cada clic es más barato calcularlas que guardarlas.
+@telemetria.cache_medida("similitud", cache_por_club())
+def construir_indice_club(club, versiones, _datos_equipos):
+    tablas = []
+    for nombre_equipo, (df_long_eq, df_stats_eq, partidos_eq, t_partido_eq, version_eq) in _datos_equipos.items():
+        acum = construir_acumulados(club, nombre_equipo, version_eq, df_long_eq, df_stats_eq)
+        # Minutos por jornada (solo las que disputó el equipo) a partir de las sumas acumuladas
+        minutos = np.diff(acum['acum'][COLS_ACUMULADAS.index('Minutos totales')], axis=1)
+        activas = np.diff(acum['activas_acum']) > 0
+        tablas.append(rasgos_equipo(nombre_equipo, df_stats_eq, minutos[:, activas], t_partido_eq, partidos_eq))
+    return construir_indice(tablas)
+
+st.markdown("---")
+st.subheader("🧭 Jugadores Parecidos en el Club")
+# Solo se cargan todos los equipos si se pide (igual que el resumen del club)
+if st.checkbox("Buscar en todos los equipos del club"):
+    datos_equipos, versiones_equipos = datos_club(id_club)
+    indice_club = construir_indice_club(id_club, versiones_equipos, datos_equipos)
+    jugadores_club = indice_club['jugadores']
+
+    col_sim1, col_sim2, col_sim3 = st.columns([1, 1, 1])
+    with col_sim1:
+        equipos_indice = jugadores_club['Equipo'].unique().tolist()
+        equipo_ref = st.selectbox("Equipo", equipos_indice,
+                                  index=equipos_indice.index(equipo_seleccionado) if equipo_seleccionado in equipos_indice else 0)
+    with col_sim2:
+        filas_equipo = np.flatnonzero(jugadores_club['Equipo'].to_numpy() == equipo_ref)
+        fila_ref = st.selectbox("Jugador de referencia", filas_equipo,
+                                format_func=lambda i: f"{jugadores_club['Nombre'].iat[i]} ({jugadores_club['Posición'].iat[i]})")
+    with col_sim3:
+        n_vecinos = st.slider("Jugadores a mostrar", 3, 20, 5)
+    misma_posicion = st.checkbox("Solo la misma posición", value=True)
+    otros_equipos = st.checkbox("Solo de otros equipos", value=True)
+
+    with st.expander("⚖️ Pesos de cada rasgo"):
+        st.caption("0 = no cuenta. El perfil por jornadas compara cómo se repartieron sus minutos a lo largo de la temporada.")
+        cols_pesos = st.columns(4)
+        pesos_rasgos = {rasgo: cols_pesos[i % 4].slider(rasgo, 0.0, 3.0, 1.0, 0.5, key=f"peso_{rasgo}")
+                        for i, rasgo in enumerate(RASGOS)}
+        peso_perfil = cols_pesos[len(RASGOS) % 4].slider("Perfil por jornadas", 0.0, 3.0, 0.0, 0.5)
+
+    pesos = vector_pesos(pesos_rasgos, peso_perfil)
+    if pesos.sum() == 0:
+        st.warning("Pon algún peso por encima de 0")
+    else:
+        t_busqueda = time.perf_counter()
+        parecidos = vecinos(indice_club, fila_ref, pesos, k=n_vecinos,
+                            posiciones=[jugadores_club['Posición'].iat[fila_ref]] if misma_posicion else None,
+                            excluir_equipo=otros_equipos)
+        t_busqueda = time.perf_counter() - t_busqueda
+        st.dataframe(parecidos, use_container_width=True, hide_index=True)
+        st.caption(f"{len(jugadores_club)} jugadores de {len(equipos_indice)} equipos · "
+                   f"búsqueda en {t_busqueda * 1000:.1f} ms · Distancia 0 = mismo perfil")
+
+# Fin del script (benchmark de arranque y telemetría)
+tramos.marca("similitud")
+tramos.fin()
+marcas_arranque['fin'] = time.perf_counter() - _T0
+st.session_state['marcas_arranque'] = marcas_arranque
@@ -1,40 +1,101 @@
+import time
+_T0 = time.perf_counter()  # Inicio del script, para medir el primer pintado
+
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+from arranque import leer_arranque, guardar_arranque
+from fuente_local import ConexionLocal, carpeta_local
+from metricas import evaluar_metricas
+import telemetria
+from cache_clubes import CACHE, cache_por_club
+from clubes import cargar_clubes, clave_hoja
+from lectura_resiliente import hace_cuanto, leer_con_reintentos
+from tabla_paginada import mostrar_tabla
+# plotly y streamlit_gsheets se importan más abajo: no hacen falta para el primer pintado
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Club Analytics Pro", layout="wide", page_icon="⚽")
 
-# --- LISTA DE EQUIPOS ---
-# IMPORTANTE: Pon aquí los nombres EXACTOS de las pestañas de tu Google Sheet
-
-lista_equipos = {
-    "Preferente": "1039572604", "Juvenil A": "689736481",
-    "Juvenil B": "1086115076", "Cadete A": "325576234",
-    "Cadete B": "0", "Infantil A": "1612741636",
-    "Infantil B": "1284204032"   
-}
-
 # --- CONEXIÓN ---
-conn = st.connection("gsheets", type=GSheetsConnection)
-
-# Recuperamos la URL de los secretos para evitar el error que tuviste
+# Se abre la primera vez que se leen datos, no al arrancar el script.
+# Con CLUB_DATOS_LOCAL se leen CSV locales en lugar de Google Sheets.
+@st.cache_resource
+def obtener_conexion():
+    if carpeta_local():
+        return ConexionLocal(carpeta_local())
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+# --- TELEMETRÍA ---
+# Un endpoint /metrics por proceso (formato Prometheus), arrancado una sola vez
+@st.cache_resource
+def iniciar_telemetria():
+    return telemetria.servir()
+
+iniciar_telemetria()
+tramos = telemetria.Tramos("DashBoardNo3", inicio=_T0)
+
+# Recuperamos la URL de los secretos (la usan los clubes sin spreadsheet propio en clubes.toml)
 try:
-    url_sheet = st.secrets["connections"]["gsheets"]["spreadsheet"]
+    url_por_defecto = None if carpeta_local() else st.secrets["connections"]["gsheets"]["spreadsheet"]
 except:
+    url_por_defecto = None
+
+# --- CLUB Y LISTA DE EQUIPOS ---
+# Los equipos de cada club están en clubes.toml (ver clubes.py); el club sale de ?club=<id>
+@st.cache_resource
+def configuracion_clubes(url_por_defecto):
+    clubes = cargar_clubes(url_por_defecto)
+    for id_club, datos_club in clubes.items():
+        CACHE.fijar_cuota(id_club, datos_club['cuota_mb'])
+    return clubes
+
+try:
+    clubes = configuracion_clubes(url_por_defecto)
+except (OSError, ValueError) as e:
+    st.error(f"Error en la configuración de clubes: {e}")
+    st.stop()
+id_club = st.query_params.get("club", next(iter(clubes)))
+if id_club not in clubes:
+    st.error(f"Club desconocido: '{id_club}'")
+    st.stop()
+lista_equipos = clubes[id_club]['equipos']
+url_sheet = clubes[id_club]['spreadsheet']
+if url_sheet is None and not carpeta_local():
     st.error("No se encuentra la URL en secrets.toml")
     st.stop()
 
-@st.cache_data(ttl=60)
-def cargar_datos_equipo(nombre_hoja,gid):
+# Nombres del registro de métricas -> nombres de columna de este dashboard.
+# Aquí los minutos posibles se calculan sobre los partidos jugados, no sobre las
+# convocatorias, así que part_tot hace el papel de 'Convocatorias'.
+COLUMNAS_REGISTRO = {
+    'Convocatorias': 'part_tot', 'Jugados': 'part_tot', 'Titular': 'part_tit',
+    'Minutos totales': 'min_tot', 'Goles': 'goles', 'Amarillas': 'amarillas', 'Rojas': 'rojas',
+    'Min. Posibles': 'min_posibles', 'G_x_min': 'goles_x_minuto', 'A_x_min': 'amarillas_x_minuto',
+    'R_x_min': 'rojas_por_minuto', '% Jugado (Disp)': 'pct_jugado', '% Jugado (Total)': 'pct_jugado_equipo',
+    'Goles_90': 'goles_90',
+}
+
+# Caché por club (cache_clubes.py). La última carga buena de cada hoja se guarda
+# aparte, sin caducidad y dentro de la cuota del club: es el respaldo cuando
+# Google Sheets no responde
+@telemetria.cache_medida("datos_equipo", cache_por_club(ttl=60))
+def cargar_datos_equipo(club, nombre_hoja, gid):
+    spreadsheet = clubes[club]['spreadsheet']
     # Leemos la pestaña específica usando 'worksheet'
+    # Con timeout, reintentos y cortocircuito (lectura_resiliente.py)
     try:
-        df = conn.read(spreadsheet=url_sheet, worksheet=gid, header=[0, 1])
+        df = leer_con_reintentos(lambda: obtener_conexion().read(spreadsheet=spreadsheet, worksheet=gid, header=[0, 1]),
+                                 spreadsheet=spreadsheet or "local", gid=gid, club=club)
     except Exception as e:
-        return None, None, f"Error al leer la hoja '{nombre_hoja}': {str(e)}"
+        hay_respaldo, respaldo = CACHE.leer(club, ('respaldo', gid))
+        if hay_respaldo:
+            telemetria.RESPALDO.inc(club=club, gid=gid)
+            guardado, df, df_resumen = respaldo
+            return df, df_resumen, guardado, None
+        return None, None, None, f"Error al leer la hoja '{nombre_hoja}': {str(e)}"
+    t_parseo = time.perf_counter()
 
     df = df.fillna(0)
     # Limpiar filas vacías
@@ -57,8 +118,6 @@ def cargar_datos_equipo(nombre_hoja,gid):
         part_comp=(df.loc(axis=1)[:,'T']==t_partido).to_numpy().sum(axis=1)
         part_tot=part_tit+part_sup
 
-        min_posibles_jugador = part_tot * t_partido
-
         jornadas_con_datos = df.xs('T', axis=1, level=1).columns[df.xs('T', axis=1, level=1).sum() > 0]
         n_jornadas=len(jornadas_con_datos)
 
@@ -68,21 +127,8 @@ def cargar_datos_equipo(nombre_hoja,gid):
         a_tot = df.xs('A', axis=1, level=1).sum(axis=1)
         r_tot = df.xs('R', axis=1, level=1).sum(axis=1)
         
-        g_x_min = min_tot / g_tot 
-        g_x_min[g_x_min==np.inf]=0
-        
-        a_x_min = min_tot / a_tot 
-        a_x_min[a_x_min==np.inf]=0
-
-        r_x_min = min_tot / r_tot 
-        r_x_min[r_x_min==np.inf]=0
-       
-        # Porcentaje de participación
-        pct_participacion_disp = (min_tot / min_posibles_jugador) * 100 # Porcentaje de minutos jugados de los partidos que ha participado
-        pct_participacion_equipo = (min_tot / min_totales_equipo) * 100 # Porcentaje de minutos jugados con respecto al total.
-        
     except KeyError:
-        return None, None, "La hoja no tiene la estructura correcta (Faltan columnas T, S, G, A o R)"
+        return None, None, None, "La hoja no tiene la estructura correcta (Faltan columnas T, S, G, A o R)"
 
     # DataFrame Resumen
     df_resumen = pd.DataFrame({
@@ -94,63 +140,99 @@ def cargar_datos_equipo(nombre_hoja,gid):
         'part_comp': part_comp,
         'part_tot': part_tot,
         'goles': g_tot,
-        'goles_x_minuto': g_x_min,
         'amarillas': a_tot,
-        'amarillas_x_minuto': a_x_min,
         'rojas': r_tot,
-        'rojas_por_minuto': r_x_min,
-        'pct_jugado': pct_participacion_disp,
-        'pct_jugado_equipo': pct_participacion_equipo
     }, index=df.index)
-    
-    return df, df_resumen, None
+
+    # Ratios, porcentajes y semáforo salen del registro de metricas.py
+    df_resumen = evaluar_metricas(df_resumen, contexto={'t_partido': t_partido, 'min_totales_equipo': min_totales_equipo},
+                                  columnas=COLUMNAS_REGISTRO)
+    telemetria.PARSEO.observar(time.perf_counter() - t_parseo, club=club, gid=gid)
+    CACHE.guardar(club, ('respaldo', gid), (time.time(), df, df_resumen))
+
+    return df, df_resumen, None, None
+
+
+# --- CABECERA (TÍTULO + KPIs) ---
+# Se pinta en un hueco fijo: primero con la foto de arranque y luego con los datos reales
+def mostrar_cabecera(hueco, equipo, kpis, nota=None):
+    with hueco.container():
+        st.title(f"Informe: {equipo}")
+        # Siempre la misma estructura: así el segundo pintado sustituye al primero elemento a elemento
+        st.caption(nota or "")
+        kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+        kpi1.metric("Goles a Favor", kpis['Goles a Favor'])
+        kpi2.metric("Tarjetas Amarillas", kpis['Tarjetas Amarillas'])
+        kpi3.metric("Plantilla", f"{kpis['Plantilla']} jug.")
+        kpi4.metric("Jornadas ", kpis['Jornadas'])
 
 
 # --- INTERFAZ ---
 st.sidebar.image("https://cdn-icons-png.flaticon.com/512/53/53283.png", width=100)
 st.sidebar.title("Panel Técnico")
+if len(clubes) > 1:
+    st.sidebar.caption(clubes[id_club]['nombre'])
 
 
 # 1. SELECTOR DE EQUIPO
 equipo_seleccionado = st.sidebar.selectbox("Seleccionar Equipo", lista_equipos)
+gid_seleccionado = lista_equipos[equipo_seleccionado]
 
 if st.sidebar.button("🔄 Actualizar Datos"):
-    st.cache_data.clear()
+    # Solo los datos de este club (el respaldo se conserva)
+    cargar_datos_equipo.clear(id_club)
     st.rerun()
 
 
+# --- PRIMER PINTADO ---
+# Si hay foto de la última carga, los KPIs salen antes de conectar con Sheets
+clave_arranque = f"no3_{clave_hoja(id_club, gid_seleccionado)}"
+cabecera = st.empty()
+marcas_arranque = {}  # Tiempos desde el inicio del script (benchmark de arranque)
+arranque_previo = leer_arranque(clave_arranque)
+if arranque_previo:
+    mostrar_cabecera(cabecera, equipo_seleccionado, arranque_previo['kpis'],
+                     nota="⏳ Mostrando la última carga mientras se actualizan los datos...")
+    marcas_arranque['primer_pintado'] = time.perf_counter() - _T0
+
 # Cargar datos
-df_full, df_stats, error = cargar_datos_equipo(equipo_seleccionado,lista_equipos[equipo_seleccionado])
+df_full, df_stats, datos_de, error = cargar_datos_equipo(id_club, equipo_seleccionado, gid_seleccionado)
 
 if error:
     st.error(error)
 else:
     # --- ENCABEZADO Y KPIs ---
-    st.title(f"Informe: {equipo_seleccionado}")
-    
-    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-    kpi1.metric("Goles a Favor", int(df_stats['goles'].sum()))
-    kpi2.metric("Tarjetas Amarillas", int(df_stats['amarillas'].sum()))
-    kpi3.metric("Plantilla", f"{len(df_stats)} jug.")
-    
     jornadas_con_datos = df_full.xs('T', axis=1, level=1).columns[df_full.xs('T', axis=1, level=1).sum() > 0]
     n_jornadas=len(jornadas_con_datos)
     #partidos_est = int(df_stats['min_tot'].max() / 90)
-    kpi4.metric("Jornadas ", n_jornadas)
+    kpis = {
+        'Goles a Favor': int(df_stats['goles'].sum()),
+        'Tarjetas Amarillas': int(df_stats['amarillas'].sum()),
+        'Plantilla': len(df_stats),
+        'Jornadas': n_jornadas,
+    }
+    mostrar_cabecera(cabecera, equipo_seleccionado, kpis)
+    if datos_de is not None:
+        st.warning(f"⚠️ Google Sheets no responde. Mostrando la última carga buena (de hace {hace_cuanto(datos_de)}).")
+    # Los KPIs resumen la hoja entera, así que sirven también como versión de la foto
+    guardar_arranque(clave_arranque, repr(sorted(kpis.items())), kpis)
+    marcas_arranque['kpis'] = time.perf_counter() - _T0
+    marcas_arranque.setdefault('primer_pintado', marcas_arranque['kpis'])
 
     st.markdown("---")
 
+    tramos.marca("cabecera")
+
+    # Importaciones pesadas de gráficos, ya con la cabecera en pantalla
+    import plotly.express as px
+    import plotly.graph_objects as go
+    tramos.marca("importaciones")
+
     # --- SECCIÓN 1: SEMÁFORO DE MINUTOS ---
     st.subheader("🚦 Estado de la Plantilla (Minutos Jugados)")
     
     # Clasificación
-    df_stats['Rol_jugador'] = pd.cut(df_stats['pct_jugado'], 
-                             bins=[-1, 30, 70, 1000], 
-                             labels=['Rojo (<30%)', 'Naranja (30-70%)', 'Verde (>70%)'])
-    
-    df_stats['Rol_jugador_equipo'] = pd.cut(df_stats['pct_jugado_equipo'], 
-                             bins=[-1, 30, 70, 1000], 
-                             labels=['Rojo (<30%)', 'Naranja (30-70%)', 'Verde (>70%)'])
+    # Rol_jugador y Rol_jugador_equipo son umbrales del registro de métricas
     
     col_sem1, col_sem2 = st.columns([2, 1])
     
@@ -337,9 +419,7 @@ else:
         
         # Filtramos para no ensuciar el gráfico con gente que no juega
         df_eficiencia = df_stats[df_stats['min_tot'] > 90].copy() 
-        
-        # Calculamos Goles por 90 min para el tamaño de la burbuja o el color
-        df_eficiencia['goles_90'] = (df_eficiencia['goles'] / df_eficiencia['min_tot']) * 90
+        # goles_90 (Goles por 90 min) viene del registro de métricas
         
         fig_eff = px.scatter(df_eficiencia, 
                             x='min_tot', 
@@ -439,5 +519,14 @@ else:
 
         st.subheader("Verificación de Datos Calculados (df_stats)")
 
-        # Opción Recomendada: Tabla interactiva (puedes ordenar y filtrar)
-        st.dataframe(df_stats, use_container_width=True)
+        # Filtrado, orden y páginas en el servidor (tabla_paginada.py): solo viaja la página visible.
+        # Aquí el nombre del jugador es el índice: pasa a ser la columna 'Nombre'
+        df_tabla = df_stats.rename_axis('Nombre').reset_index()
+        version_stats = int(pd.util.hash_pandas_object(df_tabla, index=False).sum())
+        mostrar_tabla(df_tabla, id_club, "stats", f"{equipo_seleccionado}:{version_stats}")
+
+# Fin del script (benchmark de arranque)
+tramos.marca("secciones")
+tramos.fin()
+marcas_arranque['fin'] = time.perf_counter() - _T0
+st.session_state['marcas_arranque'] = marcas_arranque
@@ -0,0 +1,161 @@
+# --- ALERTAS DEL CLUB ---
+# Reglas declarativas que se evalúan para todos los jugadores de uno o varios equipos
+# de un club en una sola pasada: cada regla es una máscara de NumPy sobre la tabla
+# conjunta. Solo se avisa de los cambios respecto a la evaluación anterior de esos
+# equipos (estado en disco, uno por club) y los avisos se añaden a una bandeja de
+# salida JSONL por club:
+#   <CARPETA_CACHE>/alertas/<club>.jsonl          una línea por alerta nueva o resuelta
+#   <CARPETA_CACHE>/alertas/<club>.estado.json    alertas activas en la última evaluación
+#
+# Cada regla: columna, operador y valor. 'mensaje' admite {jugador}, {equipo} y {valor}.
+import json
+import operator
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from arranque import CARPETA_CACHE
+from memoria_compartida import bloqueo
+from metricas import ETIQUETAS_SEMAFORO
+
+REGLAS = [
+    {'id': 'semaforo_rojo', 'col': 'Rol_jugador', 'op': '==', 'valor': ETIQUETAS_SEMAFORO[0],
+     'mensaje': '{jugador} ({equipo}) ha entrado en la franja roja del semáforo'},
+    {'id': 'cuarta_amarilla', 'col': 'Amarillas', 'op': '>=', 'valor': 4,
+     'mensaje': '{jugador} ({equipo}) acumula {valor} amarillas'},
+    {'id': 'sin_convocar', 'col': 'Sin convocar seguidas', 'op': '>=', 'valor': 3,
+     'mensaje': '{jugador} ({equipo}) lleva {valor} jornadas seguidas sin convocar'},
+]
+
+OPERADORES = {'==': operator.eq, '!=': operator.ne, '>=': operator.ge, '>': operator.gt,
+              '<=': operator.le, '<': operator.lt}
+COLUMNAS_CLAVE = ['Club', 'Equipo', 'Nombre']
+
+
+def racha_final(matriz):
+    # Jugador x Jornada (bool) -> longitud de la racha de True al final de cada fila
+    n = matriz.shape[1]
+    ultimo_false = np.where(~matriz, np.arange(n), -1).max(axis=1, initial=-1)
+    return n - 1 - ultimo_false
+
+
+def tabla_equipo(club, equipo, df_stats, convocatorias, jornadas_activas):
+    # convocatorias: Jugador x Jornada (mismo orden de filas que df_stats)
+    # jornadas_activas: bool por jornada (las que disputó el equipo)
+    tabla = df_stats.copy()
+    tabla.insert(0, 'Equipo', equipo)
+    tabla.insert(0, 'Club', club)
+    tabla['Sin convocar seguidas'] = racha_final(np.asarray(convocatorias)[:, jornadas_activas] == 0)
+    return tabla
+
+
+def evaluar_reglas(tabla, reglas=REGLAS):
+    # Todas las reglas sobre todas las filas: matriz Fila x Regla y, de ahí, las activas.
+    # Sin ninguna convocatoria no hay nada que avisar (y 0/0 da 0 %: franja roja perpetua)
+    if 'Convocatorias' in tabla.columns:
+        tabla = tabla[tabla['Convocatorias'].to_numpy() > 0]
+    if tabla.empty:
+        return pd.DataFrame(columns=COLUMNAS_CLAVE + ['Regla', 'Valor'])
+    mascaras = np.zeros((len(tabla), len(reglas)), dtype=bool)
+    for j, regla in enumerate(reglas):
+        if regla['col'] in tabla.columns:
+            mascaras[:, j] = np.asarray(OPERADORES[regla['op']](tabla[regla['col']], regla['valor']), dtype=bool)
+    # Recorremos por reglas (pocas) y no por filas: el valor de cada alerta se toma
+    # de la columna de su regla con un índice de NumPy
+    filas = [np.flatnonzero(mascaras[:, j]) for j in range(len(reglas))]
+    indices = np.concatenate(filas)
+    activas = tabla[COLUMNAS_CLAVE].iloc[indices].reset_index(drop=True)
+    activas['Regla'] = np.repeat([r['id'] for r in reglas], [len(f) for f in filas])
+    valores = [tabla[r['col']].to_numpy(dtype=object)[f] for r, f in zip(reglas, filas) if len(f)]
+    activas['Valor'] = np.concatenate(valores) if valores else np.array([], dtype=object)
+    return activas
+
+
+def _ruta(club, sufijo):
+    return os.path.join(CARPETA_CACHE, "alertas", f"{club}{sufijo}")
+
+
+def _clave(campos):
+    # (club, equipo, jugador, regla) -> clave del estado en disco (lista JSON: los
+    # nombres pueden contener cualquier carácter)
+    return json.dumps([str(c) for c in campos], ensure_ascii=False)
+
+
+def _campos(clave):
+    try:
+        return json.loads(clave)
+    except ValueError:
+        return clave.split('|')  # estados guardados con el formato anterior
+
+
+def procesar_alertas(club, tabla, versiones, reglas=REGLAS):
+    # Evalúa y compara con el estado anterior. versiones: {equipo: version_datos} de los
+    # equipos que trae la tabla (el resto del estado no se toca); si no ha cambiado
+    # ninguna, no hay nada que evaluar. Devuelve las alertas nuevas.
+    os.makedirs(os.path.dirname(_ruta(club, "")), exist_ok=True)
+    # Con varios procesos, el bloqueo evita que dos escriban la misma alerta
+    with bloqueo(f"alertas.{club}"):
+        try:
+            with open(_ruta(club, ".estado.json"), encoding="utf-8") as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            estado = {'versiones': {}, 'activas': {}}
+        if all(estado['versiones'].get(equipo) == version for equipo, version in versiones.items()):
+            return []
+
+        activas = evaluar_reglas(tabla, reglas)
+        claves = [_clave(fila) for fila in activas[COLUMNAS_CLAVE + ['Regla']].itertuples(index=False)]
+        actuales = dict(zip(claves, activas['Valor'].tolist()))
+        # Solo las alertas de los equipos evaluados pueden resolverse ahora
+        previas = {_clave(_campos(k)): v for k, v in estado['activas'].items()}
+        otras = {k: v for k, v in previas.items() if _campos(k)[1] not in versiones}
+        previas = {k: v for k, v in previas.items() if k not in otras}
+
+        mensajes = {r['id']: r['mensaje'] for r in reglas}
+        ahora = time.strftime("%Y-%m-%d %H:%M:%S")
+        nuevas = []
+        for clave, valor in actuales.items():
+            if clave not in previas:
+                club_a, equipo, jugador, regla = _campos(clave)
+                nuevas.append({'fecha': ahora, 'estado': 'nueva', 'club': club_a, 'equipo': equipo,
+                               'jugador': jugador, 'regla': regla, 'valor': _json(valor),
+                               'mensaje': mensajes[regla].format(jugador=jugador, equipo=equipo, valor=_json(valor))})
+        resueltas = []
+        for clave in previas.keys() - actuales.keys():
+            club_a, equipo, jugador, regla = _campos(clave)
+            resueltas.append({'fecha': ahora, 'estado': 'resuelta', 'club': club_a, 'equipo': equipo,
+                              'jugador': jugador, 'regla': regla})
+
+        if nuevas or resueltas:
+            with open(_ruta(club, ".jsonl"), "a", encoding="utf-8") as f:
+                for alerta in nuevas + resueltas:
+                    f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+        estado = {'versiones': {**estado['versiones'], **versiones},
+                  'activas': {**otras, **{k: _json(v) for k, v in actuales.items()}}}
+        tmp = _ruta(club, ".estado.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(tmp, _ruta(club, ".estado.json"))
+    return nuevas
+
+
+def _json(valor):
+    # Escalares de NumPy -> tipos de Python (para JSON y para los mensajes)
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return valor
+
+
+def leer_alertas(club, n=20):
+    # Las n últimas alertas nuevas de la bandeja (la más reciente primero)
+    try:
+        with open(_ruta(club, ".jsonl"), encoding="utf-8") as f:
+            lineas = f.readlines()
+    except OSError:
+        return []
+    alertas = [json.loads(linea) for linea in lineas if linea.strip()]
+    return [a for a in reversed(alertas) if a['estado'] == 'nueva'][:n]
@@ -0,0 +1,36 @@
+# --- ARRANQUE EN CALIENTE ---
+# Guardamos en disco los KPIs de la última carga buena de cada equipo. Al abrir
+# una sesión nueva se pintan al momento, antes de conectar con Sheets y de importar
+# plotly; cuando llegan los datos reales se sobrescriben en el mismo hueco.
+import json
+import os
+import tempfile
+import time
+
+CARPETA_CACHE = os.environ.get("CLUB_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+
+def _ruta(clave):
+    return os.path.join(CARPETA_CACHE, "arranque", f"{clave}.json")
+
+
+def leer_arranque(clave):
+    try:
+        with open(_ruta(clave), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_arranque(clave, version, kpis):
+    # Solo se escribe si cambió la versión de los datos (no en cada rerun)
+    previo = leer_arranque(clave)
+    if previo is not None and previo.get("version") == version:
+        return
+    ruta = _ruta(clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Escritura atómica: otro proceso nunca ve un JSON a medias
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "guardado": time.time(), "kpis": kpis}, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
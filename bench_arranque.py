@@ -0,0 +1,147 @@
+# --- BENCHMARK DE ARRANQUE ---
+# Mide lo que tarda en salir la primera pantalla útil (selector + KPIs):
+#   1. Importaciones en un intérprete limpio: las necesarias antes del primer
+#      pintado y las diferidas (plotly, streamlit_gsheets).
+#   2. Ejecución completa del dashboard con datos locales, en frío (sin foto de
+#      arranque) y en caliente (con foto), leyendo las marcas que deja el script
+#      en st.session_state['marcas_arranque'].
+#
+# Uso:
+#   python bench_arranque.py --script DashBoard3.py --latencia 1.5 --salida arranque.json
+#   python bench_arranque.py --referencia arranque.json   # falla si empeora > tolerancia
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from fuente_local import generar_club
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+IMPORTS_PRIMER_PINTADO = ["streamlit", "pandas", "numpy"]
+IMPORTS_DIFERIDOS = ["plotly.express", "plotly.graph_objects", "streamlit_gsheets"]
+GIDS = ["1039572604", "689736481", "1086115076", "325576234", "0", "1612741636", "1284204032"]
+
+
+def medir_importaciones():
+    # Un proceso nuevo por medida: así no se reaprovecha nada ya importado
+    codigo = (
+        "import json, time, importlib\n"
+        "t = {}\n"
+        "for grupo, mods in [('primer_pintado', %r), ('diferidos', %r)]:\n"
+        "    t0 = time.perf_counter()\n"
+        "    for m in mods: importlib.import_module(m)\n"
+        "    t[grupo] = (time.perf_counter() - t0) * 1000\n"
+        "print(json.dumps(t))\n"
+    ) % (IMPORTS_PRIMER_PINTADO, IMPORTS_DIFERIDOS)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True, cwd=RAIZ)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def ejecutar_dashboard(script, entorno):
+    # Ejecuta el script en un proceso nuevo (modo --interno) y devuelve sus marcas
+    salida = subprocess.run([sys.executable, __file__, "--interno", script], capture_output=True, text=True,
+                            env=entorno, cwd=RAIZ)
+    if salida.returncode != 0:
+        raise RuntimeError(f"El dashboard falló:\n{salida.stderr[-2000:]}")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def modo_interno(script):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(RAIZ, script), default_timeout=120)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    marcas = at.session_state["marcas_arranque"]
+    print(json.dumps({k: v * 1000 for k, v in marcas.items()}))
+
+
+def mediana(valores, clave):
+    return statistics.median(v[clave] for v in valores)
+
+
+def benchmark(script, repeticiones, latencia):
+    importaciones = [medir_importaciones() for _ in range(repeticiones)]
+
+    frio, caliente = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        datos = os.path.join(tmp, "datos")
+        generar_club(datos, GIDS)
+        entorno = dict(os.environ, CLUB_DATOS_LOCAL=datos, CLUB_DATOS_LATENCIA=str(latencia))
+        for i in range(repeticiones):
+            # Caché en disco y memoria compartida propias de cada repetición: el arranque en
+            # frío no hereda lo publicado por la anterior ni toca /dev/shm de la app real
+            entorno["CLUB_CACHE_DIR"] = os.path.join(tmp, f"cache_{i}")
+            entorno["CLUB_MEMORIA_DIR"] = os.path.join(tmp, f"memoria_{i}")
+            frio.append(ejecutar_dashboard(script, entorno))      # sin foto de arranque
+            caliente.append(ejecutar_dashboard(script, entorno))  # con la foto de la ejecución anterior
+
+    imp_pintado = mediana(importaciones, "primer_pintado")
+    return {
+        "script": script,
+        "repeticiones": repeticiones,
+        "latencia_simulada_s": latencia,
+        "importacion_primer_pintado_ms": round(imp_pintado, 1),
+        "importacion_diferida_ms": round(mediana(importaciones, "diferidos"), 1),
+        # Primer pintado = importaciones previas + marca 'primer_pintado' del script
+        "primer_pintado_frio_ms": round(imp_pintado + mediana(frio, "primer_pintado"), 1),
+        "primer_pintado_caliente_ms": round(imp_pintado + mediana(caliente, "primer_pintado"), 1),
+        "kpis_reales_caliente_ms": round(imp_pintado + mediana(caliente, "kpis"), 1),
+        "script_completo_frio_ms": round(imp_pintado + mediana(frio, "fin"), 1),
+    }
+
+
+def comprobar(informe, referencia, tolerancia, limites):
+    fallos = []
+    for clave, limite in limites.items():
+        if limite is not None and informe[clave] > limite:
+            fallos.append(f"{clave}: {informe[clave]} ms > límite {limite} ms")
+    if referencia:
+        for clave, valor in informe.items():
+            if clave.endswith("_ms") and clave in referencia and valor > referencia[clave] * (1 + tolerancia):
+                fallos.append(f"{clave}: {valor} ms vs {referencia[clave]} ms de referencia (+{tolerancia:.0%} permitido)")
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de importaciones y primer pintado del dashboard")
+    parser.add_argument("--script", default="DashBoard3.py")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=1.0, help="segundos simulados por lectura de Sheets")
+    parser.add_argument("--max-importacion-ms", type=float, default=None)
+    parser.add_argument("--max-primer-pintado-ms", type=float, default=None, help="límite en caliente")
+    parser.add_argument("--referencia", help="informe JSON anterior con el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--salida", help="guardar el informe en JSON")
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        modo_interno(args.interno)
+        return
+
+    informe = benchmark(args.script, args.repeticiones, args.latencia)
+    for clave, valor in informe.items():
+        print(f"{clave:32s} {valor}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+
+    referencia = None
+    if args.referencia:
+        with open(args.referencia, encoding="utf-8") as f:
+            referencia = json.load(f)
+    fallos = comprobar(informe, referencia, args.tolerancia, {
+        "importacion_primer_pintado_ms": args.max_importacion_ms,
+        "primer_pintado_caliente_ms": args.max_primer_pintado_ms,
+    })
+    for fallo in fallos:
+        print(f"REGRESIÓN: {fallo}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
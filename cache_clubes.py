@@ -0,0 +1,153 @@
+# --- CACHÉS PARTICIONADAS POR CLUB ---
+# Sustituye a st.cache_data / st.cache_resource en las funciones pesadas. Cada club
+# tiene su propia partición con una cuota de memoria; al pasarse de cuota se
+# expulsan sus entradas menos usadas (LRU), nunca las de otro club.
+# Como cache_resource, devuelve el mismo objeto a todas las sesiones: quien lo use
+# no debe modificarlo.
+#
+# Uso:
+#   @cache_por_club(ttl=60)
+#   def cargar(club, equipo, _df): ...      # el primer argumento es el club
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+import telemetria
+
+CUOTA_MB_POR_DEFECTO = 256
+
+
+def tamano(valor):
+    # Bytes aproximados de un resultado cacheado
+    if hasattr(valor, "memory_usage"):  # DataFrame / Series
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if hasattr(uso, "sum") else int(uso)
+    if isinstance(valor, np.memmap):
+        return 0  # vive en memoria compartida (memoria_compartida.py), no en el proceso
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheClubes:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.particiones = {}  # club -> OrderedDict(clave -> (valor, bytes, caduca))
+        self.cuotas = {}       # club -> bytes
+        self.expulsiones = {}  # club -> entradas expulsadas por cuota
+        self.calculando = {}   # (club, clave) -> [lock, sesiones esperando o calculando]
+
+    def fijar_cuota(self, club, cuota_mb):
+        with self.lock:
+            self.cuotas[club] = int(cuota_mb * 2**20)
+            self._ajustar(club)
+
+    def leer(self, club, clave):
+        # (True, valor) si está y no ha caducado; la marca como usada recientemente
+        with self.lock:
+            particion = self.particiones.get(club)
+            if particion is None or clave not in particion:
+                return False, None
+            valor, _, caduca = particion[clave]
+            if caduca is not None and time.monotonic() >= caduca:
+                del particion[clave]
+                return False, None
+            particion.move_to_end(clave)
+            return True, valor
+
+    def guardar(self, club, clave, valor, ttl=None):
+        caduca = None if ttl is None else time.monotonic() + ttl
+        bytes_valor = tamano(valor)
+        with self.lock:
+            particion = self.particiones.setdefault(club, OrderedDict())
+            particion[clave] = (valor, bytes_valor, caduca)
+            particion.move_to_end(clave)
+            self._ajustar(club)
+
+    @contextmanager
+    def calculo(self, club, clave):
+        # Un único cálculo a la vez por clave (como st.cache_data): cuando caduca una
+        # entrada, la primera sesión la recalcula y las demás esperan su resultado
+        with self.lock:
+            entrada = self.calculando.setdefault((club, clave), [threading.Lock(), 0])
+            entrada[1] += 1
+        try:
+            with entrada[0]:
+                yield
+        finally:
+            with self.lock:
+                entrada[1] -= 1
+                if entrada[1] == 0:
+                    del self.calculando[(club, clave)]
+
+    def _ajustar(self, club):
+        # LRU dentro del club; la entrada recién guardada se queda aunque sola supere la cuota
+        particion = self.particiones.get(club)
+        if not particion:
+            return
+        cuota = self.cuotas.get(club, CUOTA_MB_POR_DEFECTO * 2**20)
+        usado = sum(b for _, b, _ in particion.values())
+        while usado > cuota and len(particion) > 1:
+            _, (_, b, _) = particion.popitem(last=False)
+            usado -= b
+            self.expulsiones[club] = self.expulsiones.get(club, 0) + 1
+            telemetria.EXPULSIONES_CUOTA.inc(club=club)
+
+    def limpiar(self, club=None, funcion=None):
+        with self.lock:
+            clubes = [club] if club is not None else list(self.particiones)
+            for c in clubes:
+                particion = self.particiones.get(c, {})
+                for clave in [k for k in particion if funcion is None or k[0] == funcion]:
+                    del particion[clave]
+
+    def uso(self):
+        # {club: (bytes usados, cuota, entradas, expulsiones)}
+        with self.lock:
+            return {
+                club: (sum(b for _, b, _ in p.values()), self.cuotas.get(club, CUOTA_MB_POR_DEFECTO * 2**20),
+                       len(p), self.expulsiones.get(club, 0))
+                for club, p in self.particiones.items()
+            }
+
+
+# Una sola caché por proceso, compartida por todas las sesiones y funciones
+CACHE = CacheClubes()
+
+
+def cache_por_club(ttl=None, cache=CACHE):
+    def decorador(func):
+        firma = inspect.signature(func)
+        # Los dashboards se ejecutan como __main__: el fichero distingue sus funciones
+        nombre = f"{func.__module__}.{func.__qualname__}@{inspect.unwrap(func).__code__.co_filename}"
+
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs).arguments
+            club = next(iter(argumentos.values()))
+            # Igual que Streamlit: los argumentos con "_" no forman parte de la clave
+            clave = (nombre, repr([(k, v) for k, v in argumentos.items() if not k.startswith("_")]))
+            encontrado, valor = cache.leer(club, clave)
+            if encontrado:
+                return valor
+            with cache.calculo(club, clave):
+                # Otra sesión puede haberlo calculado mientras esperábamos
+                encontrado, valor = cache.leer(club, clave)
+                if not encontrado:
+                    valor = func(*args, **kwargs)
+                    cache.guardar(club, clave, valor, ttl)
+            return valor
+
+        envoltura.clear = lambda club=None: cache.limpiar(club, nombre)
+        return envoltura
+    return decorador
@@ -0,0 +1,309 @@
+# --- PRUEBA DE CARGA: SESIONES CONCURRENTES ---
+# Simula N entrenadores usando a la vez el mismo proceso de Streamlit.
+# Cada sesión es un AppTest sobre DashBoard3.py con datos locales (fuente_local)
+# y repite acciones típicas: cambiar de equipo, elegir jugadores y usar el
+# creador de gráficas. Al final informa de:
+#   - latencia de cada rerun (p50 / p95 / p99) por acción y en total
+#   - memoria por sesión (RSS del proceso; tracemalloc ralentiza demasiado los reruns)
+#   - tasa de aciertos de las cachés: las de Streamlit (cache_data / cache_resource) y,
+#     por función, las de cache_por_club y la memoria compartida (contadores de telemetria)
+#
+# Uso:
+#   python carga_sesiones.py --sesiones 10 --rondas 5 --salida carga.json
+#   python carga_sesiones.py --sesiones 10 --referencia carga.json   # compara con otra versión
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fuente_local import generar_club
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+EQUIPOS = {
+    "Preferente": "1039572604", "Juvenil A": "689736481",
+    "Juvenil B": "1086115076", "Cadete A": "325576234",
+    "Cadete B": "0", "Infantil A": "1612741636",
+    "Infantil B": "1284204032"
+}
+
+
+# --- CONTADORES DE CACHÉ ---
+# Streamlit no publica aciertos/fallos, así que envolvemos read_result de sus
+# cachés: cada lectura es una consulta y cada CacheKeyNotFoundError un fallo.
+# Las funciones pesadas usan cache_por_club, que ya cuenta en telemetria
+# (CACHE_CONSULTAS / CACHE_FALLOS por nombre de caché): se informa de lo que
+# suman durante la prueba.
+class ContadorCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.consultas = {}
+        self.fallos = {}
+        self.telemetria_inicial = {}
+
+    def _telemetria(self):
+        import telemetria
+        return {
+            cache: (telemetria.CACHE_CONSULTAS.valor(cache=cache), telemetria.CACHE_FALLOS.valor(cache=cache))
+            for (cache,) in list(telemetria.CACHE_CONSULTAS.valores)
+        }
+
+    def instalar(self):
+        self.telemetria_inicial = self._telemetria()
+        try:
+            from streamlit.runtime.caching.cache_data_api import DataCache
+            from streamlit.runtime.caching.cache_resource_api import ResourceCache
+            from streamlit.runtime.caching.cache_errors import CacheKeyNotFoundError
+        except ImportError:
+            return False
+        for tipo, clase in [("cache_data", DataCache), ("cache_resource", ResourceCache)]:
+            clase.read_result = self._envolver(tipo, clase.read_result, CacheKeyNotFoundError)
+        return True
+
+    def _envolver(self, tipo, original, error_fallo):
+        contador = self
+
+        def read_result(cache, value_key):
+            with contador.lock:
+                contador.consultas[tipo] = contador.consultas.get(tipo, 0) + 1
+            try:
+                return original(cache, value_key)
+            except error_fallo:
+                with contador.lock:
+                    contador.fallos[tipo] = contador.fallos.get(tipo, 0) + 1
+                raise
+        return read_result
+
+    def resumen(self):
+        cuentas = {tipo: (n, self.fallos.get(tipo, 0)) for tipo, n in self.consultas.items()}
+        for cache, (consultas, fallos) in self._telemetria().items():
+            consultas_0, fallos_0 = self.telemetria_inicial.get(cache, (0, 0))
+            cuentas[cache] = (consultas - consultas_0, fallos - fallos_0)
+        return {
+            tipo: {
+                "consultas": n,
+                "fallos": fallos,
+                "tasa_aciertos": round(1 - fallos / n, 4) if n else None,
+            }
+            for tipo, (n, fallos) in cuentas.items()
+        }
+
+
+# --- SESIÓN SIMULADA ---
+def _widget(lista, etiqueta):
+    for w in lista:
+        if w.label == etiqueta:
+            return w
+    raise LookupError(f"No se encuentra el widget '{etiqueta}'")
+
+
+class Sesion:
+    def __init__(self, script, semilla):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(script, default_timeout=300)
+        self.rng = random.Random(semilla)
+        self.tiempos = []  # (acción, segundos)
+        self.errores = 0
+        self.detalle_errores = []  # (acción, mensaje)
+
+    def _rerun(self, accion, preparar=None):
+        # Un rerun fallido deja la página sin sus widgets: la acción siguiente no los
+        # encuentra. Se cuenta como error de la sesión en vez de tumbar la prueba.
+        t0 = time.perf_counter()
+        try:
+            if preparar is not None:
+                preparar()
+            self.at.run()
+        except Exception as e:
+            self.errores += 1
+            self.detalle_errores.append((accion, f"{type(e).__name__}: {e}"))
+            return
+        self.tiempos.append((accion, time.perf_counter() - t0))
+        self.errores += len(self.at.exception)
+        self.detalle_errores += [(accion, excepcion.message) for excepcion in self.at.exception]
+
+    def cambiar_equipo(self):
+        equipo = self.rng.choice(list(EQUIPOS))
+        self._rerun("cambiar_equipo", lambda: _widget(self.at.sidebar.selectbox, "Seleccionar Equipo").select(equipo))
+
+    def elegir_jugadores(self):
+        def preparar():
+            for etiqueta in ["🔍 Analizar Jugador Específico", "Jugador A", "Jugador B"]:
+                caja = _widget(self.at.selectbox, etiqueta)
+                caja.select(self.rng.choice(caja.options))
+        self._rerun("elegir_jugadores", preparar)
+
+    def creador_graficas(self):
+        def preparar():
+            eje_y = _widget(self.at.selectbox, "Eje Y (Vertical)")
+            eje_y.select(self.rng.choice(eje_y.options))
+            tipo = _widget(self.at.selectbox, "Tipo de Gráfico")
+            tipo.select(self.rng.choice(tipo.options))
+        self._rerun("creador_graficas", preparar)
+
+    def ejecutar(self, rondas):
+        self._rerun("inicio")
+        acciones = [self.cambiar_equipo, self.elegir_jugadores, self.creador_graficas]
+        for _ in range(rondas):
+            self.rng.choice(acciones)()
+        return self
+
+
+def serializar_compilacion():
+    # Cada AppTest compila el script en su hilo; compilar en varios hilos a la vez
+    # puede fallar en CPython 3.11 ("AST constructor recursion depth mismatch") y
+    # el rerun se queda sin página. Un solo hilo compila a la vez.
+    try:
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    except ImportError:
+        return
+    original = ScriptCache.get_bytecode
+    lock = threading.Lock()
+
+    def get_bytecode(cache, script_path):
+        with lock:
+            return original(cache, script_path)
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def calentar(script):
+    # Primera ejecución del script en serie (la compilación y las importaciones no
+    # coinciden con las de otras sesiones). Después se vacían las cachés para que las
+    # sesiones midan igualmente en frío.
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+    AppTest.from_file(script, default_timeout=300).run()
+    import memoria_compartida
+    from cache_clubes import CACHE
+    CACHE.limpiar()
+    memoria_compartida.invalidar()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def memoria_rss():
+    # RSS actual en bytes (Linux); si no hay /proc, el máximo que da resource
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- INFORME ---
+def percentiles(valores):
+    ms = np.asarray(valores) * 1000
+    return {
+        "n": int(len(ms)),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+    }
+
+
+def version_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=RAIZ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def prueba_carga(script, n_sesiones, rondas, latencia, semilla):
+    contador = ContadorCache()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generar_club(os.path.join(tmp, "datos"), list(EQUIPOS.values()))
+        os.environ["CLUB_DATOS_LOCAL"] = os.path.join(tmp, "datos")
+        os.environ["CLUB_DATOS_LATENCIA"] = str(latencia)
+        os.environ["CLUB_CACHE_DIR"] = os.path.join(tmp, "cache")
+        # Memoria compartida aparte: los datos sintéticos no se publican con las claves de la app real
+        os.environ["CLUB_MEMORIA_DIR"] = os.path.join(tmp, "memoria")
+
+        serializar_compilacion()
+        calentar(script)
+        contadores_ok = contador.instalar()
+        memoria_base = memoria_rss()
+        sesiones = [Sesion(script, semilla + i) for i in range(n_sesiones)]
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_sesiones) as pool:
+            sesiones = list(pool.map(lambda s: s.ejecutar(rondas), sesiones))
+        duracion = time.perf_counter() - t0
+
+        # Memoria con todas las sesiones vivas (incluye las cachés compartidas)
+        memoria_actual = memoria_rss()
+
+    tiempos = [t for s in sesiones for t in s.tiempos]
+    por_accion = {}
+    for accion, segundos in tiempos:
+        por_accion.setdefault(accion, []).append(segundos)
+
+    return {
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": version_git(),
+        "python": platform.python_version(),
+        "parametros": {"script": os.path.basename(script), "sesiones": n_sesiones, "rondas": rondas,
+                       "latencia_simulada_s": latencia, "semilla": semilla},
+        "duracion_s": round(duracion, 2),
+        "reruns_por_segundo": round(len(tiempos) / duracion, 2),
+        "errores": sum(s.errores for s in sesiones),
+        "detalle_errores": [{"accion": accion, "error": mensaje}
+                            for s in sesiones for accion, mensaje in s.detalle_errores][:20],
+        "latencia": percentiles([t for _, t in tiempos]),
+        "latencia_por_accion": {accion: percentiles(v) for accion, v in sorted(por_accion.items())},
+        "memoria_por_sesion_mb": round((memoria_actual - memoria_base) / n_sesiones / 2**20, 2),
+        "memoria_total_mb": round((memoria_actual - memoria_base) / 2**20, 2),
+        "caches": contador.resumen() if contadores_ok else None,
+    }
+
+
+def comparar(informe, referencia):
+    # Diferencias en las latencias y la memoria respecto a otro informe
+    print(f"\nComparación con {referencia.get('commit')} ({referencia.get('fecha')}):")
+    filas = [("latencia total", informe["latencia"], referencia["latencia"])]
+    filas += [(accion, informe["latencia_por_accion"][accion], referencia["latencia_por_accion"][accion])
+              for accion in informe["latencia_por_accion"] if accion in referencia.get("latencia_por_accion", {})]
+    for nombre, actual, previo in filas:
+        deltas = "  ".join(f"{p}: {actual[p]:.0f} ms ({actual[p] - previo[p]:+.0f})" for p in ["p50_ms", "p95_ms", "p99_ms"])
+        print(f"  {nombre:18s} {deltas}")
+    delta_mem = informe["memoria_por_sesion_mb"] - referencia["memoria_por_sesion_mb"]
+    print(f"  memoria/sesión     {informe['memoria_por_sesion_mb']} MB ({delta_mem:+.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de sesiones concurrentes del dashboard")
+    parser.add_argument("--script", default="DashBoard3.py")
+    parser.add_argument("--sesiones", type=int, default=10)
+    parser.add_argument("--rondas", type=int, default=5, help="acciones por sesión tras la carga inicial")
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos simulados por lectura de Sheets")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="guardar el informe en JSON")
+    parser.add_argument("--referencia", help="informe JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    informe = prueba_carga(os.path.join(RAIZ, args.script), args.sesiones, args.rondas, args.latencia, args.semilla)
+    print(json.dumps(informe, indent=2, ensure_ascii=False))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+    if args.referencia:
+        with open(args.referencia, encoding="utf-8") as f:
+            comparar(informe, json.load(f))
+    sys.exit(1 if informe["errores"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# --- CONFIGURACIÓN DE CLUBES ---
+# Cada club tiene su hoja de Google, su lista de equipos y su cuota de memoria.
+# Se leen de clubes.toml (o de la ruta en CLUB_CONFIG); ver clubes.example.toml.
+# Sin fichero, hay un único club con los equipos de siempre y la URL de secrets.toml.
+# 'archivo' son pestañas de temporadas pasadas (solo lectura): no salen en el selector
+# de equipo, pero entran en la búsqueda de jugadores parecidos (similitud.py).
+#
+# El club de cada sesión sale de la URL: https://.../?club=<id>
+import os
+import tomllib
+
+from cache_clubes import CUOTA_MB_POR_DEFECTO
+
+RUTA_CONFIG = os.environ.get("CLUB_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "clubes.toml"))
+
+# IMPORTANTE: los nombres de equipo son los que se ven en la app; los gid, los de cada pestaña
+EQUIPOS_POR_DEFECTO = {
+    "Preferente": "1039572604", "Juvenil A": "689736481",
+    "Juvenil B": "1086115076", "Cadete A": "325576234",
+    "Cadete B": "0", "Infantil A": "1612741636",
+    "Infantil B": "1284204032"
+}
+
+
+def cargar_clubes(spreadsheet_por_defecto=None, ruta=RUTA_CONFIG):
+    # Devuelve {id_club: {'nombre', 'spreadsheet', 'equipos', 'archivo', 'cuota_mb'}}
+    if not os.path.exists(ruta):
+        return {"principal": {
+            "nombre": "Club Analytics",
+            "spreadsheet": spreadsheet_por_defecto,
+            "equipos": dict(EQUIPOS_POR_DEFECTO),
+            "archivo": {},
+            "cuota_mb": CUOTA_MB_POR_DEFECTO,
+        }}
+
+    with open(ruta, "rb") as f:
+        config = tomllib.load(f)
+    clubes = {}
+    for id_club, datos in config.get("clubes", {}).items():
+        if not datos.get("equipos"):
+            raise ValueError(f"El club '{id_club}' no tiene equipos en {ruta}")
+        clubes[id_club] = {
+            "nombre": datos.get("nombre", id_club),
+            "spreadsheet": datos.get("spreadsheet", spreadsheet_por_defecto),
+            "equipos": {nombre: str(gid) for nombre, gid in datos["equipos"].items()},
+            "archivo": {nombre: str(gid) for nombre, gid in datos.get("archivo", {}).items()},
+            "cuota_mb": datos.get("cuota_mb", CUOTA_MB_POR_DEFECTO),
+        }
+    if not clubes:
+        raise ValueError(f"No hay ningún club en {ruta}")
+    return clubes
+
+
+def clave_hoja(id_club, gid):
+    # Clave de una hoja en las cachés compartidas (memoria compartida, fotos de arranque):
+    # el mismo gid en dos clubes son hojas distintas
+    return f"{id_club}.{gid}"
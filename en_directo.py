@@ -0,0 +1,150 @@
+# --- PARTIDO EN DIRECTO ---
+# Durante un partido el delegado va rellenando la jornada en curso. En modo directo
+# no se vuelve a cargar la temporada: un único sondeo por proceso y hoja lee solo
+# el bloque de columnas de esa jornada cada pocos segundos (tarea del planificador
+# de refrescos) y lo deja en EstadoDirecto con un número de versión. Las sesiones
+# abiertas lo recogen desde un fragmento que se repite cada segundo, así cada
+# cambio llega a todas sin que nadie relance el script entero.
+#
+# La primera lectura (cabecera y columnas de nombre y posición) es de la hoja
+# entera; después cada sondeo pide a Google solo el rango A1 del bloque, no la hoja
+# completa (ver leer_rango).
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+STATS_HOJA = ['C_NC', 'T', 'S', 'G', 'A', 'DA', 'R']
+INTERVALO_SONDEO = 2      # segundos entre lecturas del bloque de la jornada
+INACTIVIDAD_SONDEO = 30   # sin sesiones mirando en este tiempo, se deja de sondear
+
+
+def columnas_jornada(etiquetas, jornada):
+    # Posiciones (contiguas) del bloque de la jornada. etiquetas: primera fila de la
+    # cabecera (con celdas combinadas solo la primera del bloque tiene número)
+    etiquetas = pd.to_numeric(pd.Series(etiquetas), errors='coerce').ffill().to_numpy()
+    bloque = np.flatnonzero(etiquetas == jornada)
+    if len(bloque) == 0:
+        raise ValueError(f"La hoja no tiene columnas de la jornada {jornada}")
+    return bloque.tolist()
+
+
+def letra_columna(posicion):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letras = ""
+    posicion += 1
+    while posicion:
+        posicion, resto = divmod(posicion - 1, 26)
+        letras = chr(ord('A') + resto) + letras
+    return letras
+
+
+def rango_a1(columnas):
+    return f"{letra_columna(columnas[0])}:{letra_columna(columnas[-1])}"
+
+
+def url_rango(spreadsheet, gid, columnas):
+    # Exportación CSV de una hoja pública limitada a un rango de columnas
+    encontrado = re.search(r"/d/([^/]+)", spreadsheet)
+    clave = encontrado.group(1) if encontrado else spreadsheet
+    return (f"https://docs.google.com/spreadsheets/d/{clave}/export?format=csv"
+            f"&gid={gid}&range={rango_a1(columnas)}")
+
+
+def _rango_cuenta_servicio(cliente, spreadsheet, gid, columnas):
+    # Hoja privada: una llamada values.get de gspread con el rango, con las mismas
+    # credenciales que la conexión (el cliente no tiene un método público para abrirla)
+    libro = cliente._open_spreadsheet(spreadsheet=spreadsheet)
+    try:
+        hoja = libro.get_worksheet_by_id(int(gid))
+    except ValueError:
+        hoja = libro.worksheet(str(gid))  # pestaña por nombre
+    filas = hoja.get(rango_a1(columnas))
+    # gspread recorta las celdas vacías del final de cada fila
+    ancho = len(columnas)
+    return pd.DataFrame([list(fila) + [''] * (ancho - len(fila)) for fila in filas],
+                        columns=range(ancho)).replace('', np.nan)
+
+
+def leer_rango(conexion, spreadsheet, gid, columnas):
+    # Solo las columnas contiguas 'columnas' (todas las filas, sin cabecera) de la hoja.
+    # Con cuenta de servicio va por gspread; con hoja pública, por la exportación CSV
+    # con range=. Si eso falla, la lectura normal de la conexión (hoja entera) con usecols.
+    try:
+        cliente = getattr(conexion, 'client', None)
+        if hasattr(cliente, '_open_spreadsheet'):
+            return _rango_cuenta_servicio(cliente, spreadsheet, gid, columnas)
+        return pd.read_csv(url_rango(spreadsheet, gid, columnas), header=None)
+    except Exception:
+        return conexion.read(spreadsheet=spreadsheet, worksheet=gid, ttl=0, header=None, usecols=columnas)
+
+
+def leer_jornada(leer, jornada, previa=None):
+    # leer(columnas=None, **opciones) -> DataFrame sin cabecera de la hoja (o solo de
+    # esas columnas contiguas). previa: (bloque, jugadores) de la lectura anterior;
+    # sin ella se lee la hoja entera una vez para localizar el bloque y los nombres.
+    # pandas no admite usecols con doble cabecera, así que todo se lee sin cabecera.
+    if previa is None:
+        hoja = leer(header=None)
+        bloque = columnas_jornada(hoja.iloc[0].tolist(), jornada)
+        jugadores = hoja.iloc[2:, :2].reset_index(drop=True)
+        jugadores.columns = ['Nombre', 'Posición']
+    else:
+        bloque, jugadores = previa
+    df = leer(columnas=bloque, header=None)
+    valores = df.iloc[2:].reset_index(drop=True)
+    if len(valores) > len(jugadores):
+        raise ValueError("La hoja tiene filas nuevas; se vuelven a leer los nombres")
+    # Google recorta las filas vacías del final: se completan con ceros
+    valores = valores.reindex(range(len(jugadores)))
+    valores.columns = df.iloc[1].astype(str).str.strip().tolist()
+    valores = valores.loc[:, ~valores.columns.duplicated()].reindex(columns=STATS_HOJA)
+    datos = pd.concat([jugadores, valores.apply(pd.to_numeric, errors='coerce').fillna(0)], axis=1)
+    datos['Nombre'] = datos['Nombre'].astype(str)
+    return datos, (bloque, jugadores)
+
+
+class EstadoDirecto:
+    # Última lectura de cada jornada en directo: clave -> {'version', 'datos', 'leido', 'error'}.
+    # La versión solo sube si cambia el contenido (las sesiones no repintan por nada).
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jornadas = {}
+        self.columnas = {}  # clave -> (bloque, jugadores), para no releer la hoja en cada sondeo
+
+    def publicar(self, clave, datos):
+        resumen = hashlib.sha1(pd.util.hash_pandas_object(datos, index=False).values).hexdigest()
+        with self.lock:
+            previo = self.jornadas.get(clave, {})
+            cambia = previo.get('resumen') != resumen
+            self.jornadas[clave] = {
+                'version': previo.get('version', 0) + cambia,
+                'resumen': resumen,
+                'datos': datos if cambia else previo['datos'],
+                'leido': time.time(),
+                'error': None,
+            }
+
+    def fallo(self, clave, error):
+        # Se mantiene la última lectura buena; el panel avisa del error
+        with self.lock:
+            self.jornadas.setdefault(clave, {'version': 0, 'datos': None, 'leido': None})['error'] = error
+            self.columnas.pop(clave, None)  # por si han movido columnas en la hoja
+
+    def leer(self, clave):
+        with self.lock:
+            return dict(self.jornadas.get(clave, {'version': 0, 'datos': None, 'leido': None, 'error': None}))
+
+    def sondear(self, clave, leer, jornada):
+        # Tarea del planificador: una lectura del bloque de la jornada
+        try:
+            datos, previa = leer_jornada(leer, jornada, self.columnas.get(clave))
+        except Exception as e:
+            self.fallo(clave, f"{type(e).__name__}: {e}")
+            raise
+        with self.lock:
+            self.columnas[clave] = previa
+        self.publicar(clave, datos)
@@ -0,0 +1,250 @@
+# --- EVENTOS DE PARTIDO (MINUTO A MINUTO) ---
+# La hoja solo guarda totales por jornada (minutos T/S, goles, tarjetas). Para saber
+# quién estaba en el campo en cada gol hacen falta los eventos con su minuto. Son
+# opcionales: se suben en CSV o se apuntan uno a uno desde la app, y se guardan por
+# hoja en <CARPETA_CACHE>/eventos/<clave>.csv con las columnas
+#   jornada, minuto, tipo, jugador
+# Tipos:
+#   titular        en el once inicial (el minuto se ignora: empieza en el 0)
+#   entra / sale   cambios (en fútbol base se puede volver a entrar)
+#   gol            gol del equipo (jugador = goleador; puede ir vacío)
+#   gol_rival      gol en contra (sin jugador)
+#   amarilla       tarjeta amarilla
+#   roja           expulsión (también la doble amarilla): cierra su intervalo
+#
+# Con los eventos se forman intervalos en el campo [entra, sale) por jugador y
+# jornada. El resto (+/-, minutos con cada compañero, goles por fase) son búsquedas
+# ordenadas y sumas de NumPy sobre todos los intervalos de la temporada a la vez.
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from arranque import CARPETA_CACHE
+from memoria_compartida import bloqueo
+
+COLUMNAS = ['jornada', 'minuto', 'tipo', 'jugador']
+TIPOS = ['titular', 'entra', 'sale', 'gol', 'gol_rival', 'amarilla', 'roja']
+APERTURAS = ['titular', 'entra']
+CIERRES = ['sale', 'roja']
+SIN_JUGADOR = ['gol', 'gol_rival']  # tipos en los que el jugador es opcional
+FASES = 6  # tramos del partido para los goles por fase (de 15' en un partido de 90')
+
+
+def _ruta(clave):
+    return os.path.join(CARPETA_CACHE, "eventos", f"{clave}.csv")
+
+
+def vacio():
+    return pd.DataFrame({'jornada': pd.Series(dtype=int), 'minuto': pd.Series(dtype=float),
+                         'tipo': pd.Series(dtype=str), 'jugador': pd.Series(dtype=str)})
+
+
+def validar_eventos(df, jugadores, t_partido):
+    # Limpia un CSV de eventos y lo deja con COLUMNAS. Si algo no cuadra lanza
+    # ValueError con todas las filas erróneas (numeradas como en el fichero)
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    faltan = [c for c in COLUMNAS if c not in df.columns and c != 'jugador']
+    if faltan:
+        raise ValueError(f"Faltan columnas: {', '.join(faltan)}")
+    if 'jugador' not in df.columns:
+        df['jugador'] = ''
+
+    df = df[COLUMNAS].copy()
+    df['tipo'] = df['tipo'].astype(str).str.strip().str.lower()
+    df['jugador'] = df['jugador'].fillna('').astype(str).str.strip()
+    jornada = pd.to_numeric(df['jornada'], errors='coerce')
+    minuto = pd.to_numeric(df['minuto'], errors='coerce')
+    minuto = minuto.where(df['tipo'] != 'titular', 0)
+
+    errores = []
+    fila = np.arange(len(df)) + 2  # la 1 es la cabecera
+    comprobaciones = [
+        (jornada.isna() | (jornada <= 0), "jornada no válida"),
+        (minuto.isna() | (minuto < 0), "minuto no válido"),
+        (~df['tipo'].isin(TIPOS), f"tipo desconocido (valen: {', '.join(TIPOS)})"),
+        ((df['jugador'] == '') & ~df['tipo'].isin(SIN_JUGADOR), "falta el jugador"),
+        ((df['jugador'] != '') & ~df['jugador'].isin(jugadores), "jugador que no está en la plantilla"),
+    ]
+    for mascara, motivo in comprobaciones:
+        malas = fila[mascara.to_numpy()]
+        if len(malas):
+            errores.append(f"{motivo}: fila{'s' if len(malas) > 1 else ''} {', '.join(map(str, malas[:10]))}"
+                           + (" ..." if len(malas) > 10 else ""))
+    if errores:
+        raise ValueError("; ".join(errores))
+
+    df['jornada'] = jornada.astype(int)
+    # Los minutos del descuento (92', 93'...) cuentan como el último minuto del partido
+    df['minuto'] = np.minimum(minuto.astype(float), t_partido)
+    df.loc[df['tipo'] == 'gol_rival', 'jugador'] = ''
+    return df.sort_values(['jornada', 'minuto'], kind='stable').reset_index(drop=True)
+
+
+def leer_eventos(clave):
+    try:
+        df = pd.read_csv(_ruta(clave), dtype={'jugador': str}, keep_default_na=False)
+    except (OSError, pd.errors.EmptyDataError):
+        return vacio()
+    return df[COLUMNAS]
+
+
+def version_eventos(clave):
+    # Cambia cada vez que se guardan eventos (para las cachés); None si no hay
+    try:
+        return str(os.stat(_ruta(clave)).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def guardar_eventos(clave, nuevos, reemplazar_jornadas=True):
+    # reemplazar_jornadas: las jornadas que vienen en 'nuevos' sustituyen a las
+    # guardadas (volver a subir el CSV de un partido lo corrige, no lo duplica)
+    os.makedirs(os.path.dirname(_ruta(clave)), exist_ok=True)
+    with bloqueo(f"eventos.{clave}"):
+        previos = leer_eventos(clave)
+        if reemplazar_jornadas:
+            previos = previos[~previos['jornada'].isin(nuevos['jornada'])]
+        todos = pd.concat([previos, nuevos[COLUMNAS]], ignore_index=True)
+        todos = todos.sort_values(['jornada', 'minuto'], kind='stable')
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(_ruta(clave)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            todos.to_csv(f, index=False)
+        os.replace(tmp, _ruta(clave))
+    return len(todos)
+
+
+def intervalos(eventos, jugadores, t_partido):
+    # Intervalos [ini, fin) de cada jugador en el campo. Cada apertura (titular/entra)
+    # se cierra con la primera salida o roja posterior del mismo jugador y jornada, o
+    # con la siguiente apertura si falta la salida, o al final del partido.
+    # Devuelve arrays: jornada, jugador (índice en 'jugadores'), ini, fin, titular
+    i_jug = pd.Index(jugadores).get_indexer(eventos['jugador'])
+    jornada = eventos['jornada'].to_numpy(dtype=np.int64)
+    minuto = eventos['minuto'].to_numpy(dtype=np.float64)
+    tipo = eventos['tipo'].to_numpy()
+
+    # Clave ordenable (jornada, jugador, minuto) en un solo float
+    escala = float(t_partido) + 1
+    grupo = jornada * len(jugadores) + i_jug
+    clave = grupo * escala + minuto
+
+    abre = np.isin(tipo, APERTURAS) & (i_jug >= 0)
+    cierra = np.isin(tipo, CIERRES) & (i_jug >= 0)
+    orden = np.argsort(clave[abre], kind='stable')
+    clave_abre, grupo_abre = clave[abre][orden], grupo[abre][orden]
+    ini, titular = minuto[abre][orden], tipo[abre][orden] == 'titular'
+    clave_cierra = np.sort(clave[cierra])
+
+    fin = np.full(len(ini), float(t_partido))
+    # Primera salida a partir de cada entrada, si es del mismo grupo
+    pos = np.searchsorted(clave_cierra, clave_abre, side='left')
+    hay = pos < len(clave_cierra)
+    pos = np.minimum(pos, len(clave_cierra) - 1)
+    if len(clave_cierra):
+        candidata = clave_cierra[pos]
+        mismo = hay & (np.floor(candidata / escala) == grupo_abre)
+        fin = np.where(mismo, candidata - grupo_abre * escala, fin)
+    # Sin salida entre dos entradas: la primera termina donde empieza la segunda
+    siguiente_mismo = np.append(grupo_abre[1:] == grupo_abre[:-1], False)
+    fin = np.where(siguiente_mismo, np.minimum(fin, np.append(ini[1:], np.inf)), fin)
+
+    return {
+        'jornada': grupo_abre // len(jugadores),
+        'jugador': grupo_abre % len(jugadores),
+        'ini': ini,
+        'fin': np.maximum(fin, ini),
+        'titular': titular,
+    }
+
+
+def _contar_en_intervalos(inter, jornada_ev, minuto_ev, pesos_ev, t_partido):
+    # Suma de pesos de los eventos que caen en [ini, fin) de cada intervalo (en su
+    # jornada). Un evento en el minuto final cuenta para quien acaba el partido.
+    escala = float(t_partido) + 1
+    orden = np.argsort(jornada_ev * escala + minuto_ev, kind='stable')
+    claves = (jornada_ev * escala + minuto_ev)[orden]
+    acum = np.concatenate([[0.0], np.cumsum(pesos_ev[orden])])
+    fin = np.where(inter['fin'] >= t_partido, t_partido + 0.5, inter['fin'])
+    desde = np.searchsorted(claves, inter['jornada'] * escala + inter['ini'], side='left')
+    hasta = np.searchsorted(claves, inter['jornada'] * escala + fin, side='left')
+    return acum[hasta] - acum[desde]
+
+
+def analizar_eventos(eventos, jugadores, t_partido, fases=FASES):
+    # Devuelve {'jugadores', 'parejas', 'fases', 'minutos_jornada'}
+    jugadores = np.asarray(jugadores, dtype=object)
+    n = len(jugadores)
+    inter = intervalos(eventos, jugadores, t_partido)
+    duracion = inter['fin'] - inter['ini']
+
+    # +/-: goles a favor y en contra mientras cada intervalo estaba en el campo
+    goles = eventos[eventos['tipo'].isin(['gol', 'gol_rival'])]
+    jornada_gol = goles['jornada'].to_numpy(dtype=np.int64)
+    minuto_gol = goles['minuto'].to_numpy(dtype=np.float64)
+    a_favor = (goles['tipo'] == 'gol').to_numpy(dtype=np.float64)
+    gf = _contar_en_intervalos(inter, jornada_gol, minuto_gol, a_favor, t_partido)
+    gc = _contar_en_intervalos(inter, jornada_gol, minuto_gol, 1 - a_favor, t_partido)
+
+    def por_jugador(valores):
+        return np.bincount(inter['jugador'], weights=valores, minlength=n)
+
+    marcados = goles[goles['tipo'] == 'gol']['jugador'].value_counts()
+    tabla = pd.DataFrame({
+        'Nombre': jugadores,
+        'Minutos (eventos)': por_jugador(duracion),
+        'Goles a favor en campo': por_jugador(gf).astype(int),
+        'Goles en contra en campo': por_jugador(gc).astype(int),
+    })
+    tabla['+/-'] = tabla['Goles a favor en campo'] - tabla['Goles en contra en campo']
+    tabla['+/- por 90'] = np.round(np.divide(tabla['+/-'] * 90, tabla['Minutos (eventos)'],
+                                             out=np.zeros(n), where=tabla['Minutos (eventos)'] > 0), 2)
+    tabla['Goles'] = marcados.reindex(jugadores, fill_value=0).to_numpy()
+
+    # Minutos con cada compañero: cruce de todos los intervalos de una misma jornada
+    idx = pd.DataFrame({'jornada': inter['jornada'], 'i': np.arange(len(duracion))})
+    cruce = idx.merge(idx, on='jornada')
+    a, b = cruce['i_x'].to_numpy(), cruce['i_y'].to_numpy()
+    solape = np.maximum(np.minimum(inter['fin'][a], inter['fin'][b]) - np.maximum(inter['ini'][a], inter['ini'][b]), 0)
+    celda = inter['jugador'][a] * n + inter['jugador'][b]
+    parejas = np.bincount(celda, weights=solape, minlength=n * n).reshape(n, n)
+
+    # Goles y tarjetas por fase del partido
+    borde = np.linspace(0, t_partido, fases + 1)
+    etiquetas = [f"{int(borde[i])}'-{int(borde[i + 1])}'" for i in range(fases)]
+    fase = np.clip(np.searchsorted(borde, eventos['minuto'].to_numpy(dtype=np.float64), side='right') - 1, 0, fases - 1)
+    por_fase = pd.DataFrame({
+        col: np.bincount(fase[(eventos['tipo'].isin(tipos)).to_numpy()], minlength=fases)
+        for col, tipos in [('Goles a favor', ['gol']), ('Goles en contra', ['gol_rival']),
+                           ('Tarjetas', ['amarilla', 'roja'])]
+    }, index=pd.Index(etiquetas, name='Fase'))
+
+    # Minutos de titular y de suplente por jornada (para conciliar con la hoja)
+    minutos_jornada = pd.DataFrame({
+        'Jornada': inter['jornada'],
+        'Nombre': jugadores[inter['jugador']],
+        'T': np.where(inter['titular'], duracion, 0.0),
+        'S': np.where(inter['titular'], 0.0, duracion),
+    }).groupby(['Jornada', 'Nombre'], as_index=False).sum()
+
+    return {
+        'jugadores': tabla,
+        'parejas': pd.DataFrame(np.round(parejas).astype(int), index=jugadores, columns=jugadores),
+        'fases': por_fase,
+        'minutos_jornada': minutos_jornada,
+    }
+
+
+def conciliar(minutos_jornada, df_long, jugadores, jornadas, tolerancia=1):
+    # Compara los minutos T/S de los eventos con los de la hoja en las jornadas con
+    # alineación apuntada. Devuelve las filas (Jornada, Nombre) que no cuadran.
+    hoja = df_long[df_long['Jornada'].isin(jornadas) & df_long['Nombre'].isin(jugadores)]
+    hoja = hoja[(hoja['T'] > 0) | (hoja['S'] > 0)][['Jornada', 'Nombre', 'T', 'S']]
+    hoja = hoja.astype({'Jornada': int})
+    eventos = minutos_jornada[minutos_jornada['Jornada'].isin(jornadas)]
+    cruce = hoja.merge(eventos, on=['Jornada', 'Nombre'], how='outer', suffixes=(' hoja', ' eventos'))
+    cruce = cruce.fillna({'T hoja': 0, 'S hoja': 0, 'T eventos': 0, 'S eventos': 0})
+    difiere = (((cruce['T hoja'] - cruce['T eventos']).abs() > tolerancia)
+               | ((cruce['S hoja'] - cruce['S eventos']).abs() > tolerancia))
+    return cruce[difiere].sort_values(['Jornada', 'Nombre']).reset_index(drop=True)
@@ -0,0 +1,68 @@
+# --- FUENTE DE DATOS LOCAL ---
+# Sustituto de la conexión a Google Sheets para benchmarks y pruebas de carga.
+# Lee un CSV por pestaña (<gid>.csv) con la misma doble cabecera que la hoja:
+#   fila 1 -> número de jornada, fila 2 -> C_NC, T, S, G, A, DA, R
+# Se activa con la variable de entorno CLUB_DATOS_LOCAL=<carpeta>.
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+VARIABLE_ENTORNO = "CLUB_DATOS_LOCAL"
+STATS_HOJA = ['C_NC', 'T', 'S', 'G', 'A', 'DA', 'R']
+
+
+def carpeta_local():
+    return os.environ.get(VARIABLE_ENTORNO)
+
+
+class ConexionLocal:
+    # Misma firma que GSheetsConnection.read para poder cambiar una por otra
+    def __init__(self, carpeta, latencia=None):
+        self.carpeta = carpeta
+        # Latencia artificial (segundos) para simular la red de Sheets
+        self.latencia = float(os.environ.get("CLUB_DATOS_LATENCIA", 0)) if latencia is None else latencia
+        self.lecturas = 0
+
+    def read(self, spreadsheet=None, worksheet=None, header=0, ttl=None, **kwargs):
+        # ttl no hace nada: aquí no hay caché, cada lectura va al fichero
+        self.lecturas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        # Con varios clubes, cada spreadsheet puede tener su subcarpeta (<carpeta>/<spreadsheet>/<gid>.csv)
+        carpeta = self.carpeta
+        if spreadsheet and os.path.isdir(os.path.join(carpeta, spreadsheet)):
+            carpeta = os.path.join(carpeta, spreadsheet)
+        return pd.read_csv(os.path.join(carpeta, f"{worksheet}.csv"), header=header, **kwargs)
+
+
+def generar_hoja(ruta, n_jugadores=22, n_jornadas=30, jugadas=18, t_partido=80, semilla=0):
+    # Genera una hoja sintética con el formato del club (para benchmarks)
+    rng = np.random.default_rng(semilla)
+    posiciones = ['Portero', 'Portero'] + list(rng.choice(['Defensa', 'Centrocampista', 'Delantero'], n_jugadores - 2))
+
+    cabecera_1 = ['', ''] + [str(j) for j in range(1, n_jornadas + 1) for _ in STATS_HOJA]
+    cabecera_2 = ['Nombre', 'Posición'] + STATS_HOJA * n_jornadas
+
+    # Jugador x Jornada, vectorizado
+    forma = (n_jugadores, jugadas)
+    convocado = rng.random(forma) < 0.85
+    u = rng.random(forma)
+    completo = rng.random(forma) < 0.6
+    tit = np.where(convocado & (u < 0.5), np.where(completo, t_partido, rng.integers(40, t_partido, forma)), 0)
+    sup = np.where(convocado & (u >= 0.5) & (u < 0.8), rng.integers(5, 40, forma), 0)
+    goles = (convocado & (rng.random(forma) < 0.15)).astype(int)
+    amarillas = (convocado & (rng.random(forma) < 0.1)).astype(int)
+    ceros = np.zeros(forma, dtype=int)
+    bloque = np.stack([convocado.astype(int), tit, sup, goles, amarillas, ceros, ceros], axis=2).reshape(n_jugadores, -1)
+
+    filas = [[f"Jugador {i}", posiciones[i]] + bloque[i].tolist() + [''] * (len(STATS_HOJA) * (n_jornadas - jugadas))
+             for i in range(n_jugadores)]
+    pd.DataFrame([cabecera_1, cabecera_2] + filas).to_csv(ruta, header=False, index=False)
+
+
+def generar_club(carpeta, gids, **kwargs):
+    os.makedirs(carpeta, exist_ok=True)
+    for semilla, gid in enumerate(gids):
+        generar_hoja(os.path.join(carpeta, f"{gid}.csv"), semilla=semilla, **kwargs)
@@ -0,0 +1,152 @@
+# --- HISTORIAL DE VERSIONES DE CADA HOJA ---
+# Cada versión nueva de una hoja se guarda como un manifiesto pequeño que apunta a
+# bloques por jornada, y cada bloque se guarda una sola vez con el hash de su
+# contenido como nombre. Si en una actualización solo se corrigió la J7, solo se
+# escribe el bloque nuevo de la J7: el disco crece con las ediciones, no con los refrescos.
+#
+#   <CARPETA_CACHE>/historial/<clave>/bloques/<hash>.npz     filas con datos de una jornada
+#   <CARPETA_CACHE>/historial/<clave>/versiones/<ms>_<version>.json
+#
+# Un bloque solo guarda los jugadores con algún dato en esa jornada, así añadir un
+# jugador a la plantilla no cambia los bloques de las jornadas anteriores.
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from arranque import CARPETA_CACHE
+from memoria_compartida import bloqueo
+
+STATS_HOJA = ['C_NC', 'T', 'S', 'G', 'A', 'DA', 'R']  # lo que se escribe a mano en la hoja
+
+
+def _carpeta(clave, *partes):
+    return os.path.join(CARPETA_CACHE, "historial", str(clave), *partes)
+
+
+def _guardar_bloque(clave, nombres, posiciones, valores):
+    nombres = np.asarray(nombres, dtype=str)
+    posiciones = np.asarray(posiciones, dtype=str)
+    valores = np.ascontiguousarray(valores, dtype=np.float64)
+    h = hashlib.sha1()
+    for parte in (nombres, posiciones, valores):
+        h.update(parte.tobytes())
+    resumen = h.hexdigest()[:20]
+    ruta = _carpeta(clave, "bloques", f"{resumen}.npz")
+    if not os.path.exists(ruta):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, nombres=nombres, posiciones=posiciones, valores=valores)
+        os.replace(tmp, ruta)
+    return resumen
+
+
+def leer_bloque(clave, resumen):
+    with np.load(_carpeta(clave, "bloques", f"{resumen}.npz")) as datos:
+        return pd.DataFrame(datos['valores'], columns=STATS_HOJA,
+                            index=pd.MultiIndex.from_arrays([datos['nombres'], datos['posiciones']],
+                                                            names=['Nombre', 'Posición']))
+
+
+def guardar_version(clave, version, df_long):
+    # df_long: formato largo de DashBoard3 (Nombre, Posición, Jornada + STATS_HOJA).
+    # Devuelve False si la versión ya estaba (los refrescos sin cambios no ocupan nada).
+    os.makedirs(_carpeta(clave, "bloques"), exist_ok=True)
+    os.makedirs(_carpeta(clave, "versiones"), exist_ok=True)
+    with bloqueo(f"historial.{clave}"):
+        if any(v['version'] == version for v in listar_versiones(clave)[-1:]):
+            return False
+
+        jornadas = df_long['Jornada'].to_numpy()
+        valores = df_long[STATS_HOJA].to_numpy(dtype=np.float64)
+        con_datos = (valores != 0).any(axis=1)
+        nombres = df_long['Nombre'].astype(str).to_numpy()
+        posiciones = df_long['Posición'].astype(str).to_numpy()
+
+        bloques = {}
+        for jornada in np.unique(jornadas):
+            filas = (jornadas == jornada) & con_datos
+            bloques[str(int(jornada))] = _guardar_bloque(clave, nombres[filas], posiciones[filas], valores[filas])
+
+        plantilla = df_long[['Nombre', 'Posición']].drop_duplicates().astype(str)
+        ahora = time.time()
+        manifiesto = {
+            'version': version,
+            'fecha': ahora,
+            'plantilla': plantilla.to_numpy().tolist(),
+            'bloques': bloques,
+        }
+        ruta = _carpeta(clave, "versiones", f"{int(ahora * 1000)}_{version}.json")
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+    return True
+
+
+def listar_versiones(clave):
+    # [{'version', 'fecha', 'fichero'}] de la más antigua a la más reciente
+    try:
+        ficheros = sorted(f for f in os.listdir(_carpeta(clave, "versiones")) if f.endswith(".json"))
+    except OSError:
+        return []
+    versiones = []
+    for fichero in ficheros:
+        ms, version = fichero[:-5].split("_", 1)
+        versiones.append({'version': version, 'fecha': int(ms) / 1000, 'fichero': fichero})
+    return versiones
+
+
+def leer_manifiesto(clave, fichero):
+    with open(_carpeta(clave, "versiones", fichero), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def comparar_versiones(clave, fichero_a, fichero_b):
+    # Diferencias de A (antes) a B (después). Las jornadas con el mismo bloque se
+    # saltan sin leerlas; en las demás se comparan columnas enteras de NumPy.
+    # Devuelve (celdas, por_jugador, totales, altas, bajas)
+    a = leer_manifiesto(clave, fichero_a)
+    b = leer_manifiesto(clave, fichero_b)
+
+    partes = []
+    for jornada in sorted(set(a['bloques']) | set(b['bloques']), key=int):
+        bloque_a, bloque_b = a['bloques'].get(jornada), b['bloques'].get(jornada)
+        if bloque_a == bloque_b:
+            continue
+        df_a = leer_bloque(clave, bloque_a) if bloque_a else pd.DataFrame(columns=STATS_HOJA)
+        df_b = leer_bloque(clave, bloque_b) if bloque_b else pd.DataFrame(columns=STATS_HOJA)
+        # Mismas filas en los dos lados (un jugador sin datos cuenta como ceros)
+        filas = df_a.index.union(df_b.index)
+        antes = df_a.reindex(filas, fill_value=0).to_numpy(dtype=np.float64)
+        despues = df_b.reindex(filas, fill_value=0).to_numpy(dtype=np.float64)
+        i_fila, i_col = np.nonzero(antes != despues)
+        if len(i_fila) == 0:
+            continue
+        partes.append(pd.DataFrame({
+            'Jornada': int(jornada),
+            'Nombre': filas.get_level_values(0)[i_fila],
+            'Posición': filas.get_level_values(1)[i_fila],
+            'Estadística': np.asarray(STATS_HOJA)[i_col],
+            'Antes': antes[i_fila, i_col],
+            'Después': despues[i_fila, i_col],
+        }))
+
+    columnas = ['Jornada', 'Nombre', 'Posición', 'Estadística', 'Antes', 'Después', 'Cambio']
+    celdas = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=columnas[:-1])
+    celdas['Cambio'] = celdas['Después'] - celdas['Antes']
+
+    # Cambio neto por jugador y estadística (una columna por estadística)
+    por_jugador = celdas.pivot_table(index=['Nombre', 'Posición'], columns='Estadística', values='Cambio',
+                                     aggfunc='sum', fill_value=0).reindex(columns=STATS_HOJA, fill_value=0)
+    totales = por_jugador.sum()
+
+    plantilla_a = {tuple(p) for p in a['plantilla']}
+    plantilla_b = {tuple(p) for p in b['plantilla']}
+    altas = sorted(plantilla_b - plantilla_a)
+    bajas = sorted(plantilla_a - plantilla_b)
+    return celdas[columnas], por_jugador.reset_index(), totales, altas, bajas
@@ -0,0 +1,164 @@
+# --- LECTURA RESILIENTE ---
+# Envuelve la lectura de una hoja para que un fallo puntual de la API de Google
+# no tumbe la página:
+#   - timeout: la lectura corre en un hilo y se deja de esperar a los N segundos
+#   - reintentos con espera exponencial y jitter completo (uniforme entre 0 y la espera)
+#   - cortocircuito por spreadsheet: tras varios fallos seguidos se deja de llamar
+#     durante un rato y se va directamente a la última carga buena
+# Quién llama decide qué hacer con LecturaFallida (normalmente, usar la última foto).
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TimeoutFuturo
+
+import telemetria
+
+TIMEOUT_LECTURA = 15     # segundos por intento
+INTENTOS = 3
+ESPERA_BASE = 0.5        # segundos; se dobla en cada reintento
+ESPERA_MAX = 8
+UMBRAL_FALLOS = 3        # intentos fallidos seguidos que abren el circuito
+ENFRIAMIENTO = 30        # segundos con el circuito abierto antes de volver a probar
+
+HILOS_POR_SPREADSHEET = 4  # lecturas simultáneas (o colgadas) de un mismo spreadsheet
+
+# Un hilo colgado por timeout no se puede matar: sigue ocupando su hueco hasta que
+# termina. Por eso cada spreadsheet tiene sus propios hilos (uno colgado no frena a
+# los demás clubes) y, si están todos ocupados, la lectura falla al momento y cuenta
+# para el cortocircuito en vez de quedarse en cola detrás de los colgados.
+
+
+class LecturaFallida(Exception):
+    pass
+
+
+class CircuitoAbierto(LecturaFallida):
+    pass
+
+
+class Cortocircuito:
+    # cerrado -> (UMBRAL_FALLOS fallos seguidos) -> abierto -> (ENFRIAMIENTO) -> semiabierto
+    # En semiabierto pasa un único intento: si sale bien se cierra, si falla se vuelve a abrir.
+    def __init__(self, umbral=UMBRAL_FALLOS, enfriamiento=ENFRIAMIENTO):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_desde = None
+        self.probando = False
+
+    def permitir(self):
+        with self.lock:
+            if self.abierto_desde is None:
+                return True
+            if time.monotonic() - self.abierto_desde < self.enfriamiento or self.probando:
+                return False
+            self.probando = True  # semiabierto: solo esta llamada prueba
+            return True
+
+    def exito(self):
+        with self.lock:
+            self.fallos = 0
+            self.abierto_desde = None
+            self.probando = False
+
+    def fallo(self):
+        with self.lock:
+            self.fallos += 1
+            if self.probando or self.fallos >= self.umbral:
+                self.abierto_desde = time.monotonic()
+            self.probando = False
+
+    def estado(self):
+        with self.lock:
+            if self.abierto_desde is None:
+                return "cerrado"
+            return "semiabierto" if self.probando else "abierto"
+
+
+class Hilos:
+    # Hilos de lectura de un spreadsheet, con la cuenta de los que siguen ocupados
+    # (también los de lecturas que ya dieron timeout)
+    def __init__(self, nombre, maximo=HILOS_POR_SPREADSHEET):
+        self.maximo = maximo
+        self.lock = threading.Lock()
+        self.ocupados = 0
+        self.pool = ThreadPoolExecutor(max_workers=maximo, thread_name_prefix=f"lectura-{nombre}"[:40])
+
+    def lanzar(self, leer):
+        # Futuro de leer() o None si todos los hilos están ocupados
+        with self.lock:
+            if self.ocupados >= self.maximo:
+                return None
+            self.ocupados += 1
+        futuro = self.pool.submit(leer)
+        futuro.add_done_callback(self._liberar)
+        return futuro
+
+    def _liberar(self, futuro):
+        with self.lock:
+            self.ocupados -= 1
+
+
+_circuitos = {}
+_hilos = {}
+_circuitos_lock = threading.Lock()
+
+
+def cortocircuito(spreadsheet):
+    with _circuitos_lock:
+        return _circuitos.setdefault(spreadsheet, Cortocircuito())
+
+
+def hilos(spreadsheet):
+    with _circuitos_lock:
+        if spreadsheet not in _hilos:
+            _hilos[spreadsheet] = Hilos(str(spreadsheet)[-12:])
+        return _hilos[spreadsheet]
+
+
+def espera_reintento(intento, base=ESPERA_BASE, maximo=ESPERA_MAX):
+    # Jitter completo: evita que todos los procesos reintenten a la vez
+    return random.uniform(0, min(maximo, base * 2 ** intento))
+
+
+def leer_con_reintentos(leer, spreadsheet, gid, club="", intentos=INTENTOS, timeout=TIMEOUT_LECTURA):
+    # leer() hace la llamada real. Devuelve su resultado o lanza LecturaFallida.
+    circuito = cortocircuito(spreadsheet)
+    lectores = hilos(spreadsheet)
+    ultimo_error = None
+    for intento in range(intentos):
+        if not circuito.permitir():
+            raise CircuitoAbierto(f"Google Sheets no responde; se reintentará en {circuito.enfriamiento} s")
+        if intento:
+            telemetria.REINTENTOS_SHEETS.inc(club=club, gid=gid)
+        futuro = lectores.lanzar(leer)
+        try:
+            if futuro is None:
+                raise RuntimeError(f"{lectores.maximo} lecturas de esta hoja siguen sin responder")
+            with telemetria.LECTURA_SHEETS.medir(club=club, gid=gid):
+                resultado = futuro.result(timeout=timeout)
+        except TimeoutFuturo:
+            ultimo_error = f"sin respuesta en {timeout} s"
+        except Exception as e:
+            ultimo_error = str(e)
+        else:
+            circuito.exito()
+            return resultado
+        telemetria.ERRORES_SHEETS.inc(club=club, gid=gid)
+        circuito.fallo()
+        if intento < intentos - 1:
+            time.sleep(espera_reintento(intento))
+    raise LecturaFallida(f"{intentos} intentos fallidos ({ultimo_error})")
+
+
+def hace_cuanto(instante):
+    # Texto corto para el aviso de datos antiguos
+    segundos = max(0, time.time() - instante)
+    if segundos < 90:
+        return f"{int(segundos)} s"
+    if segundos < 5400:
+        return f"{int(segundos // 60)} min"
+    if segundos < 172800:
+        return f"{int(segundos // 3600)} h"
+    return f"{int(segundos // 86400)} días"
@@ -0,0 +1,196 @@
+# --- TEMPORADA EN MEMORIA COMPARTIDA ---
+# Con varios procesos de Streamlit en la misma máquina, cada hoja se descarga y
+# se parsea una sola vez: el proceso que llega primero la publica como ficheros
+# .npy en /dev/shm y el resto los mapea en solo lectura (np.load con mmap_mode),
+# así la memoria no crece al añadir procesos.
+#
+# Estructura por hoja:
+#   <carpeta>/<clave>/v_<version>/*.npy + meta.json   (versiones inmutables)
+#   <carpeta>/<clave>/ACTUAL                          (puntero a la versión vigente)
+#   <carpeta>/<clave>.descarga.lock                   (solo un proceso descarga)
+#   <carpeta>/<clave>.lock                            (publicación del puntero)
+# El cambio de versión es un os.replace del puntero: atómico para los lectores.
+# La descarga (con sus reintentos) nunca se hace esperando a otro proceso: si otro
+# ya está descargando, se sirve al momento la versión publicada, aunque esté caducada.
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+def _carpeta_por_defecto():
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm/club_analytics"
+    return os.path.join(tempfile.gettempdir(), "club_analytics")
+
+
+CARPETA = os.environ.get("CLUB_MEMORIA_DIR", _carpeta_por_defecto())
+VERSIONES_GUARDADAS = 2  # la vigente y la anterior (por si alguien aún la está leyendo)
+ESPERA_PRIMERA_CARGA = 60  # segundos que se espera a otro proceso si aún no hay nada publicado
+
+
+def _dir_clave(clave):
+    return os.path.join(CARPETA, str(clave))
+
+
+@contextmanager
+def bloqueo(clave):
+    os.makedirs(CARPETA, exist_ok=True)
+    with open(os.path.join(CARPETA, f"{clave}.lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def bloqueo_sin_espera(clave, espera=0.0):
+    # Como bloqueo, pero cede True/False: False si otro proceso lo tiene tras 'espera' segundos
+    os.makedirs(CARPETA, exist_ok=True)
+    with open(os.path.join(CARPETA, f"{clave}.lock"), "w") as f:
+        if fcntl is None:
+            yield True
+            return
+        limite = time.monotonic() + espera
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= limite:
+                    yield False
+                    return
+                time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def leer_puntero(clave):
+    try:
+        with open(os.path.join(_dir_clave(clave), "ACTUAL"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_json(ruta, datos):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+
+def publicar(clave, version, arrays, meta):
+    base = _dir_clave(clave)
+    os.makedirs(base, exist_ok=True)
+    destino = os.path.join(base, f"v_{version}")
+    if not os.path.isdir(destino):
+        # Se escribe en una carpeta temporal y se renombra: nadie ve una versión a medias
+        tmp = tempfile.mkdtemp(dir=base, prefix=".tmp_")
+        for nombre, array in arrays.items():
+            np.save(os.path.join(tmp, f"{nombre}.npy"), np.ascontiguousarray(array))
+        _escribir_json(os.path.join(tmp, "meta.json"), meta)
+        os.rename(tmp, destino)
+    ahora = time.time()
+    # 'publicado' decide si está reciente (invalidar lo pone a 0); 'guardado' es
+    # cuándo se leyó de verdad, para avisar de la antigüedad si se usa de respaldo
+    _escribir_json(os.path.join(base, "ACTUAL"), {"version": version, "publicado": ahora, "guardado": ahora})
+    _limpiar(base, version)
+
+
+def _limpiar(base, vigente):
+    # Borra versiones antiguas. En Linux un fichero borrado sigue siendo válido
+    # para los procesos que ya lo tienen mapeado.
+    versiones = [d for d in os.listdir(base) if d.startswith("v_")]
+    versiones.sort(key=lambda d: os.path.getmtime(os.path.join(base, d)), reverse=True)
+    for d in versiones[VERSIONES_GUARDADAS:]:
+        if d != f"v_{vigente}":
+            shutil.rmtree(os.path.join(base, d), ignore_errors=True)
+
+
+def mapear(clave):
+    # Devuelve (version, meta, arrays) con los arrays mapeados en solo lectura
+    puntero = leer_puntero(clave)
+    if puntero is None:
+        return None
+    carpeta = os.path.join(_dir_clave(clave), f"v_{puntero['version']}")
+    try:
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            fichero[:-4]: np.load(os.path.join(carpeta, fichero), mmap_mode="r")
+            for fichero in os.listdir(carpeta) if fichero.endswith(".npy")
+        }
+    except OSError:
+        return None
+    return puntero["version"], meta, arrays
+
+
+def guardado(clave):
+    puntero = leer_puntero(clave)
+    return None if puntero is None else puntero.get("guardado", puntero["publicado"])
+
+
+def es_reciente(clave, ttl):
+    puntero = leer_puntero(clave)
+    return puntero is not None and time.time() - puntero["publicado"] < ttl
+
+
+def invalidar(clave=None):
+    # Marca la hoja (o todas) como caducada: la próxima lectura vuelve a descargar
+    claves = [clave] if clave is not None else (os.listdir(CARPETA) if os.path.isdir(CARPETA) else [])
+    for c in claves:
+        puntero = leer_puntero(c)
+        if puntero is not None:
+            _escribir_json(os.path.join(_dir_clave(c), "ACTUAL"), dict(puntero, publicado=0))
+
+
+def obtener_o_publicar(clave, ttl, cargar, espera=ESPERA_PRIMERA_CARGA):
+    # cargar() -> (version, arrays, meta). Solo se llama si no hay una versión
+    # reciente, y solo en el proceso que consigue el bloqueo de descarga (sin esperar).
+    # Los demás mapean al momento la versión publicada, aunque esté caducada; solo si
+    # todavía no hay ninguna esperan (hasta 'espera' s) a que el otro la publique.
+    # La red y los reintentos quedan fuera del bloqueo de publicación, que solo cubre
+    # escribir la versión y cambiar el puntero.
+    if es_reciente(clave, ttl):
+        mapeado = mapear(clave)
+        if mapeado is not None:
+            return mapeado
+    limite = time.monotonic() + espera
+    while True:
+        with bloqueo_sin_espera(f"{clave}.descarga") as descargo:
+            if descargo:
+                mapeado = mapear(clave) if es_reciente(clave, ttl) else None
+                if mapeado is not None:
+                    return mapeado  # la publicó otro proceso mientras tanto
+                version, arrays, meta = cargar()
+                with bloqueo(clave):
+                    publicar(clave, version, arrays, meta)
+                break
+        mapeado = mapear(clave)
+        if mapeado is not None:
+            return mapeado
+        if time.monotonic() >= limite:
+            raise TimeoutError(f"Otro proceso lleva más de {espera} s descargando la hoja")
+        time.sleep(0.1)
+    # Otro proceso puede invalidar o limpiar entre medias: se reintenta y, si aun así
+    # no se puede mapear, se devuelve lo cargado
+    for _ in range(3):
+        mapeado = mapear(clave)
+        if mapeado is not None:
+            return mapeado
+    return version, meta, arrays
@@ -0,0 +1,111 @@
+# --- REGISTRO DE MÉTRICAS DERIVADAS ---
+# Cada métrica se declara una sola vez aquí y la usan los dos dashboards.
+# evaluar_metricas recorre el registro en orden sobre arrays de NumPy (una
+# métrica puede usar las anteriores) y añade todas las columnas de golpe.
+#
+# Tipos:
+#   suma        -> cols: lista de columnas a sumar
+#   resta       -> a - b
+#   producto    -> a * b
+#   ratio       -> num / den (0 si den es 0)
+#   por90       -> valor / minutos * 90 (0 si no hay minutos)
+#   porcentaje  -> num / den * 100 (0 si den es 0)
+#   umbral      -> categoría según cortes, p. ej. el semáforo 30/70 %
+# Opciones: 'decimales' (redondeo) y 'entero' (para recuentos).
+# Un operando que empieza por '@' es un valor de contexto (t_partido, ...).
+import numpy as np
+import pandas as pd
+
+ETIQUETAS_SEMAFORO = ['Rojo (<30%)', 'Naranja (30-70%)', 'Verde (>70%)']
+
+REGISTRO = [
+    {'nombre': 'Min. Posibles', 'tipo': 'producto', 'a': 'Convocatorias', 'b': '@t_partido'},
+    {'nombre': 'G_x_min', 'tipo': 'ratio', 'num': 'Minutos totales', 'den': 'Goles', 'decimales': 1},
+    {'nombre': 'A_x_min', 'tipo': 'ratio', 'num': 'Minutos totales', 'den': 'Amarillas', 'decimales': 1},
+    {'nombre': 'R_x_min', 'tipo': 'ratio', 'num': 'Minutos totales', 'den': 'Rojas', 'decimales': 1},
+    # Porcentaje de minutos jugados de los partidos en los que ha estado convocado
+    {'nombre': '% Jugado (Disp)', 'tipo': 'porcentaje', 'num': 'Minutos totales', 'den': 'Min. Posibles'},
+    # Porcentaje de minutos jugados con respecto al total del equipo
+    {'nombre': '% Jugado (Total)', 'tipo': 'porcentaje', 'num': 'Minutos totales', 'den': '@min_totales_equipo'},
+    {'nombre': 'Goles_90', 'tipo': 'por90', 'valor': 'Goles', 'minutos': 'Minutos totales', 'decimales': 2},
+    {'nombre': 'Tarjetas', 'tipo': 'suma', 'cols': ['Amarillas', 'Dobles A.', 'Rojas'], 'entero': True},
+    {'nombre': 'Partidos suplente', 'tipo': 'resta', 'a': 'Jugados', 'b': 'Titular', 'entero': True},
+    {'nombre': 'Rol_jugador', 'tipo': 'umbral', 'col': '% Jugado (Disp)', 'cortes': [30, 70],
+     'etiquetas': ETIQUETAS_SEMAFORO},
+    {'nombre': 'Rol_jugador_equipo', 'tipo': 'umbral', 'col': '% Jugado (Total)', 'cortes': [30, 70],
+     'etiquetas': ETIQUETAS_SEMAFORO},
+]
+
+_OPERANDOS = ['a', 'b', 'num', 'den', 'valor', 'minutos', 'col']
+
+
+def _dividir(num, den):
+    # División segura: 0 cuando el denominador es 0 o no es un número
+    num, den = np.broadcast_arrays(np.asarray(num, dtype=float), np.asarray(den, dtype=float))
+    validos = (den != 0) & np.isfinite(den) & np.isfinite(num)
+    return np.divide(num, den, out=np.zeros(num.shape), where=validos)
+
+
+def _entradas(metrica):
+    return metrica.get('cols', []) + [metrica[k] for k in _OPERANDOS if k in metrica]
+
+
+def metricas_numericas(registro=REGISTRO):
+    # Nombres de las métricas que dan un número (las que se pueden graficar)
+    return [m['nombre'] for m in registro if m['tipo'] != 'umbral']
+
+
+def evaluar_metricas(df, contexto=None, registro=REGISTRO, columnas=None):
+    # columnas: nombre del registro -> nombre de la columna en este df, para los
+    # dashboards que usan otros nombres (vale para entradas y salidas)
+    contexto = contexto or {}
+    columnas = columnas or {}
+    n = len(df)
+    datos = {}
+    nuevas = {}
+
+    def valor(nombre):
+        if nombre.startswith('@'):
+            return np.full(n, float(contexto[nombre[1:]]))
+        if nombre not in datos:
+            datos[nombre] = pd.to_numeric(df[columnas.get(nombre, nombre)], errors='coerce').to_numpy(dtype=float)
+        return datos[nombre]
+
+    def disponible(nombre):
+        if nombre.startswith('@'):
+            return nombre[1:] in contexto
+        return nombre in datos or columnas.get(nombre, nombre) in df.columns
+
+    for m in registro:
+        if not all(disponible(e) for e in _entradas(m)):
+            continue  # este dashboard no tiene los datos de entrada
+        tipo = m['tipo']
+        if tipo == 'suma':
+            res = np.nansum([valor(c) for c in m['cols']], axis=0)
+        elif tipo == 'resta':
+            res = valor(m['a']) - valor(m['b'])
+        elif tipo == 'producto':
+            res = valor(m['a']) * valor(m['b'])
+        elif tipo == 'ratio':
+            res = _dividir(valor(m['num']), valor(m['den']))
+        elif tipo == 'por90':
+            res = _dividir(valor(m['valor']), valor(m['minutos'])) * 90
+        elif tipo == 'porcentaje':
+            res = _dividir(valor(m['num']), valor(m['den'])) * 100
+        elif tipo == 'umbral':
+            # Mismo criterio que pd.cut con bins [-inf, 30, 70, inf]: intervalos (a, b]
+            codigos = np.searchsorted(m['cortes'], np.nan_to_num(valor(m['col'])), side='left')
+            nuevas[columnas.get(m['nombre'], m['nombre'])] = pd.Categorical.from_codes(codigos, m['etiquetas'])
+            continue
+        else:
+            raise ValueError(f"Tipo de métrica desconocido: {tipo}")
+
+        if 'decimales' in m:
+            res = np.round(res, m['decimales'])
+        if m.get('entero'):
+            res = res.astype(int)
+        datos[m['nombre']] = res
+        nuevas[columnas.get(m['nombre'], m['nombre'])] = res
+
+    # Todas las columnas nuevas se añaden de una vez
+    return df.assign(**nuevas)
@@ -0,0 +1,95 @@
+# --- PAQUETE SIN CONEXIÓN (TABLETS EN EL BANQUILLO) ---
+# Un único fichero con la temporada de todos los equipos de un club para abrir
+# DashBoard3 sin red: CLUB_PAQUETE=<ruta> streamlit run DashBoard3.py
+#
+# Es un zip sin comprimir (como .npz) con tres miembros:
+#   manifiesto.json   club, fecha y, por equipo: gid, versión, jornada, partidos, t_partido
+#   largo.arrow       df_long de cada equipo: un record batch por equipo
+#   stats.arrow       estadísticas por jugador ya agrupadas (sin las métricas derivadas,
+#                     que se recalculan con el registro de metricas.py al abrir)
+# Los .arrow son Arrow IPC con compresión zstd por columna. Como el zip no comprime,
+# cada miembro se mapea en memoria directamente desde el fichero: abrir el paquete
+# solo lee el manifiesto, y al elegir equipo se descomprime su batch y nada más.
+import io
+import json
+import mmap
+import struct
+import time
+import zipfile
+
+import pyarrow as pa
+
+from metricas import REGISTRO
+
+FORMATO = 1
+VARIABLE_ENTORNO = "CLUB_PAQUETE"
+COMPRESION = "zstd"
+
+
+def _ipc(tablas):
+    # Lista de DataFrames -> bytes de un fichero Arrow IPC (un record batch por DataFrame).
+    # El esquema común une los de todas las tablas: un equipo con una columna entera donde
+    # otro la tiene decimal se guarda como decimal, y las columnas que faltan van vacías
+    if tablas:
+        esquema = pa.unify_schemas([pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+                                    for df in tablas], promote_options="permissive")
+    else:
+        esquema = pa.schema([])  # club sin ningún equipo cargado
+    salida = io.BytesIO()
+    with pa.ipc.new_file(salida, esquema, options=pa.ipc.IpcWriteOptions(compression=COMPRESION)) as escritor:
+        for df in tablas:
+            # Vía Table: una columna que falta (NaN) pasada a texto largo sale en varios
+            # trozos, que RecordBatch.from_pandas no admite; se juntan en un solo batch
+            tabla = pa.Table.from_pandas(df.reindex(columns=esquema.names), schema=esquema, preserve_index=False)
+            escritor.write_batch(pa.RecordBatch.from_arrays([c.combine_chunks() for c in tabla.columns],
+                                                            schema=esquema))
+    return salida.getvalue()
+
+
+def exportar(club, nombre_club, equipos):
+    # equipos: {nombre: {'gid', 'df_long', 'df_stats', 'version', 'jornada', 'partidos', 't_partido'}}
+    # Devuelve los bytes del paquete (para st.download_button)
+    derivadas = [m['nombre'] for m in REGISTRO]
+    manifiesto = {
+        'formato': FORMATO,
+        'club': club,
+        'nombre': nombre_club,
+        'fecha': time.time(),
+        'equipos': [{'nombre': nombre, 'gid': e['gid'], 'version': e['version'], 'jornada': int(e['jornada']),
+                     'partidos': int(e['partidos']), 't_partido': float(e['t_partido'])}
+                    for nombre, e in equipos.items()],
+    }
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as z:
+        z.writestr("manifiesto.json", json.dumps(manifiesto, ensure_ascii=False))
+        z.writestr("largo.arrow", _ipc([e['df_long'] for e in equipos.values()]))
+        z.writestr("stats.arrow", _ipc([e['df_stats'].drop(columns=derivadas, errors='ignore')
+                                        for e in equipos.values()]))
+    return salida.getvalue()
+
+
+class Paquete:
+    # Paquete abierto en modo solo lectura. Los miembros .arrow se leen del mmap sin copiarlos
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with zipfile.ZipFile(ruta) as z:
+            self.manifiesto = json.loads(z.read("manifiesto.json"))
+            if self.manifiesto.get('formato') != FORMATO:
+                raise ValueError(f"Formato de paquete no soportado: {self.manifiesto.get('formato')}")
+            miembros = {info.filename: info for info in z.infolist()}
+        self.largo = pa.ipc.open_file(self._miembro(miembros["largo.arrow"]))
+        self.stats = pa.ipc.open_file(self._miembro(miembros["stats.arrow"]))
+        self.equipos = {e['nombre']: (i, e) for i, e in enumerate(self.manifiesto['equipos'])}
+
+    def _miembro(self, info):
+        # Datos de un miembro sin comprimir: tras la cabecera local (30 bytes + nombre + extra)
+        largo_nombre, largo_extra = struct.unpack("<HH", self.mapa[info.header_offset + 26:info.header_offset + 30])
+        inicio = info.header_offset + 30 + largo_nombre + largo_extra
+        return pa.py_buffer(self.mapa)[inicio:inicio + info.file_size]
+
+    def equipo(self, nombre):
+        # (df_long, df_stats sin métricas derivadas, datos del manifiesto)
+        i, datos = self.equipos[nombre]
+        return self.largo.get_batch(i).to_pandas(), self.stats.get_batch(i).to_pandas(), datos
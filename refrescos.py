@@ -0,0 +1,110 @@
+# --- REFRESCOS EN SEGUNDO PLANO (REPARTO JUSTO ENTRE CLUBES) ---
+# Unos pocos hilos vuelven a leer las hojas que se están usando antes de que caduquen,
+# para que los entrenadores no esperen a Google. Los clubes se atienden por turnos
+# (round-robin, una tarea por turno) y cada club tiene como mucho una tarea en marcha:
+# un club con muchos equipos no deja sin refrescos a los demás, y uno cuya hoja no
+# responde (reintentos y timeouts) solo ocupa un hilo. Dentro de un club va primero
+# la tarea más antigua. Las tareas de hojas que nadie ha abierto en un rato dejan de
+# ejecutarse, y se olvidan si siguen así mucho más tiempo.
+# Además de hojas, sirve para cualquier trabajo periódico por club.
+import threading
+import time
+
+import telemetria
+
+
+class PlanificadorRefrescos:
+    def __init__(self, intervalo, inactividad=600, pausa=1.0, hilos=4):
+        self.intervalo = intervalo      # segundos entre refrescos de una misma hoja
+        self.inactividad = inactividad  # sin visitas en este tiempo, no se refresca
+        self.pausa = pausa              # espera cuando no hay nada pendiente
+        self.n_hilos = hilos
+        self.lock = threading.Lock()
+        self.tareas = {}  # club -> {clave: {'refrescar', 'visto', 'refrescado'}}
+        self.turno = []   # orden de los clubes en el round-robin
+        self.en_curso = set()  # clubes con una tarea ejecutándose
+        self.hilos = []
+
+    def registrar(self, club, clave, refrescar, inmediato=False):
+        # Se llama en cada visita: apunta la tarea (o renueva su última visita).
+        # inmediato: la primera vez se ejecuta ya, sin esperar un intervalo
+        ahora = time.monotonic()
+        with self.lock:
+            if club not in self.tareas:
+                self.tareas[club] = {}
+                self.turno.append(club)
+            tarea = self.tareas[club].setdefault(clave, {"refrescado": ahora - self.intervalo if inmediato else ahora})
+            tarea["refrescar"] = refrescar
+            tarea["visto"] = ahora
+        self._arrancar()
+
+    def eliminar(self, club, clave=None):
+        # Olvida una tarea (o todas las del club, p. ej. si sale de clubes.toml).
+        # Si está ejecutándose, termina, pero no se vuelve a programar.
+        with self.lock:
+            tareas = self.tareas.get(club)
+            if tareas is None:
+                return
+            if clave is None:
+                tareas.clear()
+            else:
+                tareas.pop(clave, None)
+            if not tareas:
+                del self.tareas[club]
+                self.turno.remove(club)
+
+    def clubes(self):
+        with self.lock:
+            return list(self.tareas)
+
+    def _arrancar(self):
+        with self.lock:
+            self.hilos = [h for h in self.hilos if h.is_alive()]
+            while len(self.hilos) < self.n_hilos:
+                hilo = threading.Thread(target=self._bucle, name=f"refrescos-{len(self.hilos)}", daemon=True)
+                self.hilos.append(hilo)
+                hilo.start()
+
+    def siguiente(self):
+        # (club, clave, tarea) a refrescar ahora, o None. Rota el turno de clubes y
+        # se salta los que ya tienen una tarea en marcha (hay que llamar a terminado).
+        ahora = time.monotonic()
+        with self.lock:
+            for _ in range(len(self.turno)):
+                club = self.turno.pop(0)
+                self.turno.append(club)
+                if club in self.en_curso:
+                    continue
+                tareas = self.tareas[club]
+                for clave in [c for c, t in tareas.items() if ahora - t["visto"] >= 3 * self.inactividad]:
+                    del tareas[clave]
+                pendientes = [
+                    (t["refrescado"], clave, t) for clave, t in tareas.items()
+                    if ahora - t["refrescado"] >= self.intervalo and ahora - t["visto"] < self.inactividad
+                ]
+                if pendientes:
+                    _, clave, tarea = min(pendientes, key=lambda p: p[0])
+                    tarea["refrescado"] = ahora  # aunque falle: no se reintenta en bucle
+                    self.en_curso.add(club)
+                    return club, clave, tarea
+        return None
+
+    def terminado(self, club):
+        with self.lock:
+            self.en_curso.discard(club)
+
+    def _bucle(self):
+        while True:
+            elegido = self.siguiente()
+            if elegido is None:
+                time.sleep(self.pausa)
+                continue
+            club, clave, tarea = elegido
+            try:
+                tarea["refrescar"]()
+                telemetria.REFRESCOS.inc(club=club)
+            except Exception:
+                # El fallo ya lo cuenta la lectura; la sesión tirará del respaldo
+                telemetria.REFRESCOS_FALLIDOS.inc(club=club)
+            finally:
+                self.terminado(club)
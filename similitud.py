@@ -0,0 +1,104 @@
+# --- JUGADORES PARECIDOS EN TODO EL CLUB ---
+# Cada jugador de cada equipo (y de las temporadas de archivo) es un vector de rasgos
+# relativos a su equipo (% de minutos, titularidades, goles por 90...), para que un
+# cadete y un juvenil se puedan comparar aunque no jueguen los mismos partidos.
+# Opcionalmente se añade su perfil por jornadas: el % de minutos en cada tramo de la
+# temporada (quien empezó jugando poco y acabó de fijo, o al revés).
+#
+# El índice es una matriz Jugador x Rasgo estandarizada (media 0, desviación 1 en el
+# club), que se construye una vez por versión de los datos. Como los pesos cambian en
+# cada consulta, los vecinos se buscan por fuerza bruta: una distancia ponderada para
+# todos los jugadores del club es un producto de matrices de NumPy (microsegundos
+# para unos miles de jugadores) y argpartition elige los k más cercanos.
+import numpy as np
+import pandas as pd
+
+from metricas import evaluar_metricas
+
+# Rasgos que no están en el registro de metricas.py (dependen de los partidos del equipo)
+REGISTRO_RASGOS = [
+    {'nombre': '% Titular', 'tipo': 'porcentaje', 'num': 'Titular', 'den': 'Jugados'},
+    {'nombre': '% Completos', 'tipo': 'porcentaje', 'num': 'Completos', 'den': 'Jugados'},
+    {'nombre': '% Convocado', 'tipo': 'porcentaje', 'num': 'Convocatorias', 'den': '@partidos'},
+    {'nombre': 'Tarjetas_90', 'tipo': 'por90', 'valor': 'Tarjetas', 'minutos': 'Minutos totales'},
+]
+
+RASGOS = ['% Jugado (Total)', '% Jugado (Disp)', '% Convocado', '% Titular', '% Completos',
+          'Goles_90', 'Tarjetas_90']
+TRAMOS_PERFIL = 6  # tramos de la temporada en el perfil por jornadas
+PERFIL = [f'Perfil T{i + 1}' for i in range(TRAMOS_PERFIL)]
+COLUMNAS_CLAVE = ['Equipo', 'Nombre', 'Posición']
+
+
+def perfil_jornadas(minutos, t_partido, tramos=TRAMOS_PERFIL):
+    # minutos: Jugador x Jornada (solo jornadas que disputó el equipo).
+    # Devuelve Jugador x Tramo con el % medio de minutos en cada tramo. Los tramos se
+    # reparten sobre las jornadas jugadas, así equipos con más o menos partidos tienen
+    # perfiles del mismo tamaño (con menos jornadas que tramos, se repiten jornadas).
+    n = minutos.shape[1]
+    if n == 0 or not t_partido:
+        return np.zeros((minutos.shape[0], tramos))
+    acum = np.concatenate([np.zeros((minutos.shape[0], 1)), np.cumsum(minutos, axis=1)], axis=1)
+    ini = np.arange(tramos) * n // tramos
+    fin = np.maximum((np.arange(tramos) + 1) * n // tramos, ini + 1)
+    return (acum[:, fin] - acum[:, ini]) / (fin - ini) / t_partido * 100
+
+
+def rasgos_equipo(equipo, df_stats, minutos, t_partido, partidos_jugados):
+    # Una fila por jugador: claves + RASGOS + PERFIL.
+    # minutos: Jugador x Jornada jugada, en el mismo orden de filas que df_stats
+    tabla = evaluar_metricas(df_stats, contexto={'partidos': partidos_jugados}, registro=REGISTRO_RASGOS)
+    tabla = tabla[['Nombre', 'Posición'] + RASGOS].reset_index(drop=True)
+    tabla.insert(0, 'Equipo', equipo)
+    perfil = pd.DataFrame(perfil_jornadas(np.asarray(minutos, dtype=np.float64), t_partido), columns=PERFIL)
+    return pd.concat([tabla, perfil], axis=1)
+
+
+def construir_indice(tablas):
+    # tablas: lista de rasgos_equipo. Devuelve {'jugadores', 'columnas', 'matriz'}
+    tabla = pd.concat(tablas, ignore_index=True)
+    columnas = RASGOS + PERFIL
+    valores = tabla[columnas].to_numpy(dtype=np.float64)
+    valores = np.nan_to_num(valores, nan=0.0, posinf=0.0, neginf=0.0)
+    desviacion = valores.std(axis=0)
+    desviacion[desviacion == 0] = 1  # un rasgo igual para todos no separa a nadie
+    matriz = (valores - valores.mean(axis=0)) / desviacion
+    return {
+        'jugadores': tabla[COLUMNAS_CLAVE + RASGOS].copy(),
+        'columnas': columnas,
+        'matriz': np.ascontiguousarray(matriz, dtype=np.float32),
+    }
+
+
+def vector_pesos(pesos, peso_perfil=0.0):
+    # pesos: {rasgo: peso}. El perfil cuenta como un rasgo más repartido entre sus tramos
+    return np.array([pesos.get(c, 0.0) for c in RASGOS] + [peso_perfil / TRAMOS_PERFIL] * TRAMOS_PERFIL,
+                    dtype=np.float32)
+
+
+def vecinos(indice, fila, pesos, k=10, posiciones=None, excluir_equipo=False):
+    # Los k jugadores más parecidos al de la fila 'fila' del índice (sin contarlo a él).
+    # posiciones: solo esas posiciones; excluir_equipo: solo de otros equipos.
+    jugadores = indice['jugadores']
+    matriz = indice['matriz']
+    total = float(pesos.sum())
+    if total <= 0:
+        raise ValueError("Todos los pesos son 0")
+
+    dif = matriz - matriz[fila]
+    distancias = np.sqrt((dif * dif) @ pesos / total)
+
+    validos = np.ones(len(jugadores), dtype=bool)
+    validos[fila] = False
+    if posiciones is not None:
+        validos &= jugadores['Posición'].isin(posiciones).to_numpy()
+    if excluir_equipo:
+        validos &= (jugadores['Equipo'] != jugadores['Equipo'].iat[fila]).to_numpy()
+    candidatos = np.flatnonzero(validos)
+    k = min(k, len(candidatos))
+    if k > 0:
+        candidatos = candidatos[np.argpartition(distancias[candidatos], k - 1)[:k]]
+    cercanos = candidatos[np.argsort(distancias[candidatos], kind='stable')][:k]
+    resultado = jugadores.iloc[cercanos].reset_index(drop=True)
+    resultado.insert(3, 'Distancia', np.round(distancias[cercanos], 3))
+    return resultado
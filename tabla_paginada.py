@@ -0,0 +1,111 @@
+# --- TABLA PAGINADA EN EL SERVIDOR ---
+# st.dataframe manda la tabla entera al navegador: con la tabla por jornada de todo
+# el club (y varias temporadas) son cientos de miles de filas. Aquí el filtrado y la
+# ordenación se hacen en el servidor y solo viaja la página visible.
+#
+# Lo que se cachea es el orden de las filas (un array de índices) por combinación de
+# filtros y ordenación, no la tabla: pasar de página es cortar ese array y hacer un
+# iloc de 50 filas.
+#
+# Uso:
+#   mostrar_tabla(df, club, "stats", version_datos)
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import telemetria
+from cache_clubes import cache_por_club
+
+OPERADORES = ['contiene', '==', '>=', '<=']
+TAMANOS_PAGINA = [25, 50, 100, 200]
+
+
+def mascara_filtro(columna, operador, valor):
+    # Máscara booleana de un filtro sobre una columna (Series)
+    if operador == 'contiene':
+        # Sobre los valores distintos (pocos nombres que se repiten en cada jornada)
+        codigos, distintos = pd.factorize(columna)
+        encontrados = pd.Index(distintos.astype(str)).str.contains(str(valor), case=False, regex=False)
+        return np.append(np.asarray(encontrados, dtype=bool), False)[codigos]
+    if pd.api.types.is_numeric_dtype(columna):
+        try:
+            valor = float(valor)
+        except ValueError:
+            return np.zeros(len(columna), dtype=bool)
+        datos = columna.to_numpy(dtype=np.float64)
+    else:
+        datos = columna.astype(str).to_numpy()
+        valor = str(valor)
+    if operador == '==':
+        return datos == valor
+    if operador == '>=':
+        return datos >= valor
+    if operador == '<=':
+        return datos <= valor
+    raise ValueError(f"Operador desconocido: {operador}")
+
+
+@telemetria.cache_medida("tabla_paginada", cache_por_club())
+def indices_vista(club, nombre, version, filtros, orden, _df):
+    # Filas (posiciones) que pasan los filtros, ya ordenadas.
+    # filtros: tupla de (columna, operador, valor); orden: (columna, descendente) o None.
+    # Con una tupla de columnas basta con que cumpla una (la búsqueda de texto)
+    mascara = np.ones(len(_df), dtype=bool)
+    for columna, operador, valor in filtros:
+        columnas = columna if isinstance(columna, tuple) else (columna,)
+        cumple = np.zeros(len(_df), dtype=bool)
+        for c in columnas:
+            cumple |= mascara_filtro(_df[c], operador, valor)
+        mascara &= cumple
+    indices = np.flatnonzero(mascara)
+    if orden is not None and len(indices):
+        columna, descendente = orden
+        valores = _df[columna].iloc[indices].reset_index(drop=True)
+        posiciones = valores.sort_values(ascending=not descendente, kind='stable', na_position='last').index
+        indices = indices[posiciones.to_numpy()]
+    return indices.astype(np.int32)
+
+
+def mostrar_tabla(df, club, nombre, version, columnas_texto=('Nombre',)):
+    # Tabla con búsqueda, filtros, ordenación y páginas. nombre distingue las claves de
+    # los widgets y de la caché; version debe cambiar cuando cambia df.
+    columnas = df.columns.tolist()
+    # La búsqueda va sobre las columnas de texto pedidas que existan (o la primera de texto)
+    columnas_texto = ([c for c in columnas_texto if c in columnas]
+                      or [c for c in columnas if pd.api.types.is_string_dtype(df[c])][:1])
+    col_t1, col_t2, col_t3, col_t4 = st.columns([2, 2, 1, 1])
+    busqueda = col_t1.text_input("Buscar", key=f"{nombre}_buscar", placeholder=", ".join(columnas_texto))
+    columna_orden = col_t2.selectbox("Ordenar por", ["(sin ordenar)"] + columnas, key=f"{nombre}_orden")
+    descendente = col_t3.checkbox("Descendente", value=True, key=f"{nombre}_desc")
+    tam_pagina = col_t4.selectbox("Filas", TAMANOS_PAGINA, index=1, key=f"{nombre}_tam")
+
+    filtros = []
+    with st.expander("Filtros"):
+        for i in range(2):
+            col_f1, col_f2, col_f3 = st.columns([2, 1, 2])
+            columna = col_f1.selectbox("Columna", ["-"] + columnas, key=f"{nombre}_fcol{i}")
+            operador = col_f2.selectbox("Condición", OPERADORES, key=f"{nombre}_fop{i}")
+            valor = col_f3.text_input("Valor", key=f"{nombre}_fval{i}")
+            if columna != "-" and valor:
+                filtros.append((columna, operador, valor))
+    if busqueda and columnas_texto:
+        filtros.append((tuple(columnas_texto), 'contiene', busqueda))
+
+    orden = None if columna_orden == "(sin ordenar)" else (columna_orden, descendente)
+    indices = indices_vista(club, nombre, version, tuple(filtros), orden, df)
+
+    paginas = max(1, -(-len(indices) // tam_pagina))
+    # Si los filtros dejan menos páginas, la página guardada no puede pasarse del máximo
+    if st.session_state.get(f"{nombre}_pagina", 1) > paginas:
+        st.session_state[f"{nombre}_pagina"] = paginas
+    col_p1, col_p2 = st.columns([1, 3])
+    pagina = int(col_p1.number_input("Página", 1, paginas, key=f"{nombre}_pagina"))
+    ventana = indices[(pagina - 1) * tam_pagina:pagina * tam_pagina]
+
+    # Solo la página visible sale hacia el navegador
+    st.dataframe(df.iloc[ventana], use_container_width=True, hide_index=True)
+    if len(indices):
+        col_p2.caption(f"Filas {(pagina - 1) * tam_pagina + 1}–{(pagina - 1) * tam_pagina + len(ventana)} "
+                       f"de {len(indices)} (página {pagina} de {paginas}; {len(df)} filas en total)")
+    else:
+        col_p2.caption(f"Ningún resultado ({len(df)} filas en total)")
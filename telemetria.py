@@ -0,0 +1,253 @@
+# --- TELEMETRÍA (FORMATO PROMETHEUS) ---
+# Contadores e histogramas en memoria del proceso, expuestos en texto plano en
+# http://127.0.0.1:<puerto>/metrics para que Prometheus los recoja.
+# Solo librería estándar: se puede importar antes del primer pintado.
+#
+# Métricas:
+#   club_sheets_lectura_segundos{club,gid}   descarga de la hoja
+#   club_sheets_errores_total{club,gid}      intentos de lectura fallidos
+#   club_sheets_reintentos_total{club,gid}   reintentos tras un fallo
+#   club_respaldo_total{club,gid}            veces que se sirvió la última carga buena
+#   club_parseo_segundos{club,gid}           de la tabla ancha a df_long
+# (con varios clubes el gid se repite, p. ej. "0": las hojas se distinguen por club y gid)
+#   club_cache_consultas_total{cache}        llamadas a una función cacheada
+#   club_cache_fallos_total{cache}           llamadas que tuvieron que calcular
+#   club_cache_expulsiones_total{cache}      recálculos de una clave que ya estuvo
+#                                            en caché (caducada, expulsada o borrada)
+#   club_cache_expulsiones_cuota_total{club} entradas expulsadas por pasarse de cuota
+#   club_refrescos_total{club}               refrescos en segundo plano (y fallidos)
+#   club_rerun_segundos{script,seccion}      duración de cada tramo del script
+#   club_bytes_enviados_total                tamaño aproximado de lo enviado al navegador
+#
+# El puerto sale de CLUB_METRICAS_PUERTO (9108 por defecto; 0 lo desactiva).
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PUERTO = int(os.environ.get("CLUB_METRICAS_PUERTO", "9108"))
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(claves, valores):
+    if not claves:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in zip(claves, valores)) + "}"
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.lock = threading.Lock()
+        self.valores = {}
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = tuple(etiquetas.get(e, "") for e in self.etiquetas)
+        with self.lock:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+
+    def valor(self, **etiquetas):
+        return self.valores.get(tuple(etiquetas.get(e, "") for e in self.etiquetas), 0)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self.lock:
+            for clave, valor in sorted(self.valores.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.cubetas = tuple(cubetas)
+        self.lock = threading.Lock()
+        self.series = {}  # clave -> [cuentas por cubeta (+Inf al final), suma]
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(etiquetas.get(e, "") for e in self.etiquetas)
+        with self.lock:
+            serie = self.series.setdefault(clave, [[0] * (len(self.cubetas) + 1), 0.0])
+            serie[0][bisect_left(self.cubetas, valor)] += 1
+            serie[1] += valor
+
+    def medir(self, **etiquetas):
+        # with histograma.medir(gid=...): observa lo que tarda el bloque
+        histograma = self
+
+        class _Medida:
+            def __enter__(self):
+                self.t0 = time.perf_counter()
+                return self
+
+            def __exit__(self, *exc):
+                histograma.observar(time.perf_counter() - self.t0, **etiquetas)
+                return False
+        return _Medida()
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self.lock:
+            for clave, (cuentas, suma) in sorted(self.series.items()):
+                acumulado = 0
+                for limite, n in zip(self.cubetas + ("+Inf",), cuentas):
+                    acumulado += n
+                    lineas.append(f"{self.nombre}_bucket"
+                                  f"{_etiquetas(self.etiquetas + ('le',), clave + (limite,))} {acumulado}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+# --- MÉTRICAS DEL CLUB ---
+LECTURA_SHEETS = Histograma("club_sheets_lectura_segundos", "Tiempo de descarga de una hoja", ["club", "gid"])
+ERRORES_SHEETS = Contador("club_sheets_errores_total", "Intentos de lectura de hoja fallidos", ["club", "gid"])
+REINTENTOS_SHEETS = Contador("club_sheets_reintentos_total", "Reintentos de lectura tras un fallo", ["club", "gid"])
+RESPALDO = Contador("club_respaldo_total", "Veces que se sirvio la ultima carga buena", ["club", "gid"])
+PARSEO = Histograma("club_parseo_segundos", "Tiempo de parseo de una hoja a formato largo", ["club", "gid"])
+CACHE_CONSULTAS = Contador("club_cache_consultas_total", "Llamadas a funciones cacheadas", ["cache"])
+CACHE_FALLOS = Contador("club_cache_fallos_total", "Llamadas cacheadas que tuvieron que calcular", ["cache"])
+CACHE_EXPULSIONES = Contador("club_cache_expulsiones_total",
+                             "Recalculos de una clave que ya estuvo en cache", ["cache"])
+EXPULSIONES_CUOTA = Contador("club_cache_expulsiones_cuota_total",
+                             "Entradas expulsadas por superar la cuota del club", ["club"])
+REFRESCOS = Contador("club_refrescos_total", "Refrescos de hojas en segundo plano", ["club"])
+REFRESCOS_FALLIDOS = Contador("club_refrescos_fallidos_total", "Refrescos en segundo plano fallidos", ["club"])
+RERUN = Histograma("club_rerun_segundos", "Duracion de cada tramo del script", ["script", "seccion"])
+BYTES_ENVIADOS = Contador("club_bytes_enviados_total", "Bytes aproximados enviados al navegador")
+
+METRICAS = [LECTURA_SHEETS, ERRORES_SHEETS, REINTENTOS_SHEETS, RESPALDO, PARSEO, CACHE_CONSULTAS, CACHE_FALLOS, CACHE_EXPULSIONES,
+            EXPULSIONES_CUOTA, REFRESCOS, REFRESCOS_FALLIDOS, RERUN, BYTES_ENVIADOS]
+
+
+def exponer():
+    return "\n".join(linea for m in METRICAS for linea in m.exponer()) + "\n"
+
+
+# --- CACHÉS ---
+CLAVES_RECORDADAS = 4096  # claves calculadas que se recuerdan por caché para detectar expulsiones
+
+
+def cache_medida(nombre, decorador):
+    # Envuelve un decorador de caché (st.cache_data(...), st.cache_resource(...)):
+    # cada llamada es una consulta y cada ejecución del cuerpo un fallo. Si el
+    # cuerpo se ejecuta para una clave que ya se calculó, es que la caché la perdió.
+    # Solo se recuerdan las últimas CLAVES_RECORDADAS (LRU, como resumen sha1): cada
+    # versión de cada hoja es una clave nueva y el conjunto no puede crecer sin límite.
+    def envolver(func):
+        firma = inspect.signature(func)
+        calculadas = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def calcular(*args, **kwargs):
+            CACHE_FALLOS.inc(cache=nombre)
+            # Misma clave que Streamlit: los argumentos con "_" no cuentan
+            argumentos = firma.bind(*args, **kwargs).arguments
+            clave = repr([(k, v) for k, v in argumentos.items() if not k.startswith("_")])
+            resumen = hashlib.sha1(clave.encode()).digest()
+            with lock:
+                if resumen in calculadas:
+                    CACHE_EXPULSIONES.inc(cache=nombre)
+                    calculadas.move_to_end(resumen)
+                else:
+                    calculadas[resumen] = None
+                    if len(calculadas) > CLAVES_RECORDADAS:
+                        calculadas.popitem(last=False)
+            return func(*args, **kwargs)
+
+        cacheada = decorador(calcular)
+
+        @functools.wraps(func)
+        def consultar(*args, **kwargs):
+            CACHE_CONSULTAS.inc(cache=nombre)
+            return cacheada(*args, **kwargs)
+
+        consultar.clear = cacheada.clear
+        return consultar
+    return envolver
+
+
+# --- DURACIÓN DEL RERUN POR TRAMOS ---
+class Tramos:
+    # tramos.marca('kpis') observa el tiempo desde la marca anterior con la etiqueta
+    # del tramo que termina; así la suma de tramos es el rerun completo.
+    def __init__(self, script, inicio=None):
+        self.script = script
+        self.anterior = inicio if inicio is not None else time.perf_counter()
+        self.inicio = self.anterior
+
+    def marca(self, seccion):
+        ahora = time.perf_counter()
+        RERUN.observar(ahora - self.anterior, script=self.script, seccion=seccion)
+        self.anterior = ahora
+
+    def fin(self):
+        RERUN.observar(time.perf_counter() - self.inicio, script=self.script, seccion="total")
+
+
+# --- BYTES ENVIADOS ---
+def _instalar_contador_bytes():
+    # Streamlit no publica este dato: contamos el tamaño serializado de cada
+    # mensaje que se encola hacia el navegador. Si cambia la API interna, se omite.
+    try:
+        from streamlit.runtime.app_session import AppSession
+    except ImportError:
+        return False
+    original = AppSession._enqueue_forward_msg
+    if getattr(original, "_telemetria", False):
+        return True
+
+    @functools.wraps(original)
+    def _enqueue_forward_msg(self, msg):
+        try:
+            BYTES_ENVIADOS.inc(msg.ByteSize())
+        except Exception:
+            pass
+        return original(self, msg)
+
+    _enqueue_forward_msg._telemetria = True
+    AppSession._enqueue_forward_msg = _enqueue_forward_msg
+    return True
+
+
+# --- SERVIDOR ---
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = exponer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass  # sin una línea de log por cada scrape
+
+
+def servir(puerto=PUERTO, host="127.0.0.1"):
+    # Arranca el endpoint en un hilo de fondo. Devuelve el servidor, o None si
+    # está desactivado o el puerto está ocupado. Las métricas son de cada proceso:
+    # con varios procesos, cada uno necesita su propio CLUB_METRICAS_PUERTO.
+    _instalar_contador_bytes()
+    if not puerto:
+        return None
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+    except OSError:
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="telemetria", daemon=True).start()
+    return servidor
@@ -0,0 +1,22 @@
+# Los módulos están en la raíz del repositorio (scripts de Streamlit, sin paquete)
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def carpetas(tmp_path, monkeypatch):
+    # Memoria compartida y caché en disco dentro de tmp_path (nunca las de la app real)
+    import alertas
+    import arranque
+    import eventos
+    import historial
+    import memoria_compartida
+
+    monkeypatch.setattr(memoria_compartida, "CARPETA", str(tmp_path / "memoria"))
+    for modulo in (arranque, alertas, eventos, historial):
+        monkeypatch.setattr(modulo, "CARPETA_CACHE", str(tmp_path / "cache"))
+    return tmp_path
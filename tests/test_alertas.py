@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+import alertas
+from metricas import ETIQUETAS_SEMAFORO
+
+
+def _tabla(equipo, amarillas, convocatorias=(5, 5)):
+    df = pd.DataFrame({
+        'Nombre': ['Ana', 'Bea|C'],
+        'Convocatorias': list(convocatorias),
+        'Amarillas': amarillas,
+        'Rol_jugador': [ETIQUETAS_SEMAFORO[2]] * 2,
+    })
+    convocado = np.ones((2, 4))
+    return alertas.tabla_equipo("club", equipo, df, convocado, np.ones(4, dtype=bool))
+
+
+def test_racha_final():
+    matriz = np.array([[True, False, True, True], [False, False, False, False], [True] * 4])
+    assert alertas.racha_final(matriz).tolist() == [2, 0, 4]
+
+
+def test_evaluar_reglas_ignora_jugadores_sin_convocatorias():
+    tabla = _tabla("Infantil", [4, 0], convocatorias=(5, 0))
+    tabla.loc[1, 'Rol_jugador'] = ETIQUETAS_SEMAFORO[0]
+    activas = alertas.evaluar_reglas(tabla)
+    assert activas[['Nombre', 'Regla', 'Valor']].values.tolist() == [['Ana', 'cuarta_amarilla', 4]]
+
+
+def test_alerta_solo_la_primera_vez(carpetas):
+    nuevas = alertas.procesar_alertas("club", _tabla("Infantil", [4, 0]), {"Infantil": "v1"})
+    assert [(a['jugador'], a['regla'], a['valor']) for a in nuevas] == [('Ana', 'cuarta_amarilla', 4)]
+    assert nuevas[0]['mensaje'] == "Ana (Infantil) acumula 4 amarillas"
+
+    # Misma versión: no se evalúa; versión nueva con la alerta aún activa: no se repite
+    assert alertas.procesar_alertas("club", _tabla("Infantil", [4, 0]), {"Infantil": "v1"}) == []
+    assert alertas.procesar_alertas("club", _tabla("Infantil", [5, 0]), {"Infantil": "v2"}) == []
+    assert len(alertas.leer_alertas("club")) == 1
+
+    # Un nombre con '|' no rompe la clave del estado
+    nuevas = alertas.procesar_alertas("club", _tabla("Infantil", [5, 4]), {"Infantil": "v3"})
+    assert [a['jugador'] for a in nuevas] == ['Bea|C']
+
+
+def test_alerta_resuelta_solo_en_el_equipo_evaluado(carpetas):
+    alertas.procesar_alertas("club", pd.concat([_tabla("Infantil", [4, 0]), _tabla("Cadete", [4, 0])]),
+                             {"Infantil": "v1", "Cadete": "v1"})
+    # Se reevalúa solo Cadete, ya sin amarillas: Infantil sigue activa
+    alertas.procesar_alertas("club", _tabla("Cadete", [0, 0]), {"Cadete": "v2"})
+    # Si Infantil vuelve con la alerta, no es nueva
+    assert alertas.procesar_alertas("club", _tabla("Infantil", [4, 0]), {"Infantil": "v2"}) == []
+    # Cadete vuelve a tenerla: es nueva otra vez
+    nuevas = alertas.procesar_alertas("club", _tabla("Cadete", [4, 0]), {"Cadete": "v3"})
+    assert [a['equipo'] for a in nuevas] == ['Cadete']
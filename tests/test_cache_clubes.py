@@ -0,0 +1,67 @@
+import threading
+import time
+
+import numpy as np
+
+from cache_clubes import CacheClubes, cache_por_club
+
+
+def _mb(n):
+    return np.zeros(n * 2**20, dtype=np.uint8)
+
+
+def test_cache_expulsa_lo_menos_usado_del_club():
+    cache = CacheClubes()
+    cache.fijar_cuota("a", 2.5)
+    cache.guardar("a", "uno", _mb(1))
+    cache.guardar("a", "dos", _mb(1))
+    cache.leer("a", "uno")  # "dos" pasa a ser la menos usada
+    cache.guardar("a", "tres", _mb(1))
+    assert cache.leer("a", "uno")[0] and cache.leer("a", "tres")[0]
+    assert not cache.leer("a", "dos")[0]
+    assert cache.uso()["a"][2:] == (2, 1)
+
+
+def test_cache_cuota_no_toca_otros_clubes():
+    cache = CacheClubes()
+    cache.fijar_cuota("a", 1.5)
+    cache.guardar("b", "x", _mb(1))
+    cache.guardar("a", "uno", _mb(1))
+    cache.guardar("a", "dos", _mb(1))
+    assert cache.leer("b", "x")[0]
+    assert not cache.leer("a", "uno")[0]
+    # La entrada recién guardada se queda aunque sola supere la cuota
+    cache.guardar("a", "grande", _mb(2))
+    assert cache.leer("a", "grande")[0]
+
+
+def test_cache_ttl():
+    cache = CacheClubes()
+    cache.guardar("a", "k", 1, ttl=0.05)
+    assert cache.leer("a", "k") == (True, 1)
+    time.sleep(0.06)
+    assert cache.leer("a", "k") == (False, None)
+
+
+def test_cache_por_club_calcula_una_vez_por_clave():
+    cache = CacheClubes()
+    llamadas = []
+
+    @cache_por_club(cache=cache)
+    def calcular(club, n, _df=None):
+        llamadas.append((club, n))
+        time.sleep(0.05)
+        return n * 2
+
+    hilos = [threading.Thread(target=calcular, args=("a", 1, object())) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert calcular("b", 1) == 2
+    assert llamadas == [("a", 1), ("b", 1)]
+
+    calcular.clear("a")
+    calcular("a", 1)
+    calcular("b", 1)
+    assert llamadas[-1] == ("a", 1) and len(llamadas) == 3
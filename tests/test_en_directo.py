@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+import en_directo
+from en_directo import EstadoDirecto, leer_jornada, leer_rango, letra_columna, url_rango
+
+
+def hoja_sintetica(n_jugadores=4, n_jornadas=3):
+    # Hoja sin cabecera: fila de jornadas, fila de estadísticas y una fila por jugador
+    stats = en_directo.STATS_HOJA
+    fila_jornadas = ['', ''] + [str(j) if i == 0 else '' for j in range(1, n_jornadas + 1) for i in range(len(stats))]
+    fila_stats = ['Nombre', 'Posición'] + stats * n_jornadas
+    filas = [[f'Jugador {i}', 'Defensa'] + [str(i + j) for j in range(len(stats) * n_jornadas)]
+             for i in range(n_jugadores)]
+    return pd.DataFrame([fila_jornadas, fila_stats] + filas).replace('', np.nan)
+
+
+def test_letras_y_url():
+    assert [letra_columna(i) for i in (0, 25, 26, 701, 702)] == ['A', 'Z', 'AA', 'ZZ', 'AAA']
+    url = url_rango("https://docs.google.com/spreadsheets/d/CLAVE/edit#gid=0", "55", [9, 10, 11])
+    assert url == "https://docs.google.com/spreadsheets/d/CLAVE/export?format=csv&gid=55&range=J:L"
+
+
+def test_leer_jornada_solo_relee_el_bloque():
+    hoja = hoja_sintetica()
+    pedidas = []
+
+    def leer(columnas=None, **opciones):
+        pedidas.append(columnas)
+        if columnas is None:
+            return hoja
+        return hoja.iloc[:-1, columnas]  # Google recorta las filas vacías del final
+
+    datos, previa = leer_jornada(leer, 2)
+    datos_2, _ = leer_jornada(leer, 2, previa)
+    assert pedidas == [None, list(range(9, 16)), list(range(9, 16))]
+    assert datos['Nombre'].tolist() == [f'Jugador {i}' for i in range(4)]
+    assert datos.loc[0, 'C_NC'] == 7 and datos.loc[3, 'C_NC'] == 0  # fila recortada -> ceros
+    pd.testing.assert_frame_equal(datos, datos_2)
+
+
+class HojaFalsa:
+    def __init__(self, hoja):
+        self.hoja = hoja
+        self.rangos = []
+
+    def get(self, rango):
+        self.rangos.append(rango)
+        valores = self.hoja.iloc[:, 9:16].fillna('').astype(str).values.tolist()
+        return [fila[:max([i + 1 for i, v in enumerate(fila) if v] or [0])] for fila in valores]
+
+
+class ClienteCuentaServicio:
+    def __init__(self, hoja):
+        self.hoja = hoja
+
+    def _open_spreadsheet(self, spreadsheet=None):
+        cliente = self
+
+        class Libro:
+            def get_worksheet_by_id(self, gid):
+                assert gid == 55
+                return cliente.hoja
+        return Libro()
+
+
+class ConexionFalsa:
+    def __init__(self, cliente):
+        self.client = cliente
+        self.lecturas = []
+
+    def read(self, **opciones):
+        self.lecturas.append(opciones)
+        return hoja_sintetica().iloc[:, opciones['usecols']]
+
+
+def test_leer_rango_con_cuenta_servicio_pide_solo_el_rango():
+    hoja = HojaFalsa(hoja_sintetica())
+    conexion = ConexionFalsa(ClienteCuentaServicio(hoja))
+    df = leer_rango(conexion, "privada", "55", list(range(9, 16)))
+    assert hoja.rangos == ['J:P'] and conexion.lecturas == []
+    assert df.shape == (6, 7) and df.iloc[1].tolist() == en_directo.STATS_HOJA
+
+
+def test_leer_rango_si_falla_la_exportacion_usa_la_conexion(monkeypatch):
+    def sin_red(*args, **kwargs):
+        raise OSError("403")
+    monkeypatch.setattr(en_directo.pd, "read_csv", sin_red)
+    conexion = ConexionFalsa(object())
+    df = leer_rango(conexion, "https://docs.google.com/spreadsheets/d/X/edit", "55", [9, 10])
+    assert conexion.lecturas[0]['usecols'] == [9, 10] and conexion.lecturas[0]['ttl'] == 0
+    assert df.shape[1] == 2
+
+
+def test_estado_directo_version_solo_sube_si_cambia():
+    estado = EstadoDirecto()
+    datos = pd.DataFrame({'Nombre': ['a'], 'G': [1]})
+    estado.publicar('k', datos)
+    estado.publicar('k', datos.copy())
+    assert estado.leer('k')['version'] == 1
+    estado.publicar('k', datos.assign(G=2))
+    assert estado.leer('k')['version'] == 2
+    estado.fallo('k', 'caída')
+    assert estado.leer('k')['error'] == 'caída' and estado.leer('k')['datos']['G'].iat[0] == 2
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import eventos
+
+JUGADORES = ['Ana', 'Bea', 'Carla']
+
+
+def _partido():
+    # J1 de 70': Ana y Bea titulares, Carla entra por Bea en el 40'
+    return eventos.validar_eventos(pd.DataFrame([
+        (1, 0, 'titular', 'Ana'),
+        (1, 0, 'titular', 'Bea'),
+        (1, 10, 'gol', 'Ana'),
+        (1, 40, 'sale', 'Bea'),
+        (1, 40, 'entra', 'Carla'),
+        (1, 50, 'gol_rival', ''),
+        (1, 72, 'gol', 'Carla'),  # descuento: cuenta como el minuto 70
+    ], columns=['Jornada', 'Minuto', 'Tipo', 'Jugador']), JUGADORES, 70)
+
+
+def test_validar_eventos_lista_todas_las_filas_malas():
+    df = pd.DataFrame({'jornada': [1, 0, 1], 'minuto': [5, 5, -1], 'tipo': ['gol', 'gol', 'penalti'],
+                       'jugador': ['Zoe', 'Ana', '']})
+    with pytest.raises(ValueError) as error:
+        eventos.validar_eventos(df, JUGADORES, 70)
+    mensaje = str(error.value)
+    assert "jornada no válida: fila 3" in mensaje
+    assert "minuto no válido: fila 4" in mensaje
+    assert "tipo desconocido" in mensaje
+    assert "jugador que no está en la plantilla: fila 2" in mensaje
+
+
+def test_intervalos():
+    inter = eventos.intervalos(_partido(), JUGADORES, 70)
+    tramos = sorted(zip(inter['jugador'].tolist(), inter['ini'].tolist(), inter['fin'].tolist()))
+    assert tramos == [(0, 0, 70), (1, 0, 40), (2, 40, 70)]
+
+
+def test_analizar_eventos():
+    analisis = eventos.analizar_eventos(_partido(), JUGADORES, 70)
+    tabla = analisis['jugadores'].set_index('Nombre')
+    assert tabla['Minutos (eventos)'].tolist() == [70, 40, 30]
+    # El gol del 70' es de quien acaba el partido; el del 50', con Carla y Ana en el campo
+    assert tabla['+/-'].tolist() == [1, 1, 0]
+    assert tabla['Goles'].tolist() == [1, 0, 1]
+    assert analisis['parejas'].loc['Ana', 'Carla'] == 30 and analisis['parejas'].loc['Bea', 'Carla'] == 0
+    assert analisis['fases']['Goles a favor'].sum() == 2
+
+
+def test_guardar_eventos_reemplaza_la_jornada(carpetas):
+    eventos.guardar_eventos("k", _partido())
+    assert eventos.guardar_eventos("k", _partido()) == len(_partido())
+    leidos = eventos.leer_eventos("k")
+    assert leidos['jugador'].tolist() == _partido()['jugador'].tolist()
+    assert eventos.version_eventos("k") is not None
+
+
+def test_conciliar():
+    minutos = eventos.analizar_eventos(_partido(), JUGADORES, 70)['minutos_jornada']
+    hoja = pd.DataFrame({'Jornada': [1, 1, 1], 'Nombre': JUGADORES, 'T': [70, 40, 0], 'S': [0, 0, 20]})
+    diferencias = eventos.conciliar(minutos, hoja, JUGADORES, [1])
+    assert diferencias['Nombre'].tolist() == ['Carla']
+    assert diferencias[['S hoja', 'S eventos']].values.tolist() == [[20, 30]]
@@ -0,0 +1,71 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import historial
+from historial import STATS_HOJA
+
+
+def _df_long(jugadores=('Ana', 'Bea'), jornadas=(1, 2, 3)):
+    filas = [{'Nombre': n, 'Posición': 'Defensa', 'Jornada': j, **{s: 0 for s in STATS_HOJA}}
+             for n in jugadores for j in jornadas]
+    df = pd.DataFrame(filas)
+    df['C_NC'] = 1
+    df['T'] = 60 + df['Jornada']  # cada jornada con su propio bloque
+    return df
+
+
+def _bloques(carpeta):
+    return os.listdir(os.path.join(carpeta, "cache", "historial", "k", "bloques"))
+
+
+def test_version_repetida_no_se_guarda(carpetas):
+    assert historial.guardar_version("k", "v1", _df_long())
+    assert not historial.guardar_version("k", "v1", _df_long())
+    assert [v['version'] for v in historial.listar_versiones("k")] == ["v1"]
+
+
+def test_solo_se_escriben_las_jornadas_editadas(carpetas):
+    historial.guardar_version("k", "v1", _df_long())
+    assert len(_bloques(carpetas)) == 3
+
+    df = _df_long()
+    df.loc[(df['Nombre'] == 'Ana') & (df['Jornada'] == 2), 'G'] = 2
+    time.sleep(0.002)  # los manifiestos se ordenan por milisegundo
+    historial.guardar_version("k", "v2", df)
+    assert len(_bloques(carpetas)) == 4
+
+    v1, v2 = (v['fichero'] for v in historial.listar_versiones("k"))
+    assert historial.leer_manifiesto("k", v1)['bloques']['1'] == historial.leer_manifiesto("k", v2)['bloques']['1']
+
+
+def test_comparar_versiones(carpetas):
+    historial.guardar_version("k", "v1", _df_long())
+    # Alta de Carla (solo juega la J3) y dos celdas corregidas
+    df = pd.concat([_df_long(), _df_long(('Carla',), (3,))], ignore_index=True)
+    df.loc[(df['Nombre'] == 'Ana') & (df['Jornada'] == 2), 'G'] = 2
+    df.loc[(df['Nombre'] == 'Bea') & (df['Jornada'] == 3), 'T'] = 30
+    time.sleep(0.002)
+    historial.guardar_version("k", "v2", df)
+
+    v1, v2 = (v['fichero'] for v in historial.listar_versiones("k"))
+    celdas, por_jugador, totales, altas, bajas = historial.comparar_versiones("k", v1, v2)
+    cambios = {(r.Jornada, r.Nombre, r.Estadística): r.Cambio for r in celdas.itertuples()}
+    assert cambios[(2, 'Ana', 'G')] == 2
+    assert cambios[(3, 'Bea', 'T')] == -33
+    # Carla aparece con datos en la J3: sus celdas pasan de 0 a su valor
+    assert cambios[(3, 'Carla', 'T')] == 63
+    assert totales['G'] == 2
+    assert altas == [('Carla', 'Defensa')] and bajas == []
+    assert np.isclose(por_jugador.set_index('Nombre').loc['Bea', 'T'], -33)
+
+
+def test_comparar_versiones_iguales(carpetas):
+    historial.guardar_version("k", "v1", _df_long())
+    time.sleep(0.002)
+    historial.guardar_version("k", "v2", _df_long())
+    v1, v2 = (v['fichero'] for v in historial.listar_versiones("k"))
+    celdas, por_jugador, totales, altas, bajas = historial.comparar_versiones("k", v1, v2)
+    assert celdas.empty and por_jugador.empty and not altas and not bajas
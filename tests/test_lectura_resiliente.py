@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+import lectura_resiliente
+import telemetria
+from lectura_resiliente import CircuitoAbierto, Cortocircuito, Hilos, LecturaFallida, leer_con_reintentos
+
+
+@pytest.fixture(autouse=True)
+def sin_esperas(monkeypatch):
+    # Circuitos e hilos nuevos en cada prueba y reintentos sin espera
+    monkeypatch.setattr(lectura_resiliente, "_circuitos", {})
+    monkeypatch.setattr(lectura_resiliente, "_hilos", {})
+    monkeypatch.setattr(lectura_resiliente, "espera_reintento", lambda intento: 0)
+
+
+def test_cortocircuito_se_abre_tras_el_umbral():
+    circuito = Cortocircuito(umbral=3, enfriamiento=60)
+    for _ in range(2):
+        assert circuito.permitir()
+        circuito.fallo()
+    assert circuito.estado() == "cerrado"
+    circuito.fallo()
+    assert circuito.estado() == "abierto"
+    assert not circuito.permitir()
+
+
+def test_cortocircuito_exito_reinicia_los_fallos():
+    circuito = Cortocircuito(umbral=2, enfriamiento=60)
+    circuito.fallo()
+    circuito.exito()
+    circuito.fallo()
+    assert circuito.estado() == "cerrado"
+
+
+def test_cortocircuito_semiabierto_deja_pasar_un_intento():
+    circuito = Cortocircuito(umbral=1, enfriamiento=0.05)
+    circuito.fallo()
+    assert not circuito.permitir()
+    time.sleep(0.06)
+    assert circuito.permitir()
+    assert circuito.estado() == "semiabierto"
+    assert not circuito.permitir()  # solo pasa una llamada de prueba
+
+    # La prueba falla: vuelve a abrirse con un enfriamiento completo
+    circuito.fallo()
+    assert circuito.estado() == "abierto"
+    assert not circuito.permitir()
+
+    # La siguiente prueba sale bien: se cierra
+    time.sleep(0.06)
+    assert circuito.permitir()
+    circuito.exito()
+    assert circuito.estado() == "cerrado"
+    assert circuito.permitir()
+
+
+def test_hilos_ocupados_rechazan_lecturas():
+    lectores = Hilos("prueba", maximo=1)
+    soltar = threading.Event()
+    futuro = lectores.lanzar(soltar.wait)
+    assert lectores.lanzar(lambda: None) is None
+    soltar.set()
+    futuro.result(timeout=5)
+    time.sleep(0.05)  # el hueco se libera en el callback del futuro
+    assert lectores.lanzar(lambda: 1).result(timeout=5) == 1
+
+
+def test_leer_con_reintentos_reintenta_hasta_conseguirlo():
+    respuestas = [RuntimeError("503"), "ok"]
+
+    def leer():
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    antes = telemetria.REINTENTOS_SHEETS.valor(club="c", gid="1")
+    assert leer_con_reintentos(leer, "hoja-a", "1", club="c") == "ok"
+    assert telemetria.REINTENTOS_SHEETS.valor(club="c", gid="1") == antes + 1
+    assert lectura_resiliente.cortocircuito("hoja-a").estado() == "cerrado"
+
+
+def test_leer_con_reintentos_abre_el_circuito_del_spreadsheet():
+    def leer():
+        raise RuntimeError("503")
+
+    with pytest.raises(LecturaFallida):
+        leer_con_reintentos(leer, "hoja-b", "0", intentos=lectura_resiliente.UMBRAL_FALLOS)
+    with pytest.raises(CircuitoAbierto):
+        leer_con_reintentos(lambda: "ok", "hoja-b", "0")
+    # Otro spreadsheet tiene su propio circuito
+    assert leer_con_reintentos(lambda: "ok", "hoja-c", "0") == "ok"
+
+
+def test_leer_con_reintentos_timeout():
+    soltar = threading.Event()
+    with pytest.raises(LecturaFallida, match="sin respuesta"):
+        leer_con_reintentos(soltar.wait, "hoja-d", "0", intentos=1, timeout=0.05)
+    soltar.set()
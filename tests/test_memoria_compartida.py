@@ -0,0 +1,83 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+import memoria_compartida
+
+
+def _datos(version):
+    return version, {'a': np.arange(5) * (1 if version == "v1" else 2)}, {'columnas': ['a']}
+
+
+def test_publicar_y_mapear(carpetas):
+    memoria_compartida.publicar("k", *_datos("v1"))
+    version, meta, arrays = memoria_compartida.mapear("k")
+    assert version == "v1" and meta == {'columnas': ['a']}
+    assert isinstance(arrays['a'], np.memmap) and arrays['a'].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_obtener_o_publicar_carga_una_vez(carpetas):
+    llamadas = []
+
+    def cargar():
+        llamadas.append(1)
+        return _datos("v1")
+
+    assert memoria_compartida.obtener_o_publicar("k", 60, cargar)[0] == "v1"
+    assert memoria_compartida.obtener_o_publicar("k", 60, cargar)[0] == "v1"
+    assert len(llamadas) == 1
+
+    memoria_compartida.invalidar("k")
+    assert memoria_compartida.obtener_o_publicar("k", 60, lambda: _datos("v2"))[0] == "v2"
+
+
+def _descarga_colgada(carpeta, empezada):
+    # Proceso que descarga durante una caída de Google: tarda y acaba fallando
+    memoria_compartida.CARPETA = carpeta
+
+    def cargar():
+        empezada.set()
+        time.sleep(3)
+        raise RuntimeError("Google no responde")
+
+    try:
+        memoria_compartida.obtener_o_publicar("k", 60, cargar)
+    except RuntimeError:
+        pass
+
+
+def test_otro_proceso_descargando_sirve_lo_publicado(carpetas):
+    # Hay una versión caducada; un proceso se queda colgado descargando la nueva.
+    # El otro no espera al bloqueo: mapea la anterior al momento y no descarga.
+    memoria_compartida.publicar("k", *_datos("v1"))
+    memoria_compartida.invalidar("k")
+
+    contexto = multiprocessing.get_context("fork")
+    empezada = contexto.Event()
+    proceso = contexto.Process(target=_descarga_colgada, args=(memoria_compartida.CARPETA, empezada))
+    proceso.start()
+    try:
+        assert empezada.wait(10)
+        t0 = time.monotonic()
+        version, _, arrays = memoria_compartida.obtener_o_publicar(
+            "k", 60, lambda: pytest.fail("no debería descargar mientras otro proceso descarga"))
+        assert time.monotonic() - t0 < 1
+        assert version == "v1" and arrays['a'].tolist() == [0, 1, 2, 3, 4]
+    finally:
+        proceso.join(10)
+    assert proceso.exitcode == 0
+
+
+def test_sin_nada_publicado_espera_al_otro_con_limite(carpetas):
+    contexto = multiprocessing.get_context("fork")
+    empezada = contexto.Event()
+    proceso = contexto.Process(target=_descarga_colgada, args=(memoria_compartida.CARPETA, empezada))
+    proceso.start()
+    try:
+        assert empezada.wait(10)
+        with pytest.raises(TimeoutError):
+            memoria_compartida.obtener_o_publicar("k", 60, lambda: _datos("v1"), espera=0.5)
+    finally:
+        proceso.join(10)
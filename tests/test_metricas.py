@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metricas import ETIQUETAS_SEMAFORO, _dividir, evaluar_metricas, metricas_numericas
+
+
+def _stats():
+    return pd.DataFrame({
+        'Convocatorias': [10, 4, 0],
+        'Minutos totales': [700, 70, 0],
+        'Goles': [7, 0, 0],
+        'Amarillas': [2, 1, 0],
+        'Dobles A.': [0, 1, 0],
+        'Rojas': [1, 0, 0],
+        'Jugados': [10, 2, 0],
+        'Titular': [10, 1, 0],
+    }, index=['A', 'B', 'C'])
+
+
+def test_dividir_devuelve_cero_sin_denominador():
+    assert _dividir([1, 0, 5, np.nan], [2, 0, 0, 1]).tolist() == [0.5, 0, 0, 0]
+
+
+def test_evaluar_metricas_calcula_el_registro():
+    df = evaluar_metricas(_stats(), contexto={'t_partido': 70, 'min_totales_equipo': 700})
+    assert df['Min. Posibles'].tolist() == [700, 280, 0]
+    assert df['G_x_min'].tolist() == [100.0, 0.0, 0.0]
+    assert df['% Jugado (Disp)'].tolist() == pytest.approx([100, 25, 0])
+    assert df['% Jugado (Total)'].tolist() == pytest.approx([100, 10, 0])
+    assert df['Goles_90'].tolist() == [0.9, 0.0, 0.0]
+    assert df['Tarjetas'].tolist() == [3, 2, 0]
+    assert df['Partidos suplente'].tolist() == [0, 1, 0]
+    # Cortes 30/70 como pd.cut: intervalos (a, b]
+    assert df['Rol_jugador'].tolist() == [ETIQUETAS_SEMAFORO[2], ETIQUETAS_SEMAFORO[0], ETIQUETAS_SEMAFORO[0]]
+
+
+def test_evaluar_metricas_salta_las_que_no_tienen_datos():
+    df = evaluar_metricas(_stats()[['Minutos totales', 'Goles']])
+    assert 'G_x_min' in df and 'Goles_90' in df
+    assert 'Min. Posibles' not in df and 'Tarjetas' not in df
+
+
+def test_evaluar_metricas_con_otros_nombres_de_columna():
+    df = _stats().rename(columns={'Minutos totales': 'min_tot'})
+    df = evaluar_metricas(df, columnas={'Minutos totales': 'min_tot', 'Goles_90': 'g90'})
+    assert df['g90'].tolist() == [0.9, 0.0, 0.0]
+    assert 'Goles_90' not in df
+
+
+def test_metricas_numericas_excluye_umbrales():
+    assert 'Rol_jugador' not in metricas_numericas()
+    assert 'Goles_90' in metricas_numericas()
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import paquete_offline
+from paquete_offline import Paquete, exportar
+
+
+def _equipo(gid, goles, jornada=3):
+    df_long = pd.DataFrame({'Nombre': ['Ana', 'Bea'], 'Posición': ['Portero', 'Defensa'],
+                            'Jornada': [jornada, jornada], 'G': goles})
+    df_stats = pd.DataFrame({'Nombre': ['Ana', 'Bea'], 'Goles': goles, 'Minutos totales': [70, 35],
+                             'Goles_90': [0.0, 0.0]})
+    return {'gid': gid, 'df_long': df_long, 'df_stats': df_stats, 'version': f"v{gid}",
+            'jornada': jornada, 'partidos': jornada, 't_partido': 70}
+
+
+def _abrir(tmp_path, datos):
+    ruta = tmp_path / "club.paquete"
+    ruta.write_bytes(datos)
+    return Paquete(str(ruta))
+
+
+def test_paquete_ida_y_vuelta(tmp_path):
+    infantil = _equipo("1", [1, 0])
+    cadete = _equipo("2", [0.5, 2.0], jornada=5)  # goles decimales en otro equipo
+    cadete['df_long']['Extra'] = ['x', 'y']
+    paquete = _abrir(tmp_path, exportar("club", "Club", {"Infantil": infantil, "Cadete": cadete}))
+
+    assert list(paquete.equipos) == ["Infantil", "Cadete"]
+    df_long, df_stats, datos = paquete.equipo("Cadete")
+    assert datos == {'nombre': "Cadete", 'gid': "2", 'version': "v2", 'jornada': 5, 'partidos': 5,
+                     't_partido': 70.0}
+    assert df_long['G'].tolist() == [0.5, 2.0] and df_long['Extra'].tolist() == ['x', 'y']
+    # Las métricas derivadas no viajan: se recalculan al abrir
+    assert 'Goles_90' not in df_stats
+    assert df_stats['Minutos totales'].tolist() == [70, 35]
+
+    df_long, _, _ = paquete.equipo("Infantil")
+    assert df_long['G'].tolist() == [1, 0] and df_long['Extra'].isna().all()
+
+
+def test_paquete_club_sin_equipos(tmp_path):
+    paquete = _abrir(tmp_path, exportar("club", "Club", {}))
+    assert paquete.equipos == {}
+
+
+def test_paquete_formato_desconocido(tmp_path, monkeypatch):
+    datos = exportar("club", "Club", {"Infantil": _equipo("1", [1, 0])})
+    monkeypatch.setattr(paquete_offline, "FORMATO", 2)
+    with pytest.raises(ValueError):
+        _abrir(tmp_path, datos)
@@ -0,0 +1,27 @@
+from refrescos import PlanificadorRefrescos
+
+
+def test_planificador_reparte_por_turnos_entre_clubes():
+    # hilos=0: sin hilos de fondo, la prueba va pidiendo las tareas con siguiente()
+    plan = PlanificadorRefrescos(intervalo=60, hilos=0)
+    for clave in ("e1", "e2", "e3"):
+        plan.registrar("grande", clave, lambda: None, inmediato=True)
+    plan.registrar("pequeño", "e1", lambda: None, inmediato=True)
+
+    club, clave, _ = plan.siguiente()
+    assert (club, clave) == ("grande", "e1")
+    # Con una tarea en marcha el club no recibe otra hasta que termine
+    assert plan.siguiente()[0] == "pequeño"
+    assert plan.siguiente() is None
+    plan.terminado("grande")
+    assert plan.siguiente()[:2] == ("grande", "e2")
+
+
+def test_planificador_respeta_intervalo_y_eliminar():
+    plan = PlanificadorRefrescos(intervalo=60, hilos=0)
+    plan.registrar("a", "e1", lambda: None)  # sin inmediato: espera un intervalo
+    assert plan.siguiente() is None
+    plan.registrar("b", "e1", lambda: None, inmediato=True)
+    plan.eliminar("b")
+    assert plan.siguiente() is None
+    assert plan.clubes() == ["a"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import similitud
+
+
+def _stats(nombres, minutos, posiciones=None):
+    n = len(nombres)
+    minutos = np.asarray(minutos, dtype=float)
+    return pd.DataFrame({
+        'Nombre': nombres,
+        'Posición': posiciones or ['Defensa'] * n,
+        'Minutos totales': minutos,
+        '% Jugado (Total)': minutos / 7,
+        '% Jugado (Disp)': minutos / 7,
+        'Goles_90': [0.0] * n,
+        'Titular': minutos // 70,
+        'Jugados': [10] * n,
+        'Completos': minutos // 70,
+        'Convocatorias': [10] * n,
+        'Tarjetas': [0] * n,
+    })
+
+
+def test_perfil_jornadas():
+    minutos = np.array([[0, 0, 70, 70], [70, 70, 0, 0]], dtype=float)
+    assert similitud.perfil_jornadas(minutos, 70, tramos=2).tolist() == [[0, 100], [100, 0]]
+    # Con menos jornadas que tramos se repiten jornadas; sin jornadas, ceros
+    assert similitud.perfil_jornadas(minutos[:, :1], 70, tramos=3).tolist() == [[0] * 3, [100] * 3]
+    assert similitud.perfil_jornadas(np.zeros((2, 0)), 70).shape == (2, similitud.TRAMOS_PERFIL)
+
+
+def _indice():
+    infantil = similitud.rasgos_equipo("Infantil", _stats(['A', 'B', 'C'], [700, 350, 60]),
+                                       np.zeros((3, 10)), 70, 10)
+    cadete = similitud.rasgos_equipo("Cadete", _stats(['D', 'E'], [690, 70], ['Defensa', 'Portero']),
+                                     np.zeros((2, 10)), 70, 10)
+    return similitud.construir_indice([infantil, cadete])
+
+
+def test_indice_estandarizado():
+    indice = _indice()
+    assert indice['matriz'].shape == (5, len(similitud.RASGOS) + similitud.TRAMOS_PERFIL)
+    assert np.allclose(indice['matriz'].mean(axis=0), 0, atol=1e-6)
+    # Rasgos iguales para todos (Goles_90, perfil a cero) quedan a 0, sin dividir por 0
+    assert np.isfinite(indice['matriz']).all()
+
+
+def test_vecinos_ordenados_y_filtrados():
+    indice = _indice()
+    pesos = similitud.vector_pesos({'% Jugado (Total)': 1})
+    cercanos = similitud.vecinos(indice, 0, pesos, k=2)
+    assert cercanos['Nombre'].tolist() == ['D', 'B']
+    assert cercanos['Distancia'].is_monotonic_increasing
+
+    assert similitud.vecinos(indice, 0, pesos, excluir_equipo=True)['Equipo'].unique().tolist() == ['Cadete']
+    assert similitud.vecinos(indice, 0, pesos, posiciones=['Portero'])['Nombre'].tolist() == ['E']
+
+
+def test_vecinos_sin_pesos():
+    with pytest.raises(ValueError):
+        similitud.vecinos(_indice(), 0, similitud.vector_pesos({}))
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from tabla_paginada import indices_vista, mascara_filtro
+
+
+def _df():
+    return pd.DataFrame({
+        'Nombre': ['Ana', 'Bea', 'ana maría', 'Carla', None],
+        'Equipo': ['Infantil', 'Cadete', 'Cadete', 'Infantil', 'Cadete'],
+        'Goles': [3, 0, 5, 1, 2],
+    })
+
+
+def test_mascara_filtro():
+    df = _df()
+    assert mascara_filtro(df['Nombre'], 'contiene', 'ANA').tolist() == [True, False, True, False, False]
+    assert mascara_filtro(df['Goles'], '>=', '2').tolist() == [True, False, True, False, True]
+    assert mascara_filtro(df['Goles'], '==', 'x').tolist() == [False] * 5
+    assert mascara_filtro(df['Equipo'], '==', 'Cadete').sum() == 3
+
+
+def test_indices_vista_filtra_y_ordena():
+    df = _df()
+    filas = indices_vista("club", "prueba", "v1", (('Equipo', '==', 'Cadete'),), ('Goles', True), df)
+    assert df['Goles'].iloc[filas].tolist() == [5, 2, 0]
+    # Búsqueda en varias columnas: basta con que cumpla una
+    filas = indices_vista("club", "prueba", "v1", ((('Nombre', 'Equipo'), 'contiene', 'inf'),), None, df)
+    assert filas.tolist() == [0, 3]
+    assert indices_vista("club", "prueba", "v1", (('Goles', '>=', 10),), ('Goles', False), df).dtype == np.int32